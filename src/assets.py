@@ -0,0 +1,99 @@
+import gzip
+import hashlib
+import mimetypes
+from dataclasses import dataclass
+from pathlib import Path
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: install grow-assist[compression] to serve .br
+    brotli = None
+
+# Cache-Control for URLs carrying the content fingerprint; any change to the
+# file changes the URL, so browsers may keep it forever.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Cache-Control for everything else: reuse, but check the ETag first.
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# Smaller bodies are not worth compressing.
+MIN_COMPRESS_BYTES = 512
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+@dataclass(frozen=True)
+class Asset:
+    """A response body prepared once, with its precompressed variants."""
+    body: bytes
+    media_type: str
+    etag: str
+    gzip: bytes | None = None
+    br: bytes | None = None
+
+    @classmethod
+    def build(cls, body: bytes, media_type: str) -> "Asset":
+        fingerprint = hashlib.sha256(body).hexdigest()[:16]
+        compress = len(body) >= MIN_COMPRESS_BYTES and media_type.startswith(COMPRESSIBLE_TYPES)
+        return cls(
+            body=body,
+            media_type=media_type,
+            etag=f'"{fingerprint}"',
+            gzip=gzip.compress(body, compresslevel=9, mtime=0) if compress else None,
+            br=brotli.compress(body) if compress and brotli is not None else None,
+        )
+
+    @property
+    def fingerprint(self) -> str:
+        return self.etag.strip('"')[:10]
+
+    def response(self, request: Request, cache_control: str = REVALIDATE_CACHE_CONTROL) -> Response:
+        """Serve the asset, honouring If-None-Match and Accept-Encoding."""
+        headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if self.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+
+        accepted = {part.split(";")[0].strip() for part in request.headers.get("accept-encoding", "").split(",")}
+        body = self.body
+        if self.br is not None and "br" in accepted:
+            body, headers["Content-Encoding"] = self.br, "br"
+        elif self.gzip is not None and "gzip" in accepted:
+            body, headers["Content-Encoding"] = self.gzip, "gzip"
+        return Response(body, media_type=self.media_type, headers=headers)
+
+
+class StaticAssets:
+    """Serves a static directory from memory with fingerprinted URLs.
+
+    Every file is read and compressed once at startup. url(path) returns
+    /static/<path>?v=<fingerprint>; requests carrying the current
+    fingerprint get a year-long immutable Cache-Control, others must
+    revalidate with the ETag.
+    """
+
+    def __init__(self, directory: str | Path, mount_path: str = "/static"):
+        self.directory = Path(directory)
+        self.mount_path = mount_path
+        self.assets: dict[str, Asset] = {}
+        for path in sorted(self.directory.rglob("*")):
+            if path.is_file():
+                media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+                self.assets[path.relative_to(self.directory).as_posix()] = Asset.build(path.read_bytes(), media_type)
+
+    def url(self, path: str) -> str:
+        path = path.lstrip("/")
+        return f"{self.mount_path}/{path}?v={self.assets[path].fingerprint}"
+
+    async def __call__(self, scope, receive, send) -> None:
+        request = Request(scope, receive)
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        asset = self.assets.get(path.lstrip("/"))
+        if asset is None or request.method not in ("GET", "HEAD"):
+            response = Response("Not Found", status_code=404, media_type="text/plain")
+        elif request.query_params.get("v") == asset.fingerprint:
+            response = asset.response(request, IMMUTABLE_CACHE_CONTROL)
+        else:
+            response = asset.response(request)
+        await response(scope, receive, send)
@@ -0,0 +1,36 @@
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def run_deduplicated(
+    items: list[T],
+    key: Callable[[T], str],
+    worker: Callable[[T], Awaitable[R]],
+    concurrency: int,
+) -> list[R | Exception]:
+    """Run worker over items concurrently, once per distinct key.
+
+    Items that share a key get the same result. At most `concurrency`
+    workers run at a time. Each failure is returned in place of its result
+    instead of failing the whole batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def limited(item: T) -> R:
+        async with semaphore:
+            return await worker(item)
+
+    keys = [key(item) for item in items]
+    for item, item_key in zip(items, keys):
+        if item_key not in tasks:
+            tasks[item_key] = asyncio.ensure_future(limited(item))
+
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+    return [
+        tasks[item_key].exception() or tasks[item_key].result()
+        for item_key in keys
+    ]
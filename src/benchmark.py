@@ -0,0 +1,196 @@
+"""Offline load tests for /analyze against the fake LLM.
+
+Run with `uv run python -m src.benchmark` (add --help for options).
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable
+import httpx
+from . import config, main
+from .cache import MemoryBackend, ResponseCache
+from .telemetry import percentile
+
+
+def synthetic_csv(rows: int, seed: int = 0) -> bytes:
+    """Minute-resolution controller log with plausible temperature, humidity and PPFD."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    lines = ["timestamp,temperature,humidity,ppfd"]
+    for i in range(rows):
+        timestamp = start + timedelta(minutes=i)
+        lights_on = 6 <= timestamp.hour < 24
+        lines.append(
+            f"{timestamp.isoformat()},{rng.uniform(72, 82):.1f},{rng.uniform(45, 70):.1f},"
+            f"{rng.uniform(550, 750) if lights_on else 0:.0f}"
+        )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+@dataclass
+class Scenario:
+    name: str
+    requests: int
+    concurrency: int
+    make_csv: Callable[[int], bytes]
+    growth_stage: str = "vegetation"
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    concurrency: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    requests_per_second: float
+    peak_rss_mb: float
+    cache_hits: int
+    status_codes: dict[int, int] = field(default_factory=dict)
+
+
+def default_scenarios(scale: float = 1.0) -> list[Scenario]:
+    def count(n: int) -> int:
+        return max(1, round(n * scale))
+
+    return [
+        Scenario("small_csv", count(20), 1, lambda i: synthetic_csv(24, seed=i)),
+        Scenario("huge_csv", count(3), 1, lambda i: synthetic_csv(100_000, seed=1000 + i)),
+        Scenario("concurrent_users", count(50), 25, lambda i: synthetic_csv(24, seed=2000 + i)),
+        Scenario("cache_hit", count(20), 5, lambda i: synthetic_csv(24, seed=3000)),
+        Scenario("cache_miss", count(20), 5, lambda i: synthetic_csv(24, seed=4000 + i)),
+    ]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def use_fake_llm(latency: float, jitter: float, failure_rate: float) -> None:
+    """Point the app at a fresh FakeChatModel and an empty exact-match cache, without client quotas."""
+    config.LLM_PROVIDER = "fake"
+    config.FAKE_LLM_LATENCY_SECONDS = latency
+    config.FAKE_LLM_JITTER_SECONDS = jitter
+    config.FAKE_LLM_FAILURE_RATE = failure_rate
+    main._model = None
+    main._structured_model = None
+    main._circuit_breaker = None
+    main._context_cache = None
+    main._llm_limiter = None
+    # Every benchmark request comes from one in-process client.
+    config.RATE_LIMIT_PER_MINUTE = 0
+    config.DAILY_TOKEN_BUDGET = 0
+    main._client_quotas = None
+    # Synthetic uploads are near-duplicates of each other; keep cache_miss honest.
+    config.SIMILARITY_CACHE = False
+    main._similarity_cache = None
+    main._response_cache = ResponseCache(
+        MemoryBackend(max_entries=config.CACHE_MAX_ENTRIES, ttl_seconds=config.CACHE_TTL_SECONDS)
+    )
+
+
+async def run_scenario(scenario: Scenario, endpoint: str = "/analyze") -> ScenarioResult:
+    """Fire the scenario's requests at the app in-process and collect latencies."""
+    payloads = [scenario.make_csv(i) for i in range(scenario.requests)]
+    semaphore = asyncio.Semaphore(scenario.concurrency)
+    latencies: list[float] = []
+    status_codes: dict[int, int] = {}
+    hits_before = main._response_cache.hits if main._response_cache else 0
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        async def one(payload: bytes):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(
+                        endpoint,
+                        data={"growth_stage": scenario.growth_stage},
+                        files={"csv_file": ("bench.csv", payload, "text/csv")},
+                    )
+                    status = response.status_code
+                except Exception:
+                    status = 599
+                latencies.append(time.perf_counter() - start)
+                status_codes[status] = status_codes.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(payload) for payload in payloads))
+        elapsed = time.perf_counter() - started
+
+    hits_after = main._response_cache.hits if main._response_cache else 0
+    return ScenarioResult(
+        name=scenario.name,
+        requests=scenario.requests,
+        concurrency=scenario.concurrency,
+        errors=sum(n for status, n in status_codes.items() if status >= 400),
+        p50_ms=percentile(latencies, 50) * 1000,
+        p95_ms=percentile(latencies, 95) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        requests_per_second=scenario.requests / elapsed if elapsed else 0.0,
+        peak_rss_mb=peak_rss_mb(),
+        cache_hits=hits_after - hits_before,
+        status_codes=status_codes,
+    )
+
+
+def format_results(results: list[ScenarioResult]) -> str:
+    header = f"{'scenario':<18}{'reqs':>6}{'conc':>6}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}" \
+             f"{'p99 ms':>10}{'req/s':>9}{'hits':>6}{'rss MB':>9}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r.name:<18}{r.requests:>6}{r.concurrency:>6}{r.errors:>8}{r.p50_ms:>10.1f}{r.p95_ms:>10.1f}"
+            f"{r.p99_ms:>10.1f}{r.requests_per_second:>9.1f}{r.cache_hits:>6}{r.peak_rss_mb:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+async def run_benchmarks(scenarios: list[Scenario], endpoint: str = "/analyze") -> list[ScenarioResult]:
+    return [await run_scenario(scenario, endpoint) for scenario in scenarios]
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenario", action="append", help="Run only these scenarios (repeatable)")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM latency per call in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Fake LLM latency jitter in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fake LLM failure probability")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply the request count of each scenario")
+    parser.add_argument("--endpoint", default="/analyze", help="Endpoint to exercise")
+    parser.add_argument("--json", dest="json_path", help="Also write results as JSON to this path")
+    parser.add_argument("--max-p95-ms", type=float, help="Exit non-zero if any scenario's p95 exceeds this")
+    args = parser.parse_args(argv)
+
+    use_fake_llm(args.latency, args.jitter, args.failure_rate)
+    scenarios = default_scenarios(args.scale)
+    if args.scenario:
+        scenarios = [s for s in scenarios if s.name in args.scenario]
+
+    results = asyncio.run(run_benchmarks(scenarios, args.endpoint))
+    print(format_results(results))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+
+    if args.max_p95_ms is not None:
+        slow = [r.name for r in results if r.p95_ms > args.max_p95_ms]
+        if slow:
+            print(f"p95 above {args.max_p95_ms}ms: {', '.join(slow)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,234 @@
+import csv
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Catalog categories and search terms for each issue EnvironmentMetrics can detect.
+ISSUE_QUERIES: dict[str, tuple[tuple[str, ...], str]] = {
+    "humidity_high": (("Humidity Control", "Ventilation Issues", "VPD Optimization"),
+                      "dehumidifier humidity exhaust ventilation"),
+    "humidity_low": (("Humidity Control", "VPD Optimization"), "humidifier humidity moisture"),
+    "temperature_high": (("Temperature Control", "Heat from Lights", "Ventilation Issues"),
+                         "cooling heat exhaust inline fan temperature"),
+    "temperature_low": (("Temperature Control",), "heater temperature controller"),
+    "vpd_high": (("VPD Optimization", "Humidity Control"), "vpd humidifier controller"),
+    "vpd_low": (("VPD Optimization", "Ventilation Issues"), "vpd exhaust inline fan controller"),
+    "light_low": (("Insufficient Light", "Poor Light Distribution"), "led grow light ppfd coverage"),
+}
+
+# Used when the data shows no issues, so the model still has products to suggest.
+DEFAULT_QUERY: tuple[tuple[str, ...], str] = (
+    ("Monitoring Difficulty", "VPD Optimization", "Lack of Automation"),
+    "controller monitoring sensor vpd automation",
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_url(url: str) -> str:
+    """Compare URLs ignoring case, scheme, query, fragment and trailing slash."""
+    url = url.strip().lower().split("#", 1)[0].split("?", 1)[0]
+    return url.split("://", 1)[-1].removeprefix("www.").rstrip("/")
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(tokenize(name))
+
+
+@dataclass(frozen=True)
+class CatalogProduct:
+    """One row of product_links.csv."""
+    category: str
+    name: str
+    price: str
+    url: str
+    description: str
+
+    def to_prompt_line(self) -> str:
+        return f"- {self.name} ({self.price}) [{self.category}]: {self.url} — {self.description}"
+
+
+class ProductIndex:
+    """Lookups that tie a product the model names back to a catalog entry.
+
+    URLs and normalized names resolve with a dict lookup. Other names are
+    fuzzy matched by IDF-weighted token overlap with the catalog names, using
+    an inverted index to score only names sharing a token; results are
+    memoized, so each distinct name is matched once per catalog load.
+    """
+
+    def __init__(self, products: list[CatalogProduct]):
+        self.by_url: dict[str, CatalogProduct] = {}
+        self.by_name: dict[str, CatalogProduct] = {}
+        for product in products:
+            self.by_url.setdefault(normalize_url(product.url), product)
+            self.by_name.setdefault(normalize_name(product.name), product)
+
+        self._tokens = {name: frozenset(name.split()) for name in self.by_name}
+        self._by_token: dict[str, list[str]] = {}
+        for name, tokens in self._tokens.items():
+            for token in tokens:
+                self._by_token.setdefault(token, []).append(name)
+        self._idf = {
+            token: math.log((1 + len(self._tokens)) / (1 + len(names))) + 1
+            for token, names in self._by_token.items()
+        }
+        self._matches: dict[tuple[str, float], CatalogProduct | None] = {}
+        self._lock = threading.Lock()
+
+    def by_link(self, url: str) -> CatalogProduct | None:
+        return self.by_url.get(normalize_url(url))
+
+    def match_name(self, name: str, threshold: float) -> CatalogProduct | None:
+        """The catalog product name best describes, if the match is good and unambiguous.
+
+        A candidate's score is the IDF weight of the tokens it shares with name
+        over the weight of name's tokens, ignoring tokens no catalog name uses;
+        ties go to the candidate with fewer extra tokens. No product is
+        returned when the best score is below threshold, or when a product
+        with a different URL scores as well (e.g. just "inline fan").
+        """
+        normalized = normalize_name(name)
+        exact = self.by_name.get(normalized)
+        if exact is not None:
+            return exact
+        key = (normalized, threshold)
+        with self._lock:
+            if key in self._matches:
+                return self._matches[key]
+
+        tokens = frozenset(token for token in normalized.split() if token in self._idf)
+        weight = sum(self._idf[token] for token in tokens)
+        scored = []
+        for candidate in dict.fromkeys(name for token in tokens for name in self._by_token[token]):
+            candidate_tokens = self._tokens[candidate]
+            coverage = sum(self._idf[token] for token in tokens & candidate_tokens) / weight
+            extra = sum(self._idf[token] for token in candidate_tokens - tokens)
+            scored.append((-coverage, extra, candidate))
+        scored.sort()
+
+        best = None
+        if scored and -scored[0][0] >= threshold:
+            best = self.by_name[scored[0][2]]
+            url = normalize_url(best.url)
+            if any(coverage == scored[0][0] and normalize_url(self.by_name[candidate].url) != url
+                   for coverage, _, candidate in scored[1:]):
+                best = None
+
+        with self._lock:
+            self._matches[key] = best
+        return best
+
+
+class ProductCatalog:
+    """Typed, indexed view of product_links.csv with TF-IDF retrieval.
+
+    The CSV is read once and re-read only when its modification time changes.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.products: list[CatalogProduct] = []
+        self.by_category: dict[str, list[CatalogProduct]] = {}
+        self.index = ProductIndex([])
+        self.version = "empty"
+        self._mtime: float | None = None
+        self._idf: dict[str, float] = {}
+        self._vectors: list[dict[str, float]] = []
+        self._lock = threading.Lock()
+        self.reload_if_changed()
+
+    def reload_if_changed(self) -> bool:
+        """Reload the CSV if it changed on disk; returns True when reloaded."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            if self._mtime is not None or not self.products:
+                logger.warning("Product catalog %s not found", self.path)
+            return False
+        if mtime == self._mtime:
+            return False
+        with self._lock:
+            if mtime == self._mtime:
+                return False
+            self._load(mtime)
+        return True
+
+    def _load(self, mtime: float) -> None:
+        with open(self.path, newline="") as f:
+            products = [
+                CatalogProduct(
+                    category=row["Problem Category"].strip(),
+                    name=row["Product Name"].strip(),
+                    price=row["Product Price"].strip(),
+                    url=row["Product URL"].strip(),
+                    description=row["Product Description"].strip(),
+                )
+                for row in csv.DictReader(f)
+            ]
+
+        by_category: dict[str, list[CatalogProduct]] = {}
+        for product in products:
+            by_category.setdefault(product.category, []).append(product)
+
+        documents = [tokenize(f"{p.category} {p.name} {p.description}") for p in products]
+        document_frequency = Counter(token for tokens in documents for token in set(tokens))
+        idf = {
+            token: math.log((1 + len(documents)) / (1 + count)) + 1
+            for token, count in document_frequency.items()
+        }
+
+        self.products = products
+        self.by_category = by_category
+        self._idf = idf
+        self._vectors = [self._vectorize(tokens) for tokens in documents]
+        self.index = ProductIndex(products)
+        self.version = f"{len(products)}-{mtime:.0f}"
+        self._mtime = mtime
+        logger.info("Loaded %d products from %s", len(products), self.path)
+
+    def _vectorize(self, tokens: list[str]) -> dict[str, float]:
+        weights = {token: count * self._idf.get(token, 0.0) for token, count in Counter(tokens).items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        return {token: weight / norm for token, weight in weights.items()}
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        categories: tuple[str, ...] = (),
+    ) -> list[CatalogProduct]:
+        """Rank products by TF-IDF similarity to query, boosting the given categories."""
+        query_vector = self._vectorize(tokenize(query))
+        scored = []
+        for index, (product, vector) in enumerate(zip(self.products, self._vectors)):
+            score = sum(weight * vector.get(token, 0.0) for token, weight in query_vector.items())
+            if product.category in categories:
+                score += 1.0
+            if score > 0:
+                scored.append((-score, index, product))
+        scored.sort()
+        return [product for _, _, product in scored[:k]]
+
+    def products_for_issues(self, issues: list[str], k: int = 6) -> list[CatalogProduct]:
+        """Pick up to k distinct products relevant to the detected issues."""
+        queries = [ISSUE_QUERIES[issue] for issue in issues if issue in ISSUE_QUERIES] or [DEFAULT_QUERY]
+        ranked = [self.search(query, k, categories) for categories, query in queries]
+
+        selected: list[CatalogProduct] = []
+        for position in range(k):
+            for results in ranked:
+                if position < len(results) and results[position] not in selected:
+                    selected.append(results[position])
+        return selected[:k]
@@ -0,0 +1,176 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+
+class CapacityExceededError(Exception):
+    """Raised when an LLM call cannot get a slot within the configured limits."""
+
+
+class LLMLimiter:
+    """Caps the number of in-flight LLM calls and the queue waiting behind them."""
+
+    def __init__(self, max_in_flight: int, max_queued: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._in_flight = 0
+        self._queued = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one LLM slot for the duration of the block.
+
+        Raises CapacityExceededError when the queue is already full or the wait
+        for a slot exceeds queue_timeout.
+        """
+        if self._semaphore.locked() and self._queued >= self.max_queued:
+            raise CapacityExceededError("Too many analyses are queued, please retry shortly.")
+
+        self._queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except TimeoutError:
+            raise CapacityExceededError("Timed out waiting for analysis capacity, please retry shortly.")
+        finally:
+            self._queued -= 1
+
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+
+class SQLiteLLMLimiter:
+    """Caps in-flight LLM calls across every worker process sharing a SQLite file.
+
+    Each running call holds a row in the slots table. A slot is taken with an
+    immediate transaction that counts the rows first, so the cap holds across
+    processes; waiting calls poll until one frees up. Slots held longer than
+    lease_seconds, or by a process that has exited, are reclaimed. The queue
+    limit applies per process. SQLite calls, which may wait on another
+    process's lock, run in a worker thread rather than on the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_in_flight: int,
+        max_queued: int,
+        queue_timeout: float,
+        lease_seconds: float = 300.0,
+        poll_interval: float = 0.05,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=5)
+        self._lock = threading.Lock()
+        self._queued = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_slots (
+                    id INTEGER PRIMARY KEY,
+                    pid INTEGER NOT NULL,
+                    acquired_at REAL NOT NULL
+                )"""
+            )
+
+    @property
+    def in_flight(self) -> int:
+        """LLM calls running in all processes."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_slots").fetchone()[0]
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def _reclaim(self, now: float) -> None:
+        self._conn.execute("DELETE FROM llm_slots WHERE acquired_at < ?", (now - self.lease_seconds,))
+        for (pid,) in self._conn.execute("SELECT DISTINCT pid FROM llm_slots").fetchall():
+            if pid != os.getpid() and not process_alive(pid):
+                self._conn.execute("DELETE FROM llm_slots WHERE pid = ?", (pid,))
+
+    def _try_acquire(self) -> int | None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reclaim(now)
+                if self._conn.execute("SELECT COUNT(*) FROM llm_slots").fetchone()[0] >= self.max_in_flight:
+                    return None
+                return self._conn.execute(
+                    "INSERT INTO llm_slots (pid, acquired_at) VALUES (?, ?)", (os.getpid(), now)
+                ).lastrowid
+            finally:
+                self._conn.execute("COMMIT")
+
+    def _release(self, slot_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_slots WHERE id = ?", (slot_id,))
+
+    async def _acquire(self) -> int | None:
+        """_try_acquire in a worker thread; a slot taken after the caller was cancelled is released."""
+        attempt = asyncio.ensure_future(asyncio.to_thread(self._try_acquire))
+        try:
+            return await asyncio.shield(attempt)
+        except asyncio.CancelledError:
+            def release_late(done: asyncio.Future) -> None:
+                if not done.cancelled() and done.exception() is None and done.result() is not None:
+                    self._release(done.result())
+            attempt.add_done_callback(release_late)
+            raise
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one LLM slot for the duration of the block; raises CapacityExceededError like LLMLimiter."""
+        slot_id = await self._acquire()
+        if slot_id is None:
+            if self._queued >= self.max_queued:
+                raise CapacityExceededError("Too many analyses are queued, please retry shortly.")
+            self._queued += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while slot_id is None:
+                    if time.monotonic() >= deadline:
+                        raise CapacityExceededError("Timed out waiting for analysis capacity, please retry shortly.")
+                    await asyncio.sleep(self.poll_interval)
+                    slot_id = await self._acquire()
+            finally:
+                self._queued -= 1
+
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self._release, slot_id)
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process with this id is running on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,199 @@
+import os
+from typing import Literal
+
+
+def _int_env(name: str, default: int) -> int:
+    """Read an integer setting from the environment."""
+    return int(os.environ.get(name, default))
+
+
+def _float_env(name: str, default: float) -> float:
+    """Read a float setting from the environment."""
+    return float(os.environ.get(name, default))
+
+
+# Maximum number of LLM calls allowed to run at once in this process (or, with
+# the "sqlite" limiter backend, across all worker processes).
+MAX_INFLIGHT_LLM_CALLS = _int_env("GROW_ASSIST_MAX_INFLIGHT_LLM_CALLS", 8)
+
+# Maximum number of LLM calls allowed to wait for a free slot.
+MAX_QUEUED_LLM_CALLS = _int_env("GROW_ASSIST_MAX_QUEUED_LLM_CALLS", 32)
+
+# Seconds a queued LLM call may wait for a slot before giving up with a 503.
+LLM_QUEUE_TIMEOUT_SECONDS = _float_env("GROW_ASSIST_LLM_QUEUE_TIMEOUT_SECONDS", 10.0)
+
+# Where the in-flight LLM call limit is kept: "memory" (per process) or
+# "sqlite" (shared by every worker process using LIMITER_PATH).
+LIMITER_BACKEND: Literal["memory", "sqlite"] = os.environ.get("GROW_ASSIST_LIMITER_BACKEND", "memory")
+LIMITER_PATH = os.environ.get("GROW_ASSIST_LIMITER_PATH", ".cache/limiter.sqlite3")
+
+# Seconds after which a shared LLM slot is presumed abandoned and reclaimed.
+LIMITER_LEASE_SECONDS = _float_env("GROW_ASSIST_LIMITER_LEASE_SECONDS", 300.0)
+
+# "single" asks the structured model for an AnalysisResponse in one call and
+# falls back to "two_pass" only when that output fails validation.
+ANALYSIS_MODE: Literal["single", "two_pass"] = os.environ.get("GROW_ASSIST_ANALYSIS_MODE", "single")
+
+# Analysis response cache: "memory", "sqlite" (survives restarts) or "none".
+CACHE_BACKEND: Literal["memory", "sqlite", "none"] = os.environ.get("GROW_ASSIST_CACHE_BACKEND", "memory")
+
+# Location of the SQLite cache database when CACHE_BACKEND is "sqlite".
+CACHE_PATH = os.environ.get("GROW_ASSIST_CACHE_PATH", ".cache/analysis_cache.sqlite3")
+
+# Seconds before a cached analysis expires.
+CACHE_TTL_SECONDS = _float_env("GROW_ASSIST_CACHE_TTL_SECONDS", 24 * 60 * 60)
+
+# Maximum number of cached analyses before least recently used ones are evicted.
+CACHE_MAX_ENTRIES = _int_env("GROW_ASSIST_CACHE_MAX_ENTRIES", 1024)
+
+# Uploads with more rows than this are sent to the model as a statistical
+# digest instead of row by row.
+DIGEST_RAW_ROW_LIMIT = _int_env("GROW_ASSIST_DIGEST_RAW_ROW_LIMIT", 48)
+
+# Rows converted to NumPy arrays at a time when computing environment metrics.
+METRICS_CHUNK_ROWS = _int_env("GROW_ASSIST_METRICS_CHUNK_ROWS", 8192)
+
+# Largest upload accepted by /analyze, in bytes.
+MAX_UPLOAD_BYTES = _int_env("GROW_ASSIST_MAX_UPLOAD_BYTES", 50 * 1024 * 1024)
+
+# Largest size a gzip or zstd upload may decompress to, in bytes.
+MAX_DECOMPRESSED_BYTES = _int_env("GROW_ASSIST_MAX_DECOMPRESSED_BYTES", 500 * 1024 * 1024)
+
+# Largest number of CSV rows accepted by /analyze.
+MAX_UPLOAD_ROWS = _int_env("GROW_ASSIST_MAX_UPLOAD_ROWS", 1_000_000)
+
+# Number of catalog products retrieved into each prompt.
+PROMPT_PRODUCT_COUNT = _int_env("GROW_ASSIST_PROMPT_PRODUCT_COUNT", 6)
+
+# Maximum number of items (or CSVs in a zip) accepted by the batch endpoints.
+BATCH_MAX_ITEMS = _int_env("GROW_ASSIST_BATCH_MAX_ITEMS", 100)
+
+# Number of batch items analyzed at the same time within one batch request.
+BATCH_CONCURRENCY = _int_env("GROW_ASSIST_BATCH_CONCURRENCY", 4)
+
+# "gemini" for the real model, or "fake" for the offline FakeChatModel used by
+# benchmarks and local development.
+LLM_PROVIDER: Literal["gemini", "fake"] = os.environ.get("GROW_ASSIST_LLM_PROVIDER", "gemini")
+
+# Simulated latency, jitter (both in seconds) and failure rate for the fake model.
+FAKE_LLM_LATENCY_SECONDS = _float_env("GROW_ASSIST_FAKE_LLM_LATENCY_SECONDS", 0.5)
+FAKE_LLM_JITTER_SECONDS = _float_env("GROW_ASSIST_FAKE_LLM_JITTER_SECONDS", 0.1)
+FAKE_LLM_FAILURE_RATE = _float_env("GROW_ASSIST_FAKE_LLM_FAILURE_RATE", 0.0)
+
+# Log a JSON line with stage timings and token counts for every request.
+TRACE_REQUESTS = os.environ.get("GROW_ASSIST_TRACE_REQUESTS", "").lower() in ("1", "true", "yes")
+
+# Background job store: "memory", or "sqlite" so queued jobs survive restarts.
+JOB_STORE: Literal["memory", "sqlite"] = os.environ.get("GROW_ASSIST_JOB_STORE", "memory")
+
+# Location of the SQLite job database when JOB_STORE is "sqlite".
+JOB_STORE_PATH = os.environ.get("GROW_ASSIST_JOB_STORE_PATH", ".cache/jobs.sqlite3")
+
+# Finished jobs kept by the memory job store for polling: at most this many,
+# for at most this many seconds.
+JOB_MAX_FINISHED = _int_env("GROW_ASSIST_JOB_MAX_FINISHED", 1000)
+JOB_RETENTION_SECONDS = _float_env("GROW_ASSIST_JOB_RETENTION_SECONDS", 3600.0)
+
+# Seconds after which a running job that has not been updated is presumed
+# abandoned and queued again.
+JOB_LEASE_SECONDS = _float_env("GROW_ASSIST_JOB_LEASE_SECONDS", 600.0)
+
+# Number of background analyses run at the same time.
+JOB_WORKERS = _int_env("GROW_ASSIST_JOB_WORKERS", 2)
+
+# Attempts per job before it is marked failed, and the base retry delay in seconds.
+JOB_MAX_ATTEMPTS = _int_env("GROW_ASSIST_JOB_MAX_ATTEMPTS", 3)
+JOB_RETRY_BACKOFF_SECONDS = _float_env("GROW_ASSIST_JOB_RETRY_BACKOFF_SECONDS", 2.0)
+
+# Deadline for a single model call, in seconds; slower calls are abandoned and retried.
+LLM_TIMEOUT_SECONDS = _float_env("GROW_ASSIST_LLM_TIMEOUT_SECONDS", 30.0)
+
+# Retries after a failed or timed-out model call, and the jittered exponential
+# backoff between them (base and cap, in seconds).
+LLM_MAX_RETRIES = _int_env("GROW_ASSIST_LLM_MAX_RETRIES", 2)
+LLM_RETRY_BACKOFF_SECONDS = _float_env("GROW_ASSIST_LLM_RETRY_BACKOFF_SECONDS", 0.5)
+LLM_RETRY_BACKOFF_MAX_SECONDS = _float_env("GROW_ASSIST_LLM_RETRY_BACKOFF_MAX_SECONDS", 8.0)
+
+# Send a second, hedged model call when the first is slower than the observed
+# p95 latency; only once at least LLM_HEDGE_MIN_SAMPLES calls have been timed.
+LLM_HEDGE = os.environ.get("GROW_ASSIST_LLM_HEDGE", "").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_SAMPLES = _int_env("GROW_ASSIST_LLM_HEDGE_MIN_SAMPLES", 20)
+
+# Consecutive failed model calls before the circuit opens, and seconds it stays
+# open (answering with rules-based advice) before a trial call is let through.
+BREAKER_FAILURE_THRESHOLD = _int_env("GROW_ASSIST_BREAKER_FAILURE_THRESHOLD", 5)
+BREAKER_RESET_SECONDS = _float_env("GROW_ASSIST_BREAKER_RESET_SECONDS", 30.0)
+
+# Rules engine fast path that answers without the model: "off", "in_range"
+# (only uploads with every condition inside the stage targets) or
+# "known_issues" (also uploads whose issues match a known pattern). Off
+# unless configured, so every upload goes to the model.
+RULES_ENGINE: Literal["off", "in_range", "known_issues"] = os.environ.get("GROW_ASSIST_RULES_ENGINE", "off")
+
+# Fewest recognized temperature/humidity readings the rules engine will answer for.
+RULES_MIN_READINGS = _int_env("GROW_ASSIST_RULES_MIN_READINGS", 12)
+
+# Register the stable system prompt with the provider's context cache (Gemini
+# only) so repeated requests are billed for the variable suffix alone, and how
+# long each cache entry lives. Prefixes estimated below the provider's minimum
+# cacheable size in tokens are never registered; they are sent in full and
+# still benefit from implicit prefix caching.
+CONTEXT_CACHE = os.environ.get("GROW_ASSIST_CONTEXT_CACHE", "true").lower() in ("1", "true", "yes")
+CONTEXT_CACHE_TTL_SECONDS = _float_env("GROW_ASSIST_CONTEXT_CACHE_TTL_SECONDS", 60 * 60)
+CONTEXT_CACHE_MIN_TOKENS = _int_env("GROW_ASSIST_CONTEXT_CACHE_MIN_TOKENS", 1024)
+
+# SQLite database holding each tent's stored readings and rolling aggregates.
+TENT_STORE_PATH = os.environ.get("GROW_ASSIST_TENT_STORE_PATH", ".cache/tents.sqlite3")
+
+# Tents keep a typical day (lights on) and night temperature, humidity and
+# VPD per growth stage. Once a stage's baseline has this many readings in each
+# period an analysis covers, the prompt carries only deviations from it.
+# Readings without PPFD count as day between these hours (may wrap midnight).
+TENT_BASELINE_MIN_READINGS = _int_env("GROW_ASSIST_TENT_BASELINE_MIN_READINGS", 48)
+TENT_LIGHTS_ON_HOUR = _int_env("GROW_ASSIST_TENT_LIGHTS_ON_HOUR", 6)
+TENT_LIGHTS_OFF_HOUR = _int_env("GROW_ASSIST_TENT_LIGHTS_OFF_HOUR", 18)
+
+# Products in model answers whose URL is not in the catalog are snapped to the
+# catalog entry their name matches, when at least this share (IDF-weighted) of
+# the name's words match one entry unambiguously; otherwise they are dropped.
+PRODUCT_MATCH_THRESHOLD = _float_env("GROW_ASSIST_PRODUCT_MATCH_THRESHOLD", 0.6)
+
+# Reuse the analysis of an earlier upload whose environment is nearly the
+# same: same stage and out-of-range issues, and every feature (mean/min/max
+# VPD, mean temperature and humidity, time in range) within
+# SIMILARITY_THRESHOLD times its tolerance (0.05 kPa mean VPD, 1.5°F, 3% RH...).
+# Off unless configured.
+SIMILARITY_CACHE = os.environ.get("GROW_ASSIST_SIMILARITY_CACHE", "").lower() in ("1", "true", "yes")
+SIMILARITY_THRESHOLD = _float_env("GROW_ASSIST_SIMILARITY_THRESHOLD", 1.0)
+SIMILARITY_CACHE_MAX_ENTRIES = _int_env("GROW_ASSIST_SIMILARITY_CACHE_MAX_ENTRIES", 512)
+SIMILARITY_CACHE_TTL_SECONDS = _float_env("GROW_ASSIST_SIMILARITY_CACHE_TTL_SECONDS", 6 * 60 * 60)
+SIMILARITY_MIN_READINGS = _int_env("GROW_ASSIST_SIMILARITY_MIN_READINGS", 12)
+
+# Append every model-produced analysis, with its prompt data, to an eval
+# corpus for offline replay with `python -m src.evals`. Uploads are stored as
+# prompt text, so only enable this where that is acceptable.
+EVAL_RECORD = os.environ.get("GROW_ASSIST_EVAL_RECORD", "").lower() in ("1", "true", "yes")
+EVAL_CORPUS_PATH = os.environ.get("GROW_ASSIST_EVAL_CORPUS_PATH", ".cache/eval_corpus.jsonl")
+
+# Per-client limits on requests that may call the model (all POSTs), keyed
+# by the X-API-Key header or, without one, the client address: a token bucket
+# refilled at RATE_LIMIT_PER_MINUTE holding up to RATE_LIMIT_BURST requests,
+# and a budget of prompt plus completion tokens per UTC day. 0 disables a
+# limit; both are off unless configured.
+RATE_LIMIT_PER_MINUTE = _float_env("GROW_ASSIST_RATE_LIMIT_PER_MINUTE", 0.0)
+RATE_LIMIT_BURST = _int_env("GROW_ASSIST_RATE_LIMIT_BURST", 20)
+DAILY_TOKEN_BUDGET = _int_env("GROW_ASSIST_DAILY_TOKEN_BUDGET", 0)
+
+# Where rate limit buckets and token usage are kept: "memory" (per process) or
+# "sqlite" (shared by every worker process using QUOTA_PATH).
+QUOTA_BACKEND: Literal["memory", "sqlite"] = os.environ.get("GROW_ASSIST_QUOTA_BACKEND", "memory")
+QUOTA_PATH = os.environ.get("GROW_ASSIST_QUOTA_PATH", ".cache/quotas.sqlite3")
+
+# Production server (python -m src.server): worker processes, and seconds to
+# let in-flight requests and queued jobs finish on shutdown.
+WEB_WORKERS = _int_env("GROW_ASSIST_WEB_WORKERS", 2)
+SHUTDOWN_GRACE_SECONDS = _float_env("GROW_ASSIST_SHUTDOWN_GRACE_SECONDS", 30.0)
+
+# Build the model clients, catalog, caches and index page at startup instead
+# of on the first request.
+WARM_START = os.environ.get("GROW_ASSIST_WARM_START", "true").lower() in ("1", "true", "yes")
@@ -0,0 +1,44 @@
+import pytest
+from . import main
+from .cache import MemoryBackend, ResponseCache
+from .context_cache import NullContextCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_response_cache():
+    """Give every test an empty in-memory response cache."""
+    main._response_cache = ResponseCache(MemoryBackend(max_entries=128, ttl_seconds=3600))
+    yield main._response_cache
+    main._response_cache = None
+
+
+@pytest.fixture(autouse=True)
+def fresh_similarity_cache():
+    """Give every test an empty near-duplicate cache."""
+    main._similarity_cache = None
+    yield
+    main._similarity_cache = None
+
+
+@pytest.fixture(autouse=True)
+def fresh_job_queue():
+    """Give every test its own background job queue."""
+    main._job_queue = None
+    yield
+    main._job_queue = None
+
+
+@pytest.fixture(autouse=True)
+def no_context_cache():
+    """Keep tests from registering the prompt prefix with the real provider."""
+    main._context_cache = NullContextCache()
+    yield
+    main._context_cache = None
+
+
+@pytest.fixture(autouse=True)
+def fresh_client_quotas():
+    """Give every test fresh per-client rate limits and token usage."""
+    main._client_quotas = None
+    yield
+    main._client_quotas = None
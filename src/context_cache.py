@@ -0,0 +1,100 @@
+import logging
+import time
+from typing import Callable, Protocol
+from .telemetry import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Recreate the provider cache this many seconds before it expires.
+REFRESH_MARGIN_SECONDS = 60
+
+
+class ContextCache(Protocol):
+    """Registers the stable prompt prefix with the provider's context cache."""
+
+    async def cached_content(self) -> str | None:
+        """Name of the provider cache holding the prefix, or None to send the full prompt."""
+        ...
+
+
+class NullContextCache:
+    """For providers without context caching: always send the full prompt."""
+
+    async def cached_content(self) -> str | None:
+        return None
+
+
+class GeminiContextCache:
+    """Keeps the system prompt in a Gemini cachedContents entry.
+
+    The entry is created on first use and recreated shortly before its TTL
+    runs out. A prefix estimated below min_tokens, the provider's minimum
+    cacheable size, is never registered. If creation fails the full prompt
+    is sent until the TTL has passed, when creation is tried again.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        system_instruction: str,
+        version: str,
+        ttl_seconds: float,
+        min_tokens: int = 0,
+        client_factory: Callable | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.model = model
+        self.system_instruction = system_instruction
+        self.version = version
+        self.ttl_seconds = ttl_seconds
+        self.cacheable = estimate_tokens(system_instruction) >= min_tokens
+        if not self.cacheable:
+            logger.info(
+                "prompt prefix %s is below the %d token cache minimum; sending it in full",
+                version, min_tokens,
+            )
+        self._client_factory = client_factory
+        self._clock = clock
+        self._name: str | None = None
+        self._expires_at = 0.0
+        self._retry_at = 0.0
+        self._creating = False
+
+    def _client(self):
+        if self._client_factory is not None:
+            return self._client_factory()
+        from google import genai
+        return genai.Client()
+
+    async def cached_content(self) -> str | None:
+        if not self.cacheable:
+            return None
+        now = self._clock()
+        if self._name is not None and now < self._expires_at - REFRESH_MARGIN_SECONDS:
+            return self._name
+        if self._creating or now < self._retry_at:
+            return None
+
+        self._creating = True
+        try:
+            from google.genai import types
+            cache = await self._client().aio.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"grow-assist-{self.version}",
+                    system_instruction=self.system_instruction,
+                    ttl=f"{int(self.ttl_seconds)}s",
+                ),
+            )
+        except Exception as exc:
+            logger.warning("context cache unavailable, sending the full prompt: %s", exc)
+            self._name = None
+            self._retry_at = now + self.ttl_seconds
+            return None
+        finally:
+            self._creating = False
+
+        logger.info("registered prompt prefix %s as %s", self.version, cache.name)
+        self._name = cache.name
+        self._expires_at = now + self.ttl_seconds
+        return self._name
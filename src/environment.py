@@ -0,0 +1,248 @@
+import numpy as np
+from .stages import STAGE_TARGETS, get_stage_targets
+from .summary import (
+    HUMIDITY_ALIASES,
+    TEMPERATURE_ALIASES,
+    detect_column,
+    guess_temperature_unit,
+    header_temperature_unit,
+    parse_number,
+)
+
+PPFD_ALIASES = {"ppfd", "par", "ppfd_umol", "light_ppfd", "ppfd_umol_m2_s"}
+
+# Lowest reasonable lights-on PPFD (µmol/m²/s) per stage before light is flagged as an issue.
+MIN_LIGHTS_ON_PPFD = {"seedling": 100, "vegetation": 400, "flowering": 600}
+
+# Share of readings that must sit inside a stage range before it counts as fine.
+IN_RANGE_THRESHOLD = 0.8
+
+# Magnus formula coefficients (Alduchov & Eskridge), valid for 0-60°C.
+MAGNUS_A = 17.27
+MAGNUS_B = 237.3
+MAGNUS_SVP_KPA = 0.6108
+
+
+def fahrenheit_to_celsius(temperature_f: np.ndarray) -> np.ndarray:
+    return (temperature_f - 32.0) * (5.0 / 9.0)
+
+
+def celsius_to_fahrenheit(temperature_c: np.ndarray) -> np.ndarray:
+    return temperature_c * (9.0 / 5.0) + 32.0
+
+
+def saturation_vapor_pressure(temperature_c: np.ndarray) -> np.ndarray:
+    """Saturation vapor pressure in kPa."""
+    return MAGNUS_SVP_KPA * np.exp(MAGNUS_A * temperature_c / (temperature_c + MAGNUS_B))
+
+
+def vapor_pressure_deficit(temperature_c: np.ndarray, humidity_pct: np.ndarray) -> np.ndarray:
+    """Air VPD in kPa."""
+    return saturation_vapor_pressure(temperature_c) * (1.0 - humidity_pct / 100.0)
+
+
+def dew_point(temperature_c: np.ndarray, humidity_pct: np.ndarray) -> np.ndarray:
+    """Dew point in °C."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = np.log(humidity_pct / 100.0) + MAGNUS_A * temperature_c / (MAGNUS_B + temperature_c)
+        return MAGNUS_B * gamma / (MAGNUS_A - gamma)
+
+
+def to_float_array(values: list[str | None]) -> np.ndarray:
+    """Convert CSV cells to a float array, with blanks and junk as NaN."""
+    raw = np.asarray([value or "nan" for value in values], dtype=str)
+    try:
+        return raw.astype(np.float64)
+    except ValueError:
+        parsed = [parse_number(value) for value in values]
+        return np.array([np.nan if value is None else value for value in parsed], dtype=np.float64)
+
+
+def detect_environment_columns(headers: list[str]) -> dict[str, str | None]:
+    """Find the temperature, humidity and PPFD columns in an upload's headers."""
+    return {
+        "temperature": detect_column(headers, TEMPERATURE_ALIASES),
+        "humidity": detect_column(headers, HUMIDITY_ALIASES),
+        "ppfd": detect_column(headers, PPFD_ALIASES),
+    }
+
+
+class EnvironmentMetrics:
+    """Vectorized VPD, dew point and time-in-range metrics over an upload.
+
+    Readings are fed in chunks with update(); only running totals are kept,
+    so the memory used does not depend on the number of rows.
+    """
+
+    def __init__(self, temperature_unit: str | None = None, columns: dict[str, str | None] | None = None):
+        self.temperature_unit = temperature_unit
+        self.columns = columns or {}
+        self.count = 0
+        self._sums: dict[str, float] = {}
+        self._minimums: dict[str, float] = {}
+        self._maximums: dict[str, float] = {}
+        self._counts: dict[str, int] = {}
+        self._in_range = {stage: np.zeros(4, dtype=np.int64) for stage in STAGE_TARGETS}
+
+    @classmethod
+    def from_headers(cls, headers: list[str]) -> "EnvironmentMetrics | None":
+        """Build metrics for an upload, or None when it lacks temperature or humidity."""
+        columns = detect_environment_columns(headers)
+        if columns["temperature"] is None or columns["humidity"] is None:
+            return None
+        return cls(header_temperature_unit(columns["temperature"]), columns)
+
+    def update(
+        self,
+        temperature: np.ndarray,
+        humidity: np.ndarray,
+        ppfd: np.ndarray | None = None,
+    ) -> dict[str, np.ndarray]:
+        """Fold a chunk of readings into the running totals.
+
+        Returns the per-row derived arrays for the chunk.
+        """
+        valid = ~(np.isnan(temperature) | np.isnan(humidity))
+        if self.temperature_unit is None:
+            self.temperature_unit = guess_temperature_unit(temperature[valid])
+
+        if self.temperature_unit == "C":
+            temperature_c = temperature
+            temperature_f = celsius_to_fahrenheit(temperature)
+        else:
+            temperature_f = temperature
+            temperature_c = fahrenheit_to_celsius(temperature)
+
+        derived = {
+            "temperature_f": temperature_f,
+            "temperature_c": temperature_c,
+            "humidity_pct": humidity,
+            "vpd_kpa": vapor_pressure_deficit(temperature_c, humidity),
+            "dew_point_c": dew_point(temperature_c, humidity),
+        }
+        if ppfd is not None:
+            derived["ppfd"] = ppfd
+            derived["ppfd_lights_on"] = np.where(ppfd > 0, ppfd, np.nan)
+
+        self.count += int(valid.sum())
+        for name, values in derived.items():
+            present = values[np.isfinite(values)]
+            if present.size == 0:
+                continue
+            self._sums[name] = self._sums.get(name, 0.0) + float(present.sum())
+            self._counts[name] = self._counts.get(name, 0) + int(present.size)
+            self._minimums[name] = min(self._minimums.get(name, np.inf), float(present.min()))
+            self._maximums[name] = max(self._maximums.get(name, -np.inf), float(present.max()))
+
+        vpd = derived["vpd_kpa"]
+        for stage, targets in STAGE_TARGETS.items():
+            in_vpd = valid & (vpd >= targets.vpd_kpa[0]) & (vpd <= targets.vpd_kpa[1])
+            in_temp = valid & (temperature_f >= targets.temperature_f[0]) & (temperature_f <= targets.temperature_f[1])
+            in_humidity = valid & (humidity >= targets.humidity_pct[0]) & (humidity <= targets.humidity_pct[1])
+            self._in_range[stage] += (
+                int(in_vpd.sum()),
+                int(in_temp.sum()),
+                int(in_humidity.sum()),
+                int((in_vpd & in_temp & in_humidity).sum()),
+            )
+
+        return derived
+
+    def mean(self, name: str) -> float | None:
+        count = self._counts.get(name)
+        return self._sums[name] / count if count else None
+
+    def minimum(self, name: str) -> float | None:
+        return self._minimums.get(name)
+
+    def maximum(self, name: str) -> float | None:
+        return self._maximums.get(name)
+
+    def stage_shares(self, growth_stage: str) -> dict[str, float]:
+        """Share of readings inside each of the stage's target ranges."""
+        counts = self._in_range[growth_stage.strip().lower()]
+        total = max(self.count, 1)
+        return {
+            "vpd": float(counts[0] / total),
+            "temperature": float(counts[1] / total),
+            "humidity": float(counts[2] / total),
+            "all": float(counts[3] / total),
+        }
+
+    def issues(self, growth_stage: str) -> list[str]:
+        """Name the out-of-range conditions for a stage, e.g. "humidity_high"."""
+        targets = get_stage_targets(growth_stage)
+        if targets is None or self.count == 0:
+            return []
+        shares = self.stage_shares(growth_stage)
+        checks = (
+            ("vpd", "vpd_kpa", targets.vpd_kpa),
+            ("temperature", "temperature_f", targets.temperature_f),
+            ("humidity", "humidity_pct", targets.humidity_pct),
+        )
+        issues = []
+        for label, name, (low, high) in checks:
+            if shares[label] >= IN_RANGE_THRESHOLD:
+                continue
+            mean = self.mean(name)
+            if mean > high:
+                issues.append(f"{label}_high")
+            elif mean < low:
+                issues.append(f"{label}_low")
+            else:
+                # Mean is in range but readings swing out of it; report the larger swing.
+                midpoint = (low + high) / 2
+                swings_high = self.maximum(name) - midpoint > midpoint - self.minimum(name)
+                issues.append(f"{label}_high" if swings_high else f"{label}_low")
+        lights_on = self.mean("ppfd_lights_on")
+        if lights_on is not None and lights_on < MIN_LIGHTS_ON_PPFD[growth_stage.strip().lower()]:
+            issues.append("light_low")
+        return issues
+
+    def summary(self, growth_stage: str | None = None) -> dict:
+        """Plain values for the template and prompt."""
+        result = {
+            "readings": self.count,
+            "temperature_unit": self.temperature_unit,
+            "vpd_mean": self.mean("vpd_kpa"),
+            "vpd_min": self.minimum("vpd_kpa"),
+            "vpd_max": self.maximum("vpd_kpa"),
+            "temperature_f_mean": self.mean("temperature_f"),
+            "temperature_c_mean": self.mean("temperature_c"),
+            "humidity_mean": self.mean("humidity_pct"),
+            "dew_point_c_mean": self.mean("dew_point_c"),
+            "ppfd_mean": self.mean("ppfd"),
+            "stage_shares": {stage: self.stage_shares(stage) for stage in STAGE_TARGETS},
+        }
+        if growth_stage and get_stage_targets(growth_stage):
+            result["growth_stage"] = growth_stage.strip().lower()
+            result["in_range"] = self.stage_shares(growth_stage)
+        return result
+
+    def render(self, growth_stage: str | None = None) -> str:
+        """Describe the computed metrics for the prompt."""
+        if self.count == 0:
+            return ""
+        lines = [f"\nComputed environment metrics ({self.count} readings with temperature and humidity):"]
+        lines.append(
+            f"- VPD: mean {self.mean('vpd_kpa'):.2f} kPa "
+            f"(min {self.minimum('vpd_kpa'):.2f}, max {self.maximum('vpd_kpa'):.2f})"
+        )
+        lines.append(
+            f"- Temperature: mean {self.mean('temperature_f'):.1f}°F / {self.mean('temperature_c'):.1f}°C"
+        )
+        lines.append(f"- Humidity: mean {self.mean('humidity_pct'):.1f}%")
+        dew = self.mean("dew_point_c")
+        if dew is not None:
+            lines.append(f"- Dew point: mean {dew:.1f}°C")
+        ppfd = self.mean("ppfd")
+        if ppfd is not None:
+            lines.append(f"- PPFD: mean {ppfd:.0f} µmol/m²/s")
+        for stage in STAGE_TARGETS:
+            shares = self.stage_shares(stage)
+            marker = " (selected stage)" if growth_stage and stage == growth_stage.strip().lower() else ""
+            lines.append(
+                f"- Time in {stage} ranges{marker}: VPD {shares['vpd']:.0%}, temperature "
+                f"{shares['temperature']:.0%}, humidity {shares['humidity']:.0%}, all three {shares['all']:.0%}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,311 @@
+"""Offline evals: replay recorded /analyze requests and score the answers.
+
+Record a corpus by running the app with GROW_ASSIST_EVAL_RECORD=true; every
+model-produced analysis is appended to GROW_ASSIST_EVAL_CORPUS_PATH. Then run
+`uv run python -m src.evals` (add --help for options) to rebuild each prompt
+with the current SYSTEM_MESSAGE and catalog, send it to a model in parallel,
+and report answer quality next to latency and throughput.
+"""
+import argparse
+import asyncio
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Protocol
+from pydantic import ValidationError
+from . import config
+from .catalog import ProductCatalog, ProductIndex
+from .environment import EnvironmentMetrics
+from .models import AnalysisResponse
+from .prompts import SYSTEM_MESSAGE_VERSION, build_messages
+from .stages import get_stage_targets
+from .telemetry import percentile
+
+# A VPD reading quoted in an answer, e.g. "1.45 kPa".
+VPD_VALUE = re.compile(r"(\d+(?:\.\d+)?)\s*kpa", re.IGNORECASE)
+# A claim about the direction of VPD, e.g. "VPD is too high".
+VPD_CLAIM = re.compile(r"\bvpd\b[^.]*?\b(too high|too low|high|low|elevated)\b", re.IGNORECASE)
+# Quoted VPD values may be this far outside the observed range (rounding).
+VPD_TOLERANCE_KPA = 0.15
+
+_record_lock = threading.Lock()
+
+
+@dataclass
+class EvalCase:
+    """One recorded /analyze request and the answer the model gave."""
+    growth_stage: str
+    parsed_data: str
+    issues: list[str]
+    metrics: dict | None
+    response: dict | None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    prompt_version: str | None = None
+    recorded_at: float = field(default_factory=time.time)
+
+
+def record_case(
+    path: str | Path,
+    growth_stage: str,
+    parsed_data: str,
+    metrics: EnvironmentMetrics | None,
+    response: AnalysisResponse,
+) -> None:
+    """Append an analysis to the eval corpus at path."""
+    case = EvalCase(
+        growth_stage=growth_stage,
+        parsed_data=parsed_data,
+        issues=metrics.issues(growth_stage) if metrics is not None and metrics.count else [],
+        metrics=metrics.summary(growth_stage) if metrics is not None and metrics.count else None,
+        response=response.model_dump(),
+        prompt_version=SYSTEM_MESSAGE_VERSION,
+    )
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    line = json.dumps(asdict(case)) + "\n"
+    with _record_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def load_corpus(path: str | Path) -> list[EvalCase]:
+    with open(path, encoding="utf-8") as f:
+        return [EvalCase(**json.loads(line)) for line in f if line.strip()]
+
+
+class EvalModel(Protocol):
+    """Produces an answer for a case from its rebuilt prompt."""
+
+    async def analyze(self, case: EvalCase, messages: list) -> AnalysisResponse:
+        ...
+
+
+class RecordedModel:
+    """Offline stand-in that answers with each case's recorded response.
+
+    Scores the recorded answers themselves; with latency set it also stands
+    in for the model's timing when exercising the harness.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    async def analyze(self, case: EvalCase, messages: list) -> AnalysisResponse:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return AnalysisResponse.model_validate(case.response)
+
+
+class StructuredModel:
+    """Any structured-output chat model, e.g. main.get_structured_model() or FakeChatModel's."""
+
+    def __init__(self, model):
+        self.model = model
+
+    async def analyze(self, case: EvalCase, messages: list) -> AnalysisResponse:
+        return await self.model.ainvoke(messages)
+
+
+@dataclass
+class CaseResult:
+    id: str
+    latency_ms: float
+    valid: bool
+    error: str | None = None
+    has_product: bool = False
+    product_links_correct: float | None = None
+    vpd_agrees: bool | None = None
+
+
+@dataclass
+class EvalReport:
+    cases: int
+    errors: int
+    valid_rate: float
+    product_presence_rate: float
+    product_link_accuracy: float | None
+    vpd_agreement_rate: float | None
+    p50_ms: float
+    p95_ms: float
+    cases_per_second: float
+    results: list[CaseResult] = field(default_factory=list)
+
+
+def response_text(response: AnalysisResponse) -> str:
+    parts = [response.summary]
+    for recommendation in response.recommendations:
+        parts += [recommendation.title, recommendation.description]
+    return "\n".join(parts)
+
+
+def vpd_agreement(case: EvalCase, response: AnalysisResponse) -> bool | None:
+    """Whether the answer's VPD statements agree with the VPD computed from the upload.
+
+    Quoted kPa values must lie within the observed VPD range or the stage's
+    target range, and any claim that VPD is high or low must match the
+    computed issue. None when the upload had no VPD to compare with.
+    """
+    metrics = case.metrics or {}
+    if metrics.get("vpd_min") is None:
+        return None
+    targets = get_stage_targets(case.growth_stage)
+    text = response_text(response)
+
+    ranges = [(metrics["vpd_min"] - VPD_TOLERANCE_KPA, metrics["vpd_max"] + VPD_TOLERANCE_KPA)]
+    if targets is not None:
+        ranges.append(targets.vpd_kpa)
+    for match in VPD_VALUE.finditer(text):
+        value = float(match.group(1))
+        if not any(low <= value <= high for low, high in ranges):
+            return False
+
+    expected = "high" if "vpd_high" in case.issues else "low" if "vpd_low" in case.issues else None
+    for match in VPD_CLAIM.finditer(text):
+        claimed = "low" if match.group(1).lower().endswith("low") else "high"
+        if expected is not None and claimed != expected:
+            return False
+        if expected is None and match.group(1).lower().startswith("too"):
+            return False
+    return True
+
+
+def score(case: EvalCase, response: AnalysisResponse, index: ProductIndex) -> CaseResult:
+    products = [r.product for r in response.recommendations if r.product is not None]
+    return CaseResult(
+        id=case.id,
+        latency_ms=0.0,
+        valid=True,
+        has_product=bool(products),
+        product_links_correct=(
+            sum(index.by_link(product.url) is not None for product in products) / len(products)
+            if products else None
+        ),
+        vpd_agrees=vpd_agreement(case, response),
+    )
+
+
+async def run_case(
+    case: EvalCase,
+    model: EvalModel,
+    catalog: ProductCatalog,
+    semaphore: asyncio.Semaphore,
+) -> CaseResult:
+    messages = build_messages(
+        case.growth_stage,
+        case.parsed_data,
+        catalog.products_for_issues(case.issues, k=config.PROMPT_PRODUCT_COUNT),
+    )
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            response = await model.analyze(case, messages)
+            if not isinstance(response, AnalysisResponse):
+                response = AnalysisResponse.model_validate(response)
+        except ValidationError as exc:
+            result = CaseResult(id=case.id, latency_ms=0.0, valid=False, error=f"invalid: {exc.error_count()} errors")
+        except Exception as exc:
+            result = CaseResult(id=case.id, latency_ms=0.0, valid=False, error=repr(exc))
+        else:
+            result = score(case, response, catalog.index)
+        result.latency_ms = (time.perf_counter() - start) * 1000
+    return result
+
+
+def _rate(values: list) -> float | None:
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else None
+
+
+async def run_evals(
+    cases: list[EvalCase],
+    model: EvalModel,
+    catalog: ProductCatalog,
+    concurrency: int = 8,
+) -> EvalReport:
+    """Replay every case against model, at most `concurrency` at a time, and aggregate the scores."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run_case(case, model, catalog, semaphore) for case in cases))
+    elapsed = time.perf_counter() - started
+
+    latencies = [result.latency_ms for result in results]
+    return EvalReport(
+        cases=len(results),
+        errors=sum(result.error is not None for result in results),
+        valid_rate=_rate([result.valid for result in results]) or 0.0,
+        product_presence_rate=_rate([result.has_product for result in results]) or 0.0,
+        product_link_accuracy=_rate([result.product_links_correct for result in results]),
+        vpd_agreement_rate=_rate([result.vpd_agrees for result in results]),
+        p50_ms=percentile(latencies, 50),
+        p95_ms=percentile(latencies, 95),
+        cases_per_second=len(results) / elapsed if elapsed else 0.0,
+        results=list(results),
+    )
+
+
+def format_report(report: EvalReport) -> str:
+    def pct(value: float | None) -> str:
+        return "n/a" if value is None else f"{value:.1%}"
+
+    return "\n".join([
+        f"cases              {report.cases} ({report.errors} errors)",
+        f"valid responses    {pct(report.valid_rate)}",
+        f"with a product     {pct(report.product_presence_rate)}",
+        f"product links ok   {pct(report.product_link_accuracy)}",
+        f"VPD agreement      {pct(report.vpd_agreement_rate)}",
+        f"latency p50/p95    {report.p50_ms:.1f} / {report.p95_ms:.1f} ms",
+        f"throughput         {report.cases_per_second:.1f} cases/s",
+    ])
+
+
+def make_model(name: str, latency: float) -> EvalModel:
+    if name == "recorded":
+        return RecordedModel(latency=latency)
+    if name == "fake":
+        from .fake_llm import FakeChatModel
+        return StructuredModel(FakeChatModel(latency=latency).with_structured_output(AnalysisResponse))
+    from . import main
+    return StructuredModel(main.get_structured_model())
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=config.EVAL_CORPUS_PATH, help="Recorded cases (JSON lines)")
+    parser.add_argument("--model", choices=("recorded", "fake", "live"), default="recorded",
+                        help="recorded: the recorded answers; fake: the offline fake model; live: the configured model")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated latency per call for recorded/fake")
+    parser.add_argument("--concurrency", type=int, default=8, help="Cases replayed at once")
+    parser.add_argument("--limit", type=int, help="Replay only the first N cases")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON to this path")
+    parser.add_argument("--min-valid-rate", type=float, help="Exit non-zero below this share of valid answers")
+    parser.add_argument("--min-vpd-agreement", type=float, help="Exit non-zero below this VPD agreement rate")
+    parser.add_argument("--max-p95-ms", type=float, help="Exit non-zero if p95 latency exceeds this")
+    args = parser.parse_args(argv)
+
+    cases = load_corpus(args.corpus)[:args.limit]
+    catalog = ProductCatalog(Path(__file__).resolve().parent / "product_links.csv")
+    report = asyncio.run(run_evals(cases, make_model(args.model, args.latency), catalog, args.concurrency))
+    print(format_report(report))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(asdict(report), f, indent=2)
+
+    failures = []
+    if args.min_valid_rate is not None and report.valid_rate < args.min_valid_rate:
+        failures.append(f"valid rate {report.valid_rate:.1%} below {args.min_valid_rate:.1%}")
+    if (args.min_vpd_agreement is not None and report.vpd_agreement_rate is not None
+            and report.vpd_agreement_rate < args.min_vpd_agreement):
+        failures.append(f"VPD agreement {report.vpd_agreement_rate:.1%} below {args.min_vpd_agreement:.1%}")
+    if args.max_p95_ms is not None and report.p95_ms > args.max_p95_ms:
+        failures.append(f"p95 {report.p95_ms:.1f}ms above {args.max_p95_ms}ms")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
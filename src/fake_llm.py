@@ -0,0 +1,125 @@
+import asyncio
+import random
+import re
+import time
+from langchain_core.exceptions import ModelAPIError
+from langchain_core.messages import AIMessage, AIMessageChunk
+from .models import AnalysisResponse, ProductLink, Recommendation
+from .rules import FALLBACK_PRODUCT
+
+URL_PATTERN = re.compile(r"- (?P<name>[^\n(]+?) \((?P<price>[^)]*)\) \[[^\]]*\]: (?P<url>https?://\S+)")
+
+
+class FakeLLMError(ModelAPIError):
+    """Raised by the fake model to simulate a transient upstream (5xx) failure."""
+
+
+def _message_text(messages) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(getattr(message, "content", str(message)) for message in messages)
+
+
+class FakeChatModel:
+    """Offline stand-in for ChatGoogleGenerativeAI with configurable latency and failures.
+
+    Implements the parts of the chat model interface the app uses: invoke,
+    ainvoke, astream and with_structured_output.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int | None = None,
+        tokens_per_second: float = 200.0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def _maybe_fail(self) -> None:
+        if self._random.random() < self.failure_rate:
+            raise FakeLLMError("Simulated LLM failure")
+
+    def _reply(self, messages) -> str:
+        text = _message_text(messages)
+        stage = re.search(r"Growth Stage: (\w+)", text)
+        return (
+            f"Your {stage.group(1) if stage else 'grow'} environment looks mostly stable. "
+            "High Impact: keep VPD inside the target range by adjusting humidity. "
+            "Medium Impact: check airflow under the canopy."
+        )
+
+    def invoke(self, messages, **kwargs) -> AIMessage:
+        self.calls += 1
+        time.sleep(self._delay())
+        self._maybe_fail()
+        return AIMessage(self._reply(messages))
+
+    async def ainvoke(self, messages, **kwargs) -> AIMessage:
+        self.calls += 1
+        await asyncio.sleep(self._delay())
+        self._maybe_fail()
+        return AIMessage(self._reply(messages))
+
+    async def astream(self, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self._delay())
+        self._maybe_fail()
+        for word in self._reply(messages).split(" "):
+            await asyncio.sleep(1 / self.tokens_per_second if self.tokens_per_second else 0)
+            yield AIMessageChunk(content=word + " ")
+
+    def with_structured_output(self, schema) -> "FakeStructuredModel":
+        return FakeStructuredModel(self)
+
+
+class FakeStructuredModel:
+    """Structured-output view of FakeChatModel that returns a valid AnalysisResponse."""
+
+    def __init__(self, model: FakeChatModel):
+        self.model = model
+
+    def _response(self, messages) -> AnalysisResponse:
+        text = _message_text(messages)
+        match = URL_PATTERN.search(text)
+        product = (
+            ProductLink(name=match["name"].strip(), url=match["url"], price_range=match["price"] or None)
+            if match else FALLBACK_PRODUCT
+        )
+        return AnalysisResponse(
+            summary=self.model._reply(messages),
+            recommendations=[
+                Recommendation(
+                    title="Dial In Your VPD",
+                    description="Adjust humidity so VPD stays in the target range for this stage.",
+                    priority="high",
+                    product=product,
+                ),
+                Recommendation(
+                    title="Improve Airflow",
+                    description="Add gentle airflow under the canopy to even out conditions.",
+                    priority="medium",
+                ),
+            ],
+        )
+
+    def invoke(self, messages, **kwargs) -> AnalysisResponse:
+        self.model.calls += 1
+        time.sleep(self.model._delay())
+        self.model._maybe_fail()
+        return self._response(messages)
+
+    async def ainvoke(self, messages, **kwargs) -> AnalysisResponse:
+        self.model.calls += 1
+        await asyncio.sleep(self.model._delay())
+        self.model._maybe_fail()
+        return self._response(messages)
@@ -0,0 +1,61 @@
+from collections import Counter
+from .catalog import ProductCatalog, ProductIndex
+from .models import AnalysisResponse, ProductLink, Recommendation
+from .rules import product_link
+
+
+def ground_link(product: ProductLink, index: ProductIndex, threshold: float) -> tuple[ProductLink | None, str]:
+    """Resolve a recommended product against the catalog.
+
+    Returns the link to keep and its outcome: "valid" when the URL is in the
+    catalog, "snapped" when the name matched an entry whose name, URL and
+    price replace the model's, or "dropped" when nothing matched.
+    """
+    if index.by_link(product.url) is not None:
+        return product, "valid"
+    match = index.match_name(product.name, threshold)
+    if match is None:
+        return None, "dropped"
+    return product_link(match), "snapped"
+
+
+def ground_products(
+    response: AnalysisResponse,
+    catalog: ProductCatalog,
+    threshold: float,
+) -> tuple[AnalysisResponse, Counter]:
+    """Point every recommended product at a real catalog entry, or drop it.
+
+    Recommendations themselves are always kept. Since an answer must carry at
+    least one product, if every link is dropped the first recommendation that
+    had one gets the catalog product its text retrieves instead ("searched").
+    Returns the grounded response (the same object when nothing changed) and
+    the count of links per outcome. An empty catalog leaves the response as is.
+    """
+    outcomes: Counter = Counter()
+    if not catalog.index.by_url:
+        return response, outcomes
+
+    recommendations: list[Recommendation] = []
+    for recommendation in response.recommendations:
+        if recommendation.product is not None:
+            product, outcome = ground_link(recommendation.product, catalog.index, threshold)
+            outcomes[outcome] += 1
+            if product is not recommendation.product:
+                recommendation = recommendation.model_copy(update={"product": product})
+        recommendations.append(recommendation)
+
+    if not outcomes["snapped"] and not outcomes["dropped"]:
+        return response, outcomes
+
+    if not any(recommendation.product is not None for recommendation in recommendations):
+        first = next(i for i, original in enumerate(response.recommendations) if original.product is not None)
+        recommendation = recommendations[first]
+        found = (
+            catalog.search(f"{recommendation.title} {recommendation.description}", k=1)
+            or catalog.products_for_issues([], k=1)
+        )
+        recommendations[first] = recommendation.model_copy(update={"product": product_link(found[0])})
+        outcomes["dropped"] -= 1
+        outcomes["searched"] += 1
+    return response.model_copy(update={"recommendations": recommendations}), +outcomes
@@ -0,0 +1,455 @@
+import calendar
+import csv
+import gzip
+import io
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import BinaryIO, Iterable, Iterator, Literal
+import numpy as np
+from . import config
+from .environment import EnvironmentMetrics, celsius_to_fahrenheit, detect_environment_columns, to_float_array
+from .summary import (
+    TIMESTAMP_ALIASES,
+    EnvironmentDigest,
+    detect_column,
+    guess_temperature_unit,
+    header_temperature_unit,
+    parse_number,
+    parse_timestamp,
+)
+
+try:
+    import zstandard
+except ImportError:  # optional: install grow-assist[zstd] for .csv.zst uploads
+    zstandard = None
+
+# pyarrow (optional: install grow-assist[columnar] for Parquet/Arrow uploads)
+# is imported by load_pyarrow on the first columnar upload, since it costs
+# more to import than the rest of this module put together.
+pa = pc = pq = None
+
+UploadFormat = Literal["csv", "gzip", "zstd", "parquet", "arrow_file", "arrow_stream"]
+
+# Leading bytes that identify each non-CSV format.
+SIGNATURES: tuple[tuple[bytes, UploadFormat], ...] = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"PAR1", "parquet"),
+    (b"ARROW1", "arrow_file"),
+    (b"\xff\xff\xff\xff", "arrow_stream"),
+)
+
+
+COLUMNAR_FORMATS = ("parquet", "arrow_file", "arrow_stream")
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size or row limits."""
+
+
+class UnsupportedUploadError(Exception):
+    """Raised for upload formats this server can't read, e.g. without the optional dependency."""
+
+
+class InvalidUploadError(Exception):
+    """Raised when a compressed or columnar upload is corrupt."""
+
+
+class ByteLimitedReader(io.RawIOBase):
+    """Raw reader that raises UploadTooLargeError once max_bytes have been read."""
+
+    def __init__(self, source: BinaryIO, max_bytes: int):
+        self.source = source
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.source.read(len(buffer))
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {self.max_bytes} byte limit.")
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def settle_temperature_unit(
+    digest: EnvironmentDigest,
+    metrics: EnvironmentMetrics | None,
+    temperature: np.ndarray | None,
+) -> None:
+    """Guess the upload's temperature unit once, so the digest and the metrics agree on it."""
+    if temperature is None or digest.temperature_unit is not None:
+        return
+    digest.temperature_unit = guess_temperature_unit(temperature)
+    if metrics is not None:
+        metrics.temperature_unit = digest.temperature_unit
+
+
+def parse_csv_stream(
+    lines: Iterable[str],
+    growth_stage: str | None = None,
+    max_rows: int | None = None,
+) -> tuple[str, EnvironmentMetrics | None]:
+    """Parse CSV lines into prompt text and server-side environment metrics.
+
+    Rows are consumed METRICS_CHUNK_ROWS at a time into running aggregates,
+    so memory stays flat regardless of how many rows the upload has. Large files are condensed
+    into a statistical digest; see EnvironmentDigest.
+    """
+    csv_reader = csv.DictReader(lines)
+    headers = list(csv_reader.fieldnames or [])
+    digest = EnvironmentDigest(
+        headers,
+        growth_stage=growth_stage,
+        raw_row_limit=config.DIGEST_RAW_ROW_LIMIT,
+    )
+    metrics = EnvironmentMetrics.from_headers(headers)
+    chunk: list[dict[str, str]] = []
+
+    def column(header: str | None) -> np.ndarray | None:
+        return to_float_array([row.get(header) for row in chunk]) if header else None
+
+    def flush_chunk():
+        settle_temperature_unit(digest, metrics, column(digest.temperature_column))
+        for row in chunk:
+            digest.add_row(row)
+        if metrics is not None:
+            metrics.update(
+                column(metrics.columns["temperature"]),
+                column(metrics.columns["humidity"]),
+                column(metrics.columns.get("ppfd")),
+            )
+        chunk.clear()
+
+    row_count = 0
+    for row in csv_reader:
+        if max_rows is not None and row_count >= max_rows:
+            raise UploadTooLargeError(f"Upload exceeds the {max_rows} row limit.")
+        row_count += 1
+        chunk.append(row)
+        if len(chunk) >= config.METRICS_CHUNK_ROWS:
+            flush_chunk()
+
+    if chunk:
+        flush_chunk()
+
+    prompt_data = digest.render()
+    if metrics is not None and metrics.count:
+        prompt_data += "\n" + metrics.render(growth_stage)
+    return prompt_data, metrics
+
+
+def detect_upload_format(head: bytes) -> UploadFormat:
+    """Identify an upload from its first bytes; anything unrecognized is treated as CSV."""
+    for signature, upload_format in SIGNATURES:
+        if head.startswith(signature):
+            return upload_format
+    return "csv"
+
+
+def column_to_floats(column) -> np.ndarray:
+    """Convert an Arrow column to a float64 array with NaN for nulls and non-numbers."""
+    if pa.types.is_integer(column.type) or pa.types.is_floating(column.type) or pa.types.is_decimal(column.type):
+        return column.cast(pa.float64()).to_numpy(zero_copy_only=False)
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        parsed = (parse_number(value) for value in column.to_pylist())
+        return np.array([np.nan if value is None else value for value in parsed], dtype=np.float64)
+    return np.full(len(column), np.nan)
+
+
+def column_to_hours(column) -> np.ndarray:
+    """Hour of day for each value of an Arrow timestamp column, -1 where unknown."""
+    if pa.types.is_timestamp(column.type):
+        return pc.hour(column).fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int64)
+    if pa.types.is_date(column.type):
+        # Whole days carry no time of day.
+        return np.full(len(column), -1, dtype=np.int64)
+    hours = []
+    for value in column.to_pylist():
+        timestamp = value if isinstance(value, datetime) else parse_timestamp(None if value is None else str(value))
+        hours.append(timestamp.hour if timestamp else -1)
+    return np.array(hours, dtype=np.int64)
+
+
+def column_to_epoch_seconds(column) -> list[int | None]:
+    """Unix seconds for each value of an Arrow timestamp-like column, None where unknown."""
+    if pa.types.is_timestamp(column.type):
+        seconds = pc.cast(column, pa.timestamp("s", tz=column.type.tz), safe=False).cast(pa.int64())
+        return seconds.to_pylist()
+    timestamps = []
+    for value in column.to_pylist():
+        timestamp = value if isinstance(value, datetime) else parse_timestamp(None if value is None else str(value))
+        timestamps.append(to_epoch_seconds(timestamp))
+    return timestamps
+
+
+def parse_record_batches(
+    headers: list[str],
+    batches: Iterable,
+    growth_stage: str | None = None,
+    max_rows: int | None = None,
+) -> tuple[str, EnvironmentMetrics | None]:
+    """Parse Arrow record batches into prompt text and environment metrics.
+
+    The columnar counterpart of parse_csv_stream: each batch goes into
+    EnvironmentDigest.add_columns and EnvironmentMetrics.update as typed
+    arrays, without a round trip through text.
+    """
+    digest = EnvironmentDigest(headers, growth_stage=growth_stage, raw_row_limit=config.DIGEST_RAW_ROW_LIMIT)
+    metrics = EnvironmentMetrics.from_headers(headers)
+    timestamp_column = digest.timestamp_column
+
+    for batch in batches:
+        if max_rows is not None and digest.row_count + batch.num_rows > max_rows:
+            raise UploadTooLargeError(f"Upload exceeds the {max_rows} row limit.")
+        columns = {
+            name: column_to_floats(batch.column(name))
+            for name in batch.schema.names if name != timestamp_column
+        }
+        hours = timestamps = None
+        if timestamp_column is not None:
+            column = batch.column(timestamp_column)
+            hours = column_to_hours(column)
+            needed = max(0, digest.raw_row_limit - digest.row_count)
+            timestamps = ["" if value is None else str(value) for value in column.slice(0, needed).to_pylist()]
+        settle_temperature_unit(digest, metrics, columns.get(digest.temperature_column))
+        digest.add_columns(columns, hours=hours, timestamps=timestamps)
+        if metrics is not None:
+            metrics.update(
+                columns[metrics.columns["temperature"]],
+                columns[metrics.columns["humidity"]],
+                columns[metrics.columns["ppfd"]] if metrics.columns.get("ppfd") else None,
+            )
+
+    prompt_data = digest.render()
+    if metrics is not None and metrics.count:
+        prompt_data += "\n" + metrics.render(growth_stage)
+    return prompt_data, metrics
+
+
+def load_pyarrow() -> bool:
+    """Import pyarrow on first use; False when it is not installed."""
+    global pa, pc, pq
+    if pa is None:
+        try:
+            import pyarrow.compute
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError:
+            return False
+        pa, pc, pq = pyarrow, pyarrow.compute, pyarrow.parquet
+    return True
+
+
+def open_record_batches(source: BinaryIO, upload_format: UploadFormat) -> tuple[list[str], Iterable]:
+    """Open a Parquet or Arrow IPC upload as column names and batches of METRICS_CHUNK_ROWS rows."""
+    if not load_pyarrow():
+        raise UnsupportedUploadError("Parquet and Arrow uploads need pyarrow (install grow-assist[columnar]).")
+    if upload_format == "parquet":
+        parquet = pq.ParquetFile(source)
+        return parquet.schema_arrow.names, parquet.iter_batches(batch_size=config.METRICS_CHUNK_ROWS)
+    if upload_format == "arrow_file":
+        reader = pa.ipc.open_file(source)
+        return reader.schema.names, (reader.get_batch(i) for i in range(reader.num_record_batches))
+    reader = pa.ipc.open_stream(source)
+    return reader.schema.names, reader
+
+
+@contextmanager
+def upload_read_errors(upload_format: UploadFormat):
+    """Turn decoder errors from corrupt compressed or columnar uploads into InvalidUploadError."""
+    try:
+        yield
+    except (EOFError, gzip.BadGzipFile, zlib.error) as exc:
+        raise InvalidUploadError(f"Could not decompress {upload_format} upload: {exc}") from exc
+    except Exception as exc:
+        if zstandard is not None and isinstance(exc, zstandard.ZstdError):
+            raise InvalidUploadError(f"Could not decompress {upload_format} upload: {exc}") from exc
+        if pa is not None and isinstance(exc, pa.ArrowException):
+            raise InvalidUploadError(f"Could not read {upload_format} upload: {exc}") from exc
+        raise
+
+
+def decompress_stream(source: BinaryIO, upload_format: UploadFormat) -> BinaryIO:
+    """Wrap a gzip or zstd upload in a streaming decompressor capped at MAX_DECOMPRESSED_BYTES."""
+    if upload_format == "gzip":
+        stream = gzip.GzipFile(fileobj=source)
+    elif zstandard is None:
+        raise UnsupportedUploadError("Zstandard uploads need zstandard (install grow-assist[zstd]).")
+    else:
+        stream = zstandard.ZstdDecompressor().stream_reader(source)
+    return io.BufferedReader(ByteLimitedReader(stream, config.MAX_DECOMPRESSED_BYTES))
+
+
+def open_upload(file: BinaryIO, max_bytes: int) -> tuple[UploadFormat, BinaryIO]:
+    """Detect an upload's format from its first bytes and open it for reading.
+
+    CSV, compressed or not, comes back as a (decompressing) byte stream;
+    Parquet and Arrow IPC files, which keep their schema in a footer, as a
+    random-access file.
+    """
+    reader = io.BufferedReader(ByteLimitedReader(file, max_bytes))
+    upload_format = detect_upload_format(reader.peek(8)[:8])
+    if upload_format in ("parquet", "arrow_file"):
+        if not file.seekable():
+            return upload_format, io.BytesIO(reader.read())
+        if file.seek(0, io.SEEK_END) > max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit.")
+        file.seek(0)
+        return upload_format, file
+    if upload_format in ("gzip", "zstd"):
+        return upload_format, decompress_stream(reader, upload_format)
+    return upload_format, reader
+
+
+def parse_upload_file(
+    file: BinaryIO,
+    growth_stage: str | None = None,
+    max_bytes: int | None = None,
+    max_rows: int | None = None,
+) -> tuple[str, EnvironmentMetrics | None]:
+    """Parse an upload in any supported format into prompt text and environment metrics.
+
+    CSV is stream-decoded, through a streaming gzip or zstd decompressor when
+    the upload is compressed. Parquet and Arrow IPC are read as typed
+    columns; see parse_record_batches.
+    """
+    max_bytes = config.MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    max_rows = config.MAX_UPLOAD_ROWS if max_rows is None else max_rows
+    upload_format, source = open_upload(file, max_bytes)
+    with upload_read_errors(upload_format):
+        if upload_format in COLUMNAR_FORMATS:
+            headers, batches = open_record_batches(source, upload_format)
+            return parse_record_batches(headers, batches, growth_stage, max_rows=max_rows)
+        text = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+        return parse_csv_stream(text, growth_stage, max_rows=max_rows)
+
+
+@dataclass
+class ReadingBatch:
+    """Timestamped readings from an upload, normalized to °F, with NaN for missing values."""
+    timestamps: np.ndarray
+    temperature_f: np.ndarray
+    humidity_pct: np.ndarray
+    ppfd: np.ndarray
+    skipped: int = 0
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+def to_epoch_seconds(timestamp: datetime | None) -> int | None:
+    """Unix seconds for a timestamp; naive timestamps are taken as UTC so wall-clock hours are kept."""
+    if timestamp is None:
+        return None
+    if timestamp.tzinfo is None:
+        return calendar.timegm(timestamp.timetuple())
+    return int(timestamp.timestamp())
+
+
+def _make_reading_batch(
+    timestamps: list[int | None],
+    temperature: np.ndarray,
+    humidity: np.ndarray,
+    ppfd: np.ndarray | None,
+    temperature_unit: str | None,
+) -> ReadingBatch:
+    known = np.array([timestamp is not None for timestamp in timestamps], dtype=bool)
+    if temperature_unit == "C":
+        temperature = celsius_to_fahrenheit(temperature)
+    return ReadingBatch(
+        timestamps=np.array([timestamp for timestamp in timestamps if timestamp is not None], dtype=np.int64),
+        temperature_f=temperature[known],
+        humidity_pct=humidity[known],
+        ppfd=ppfd[known] if ppfd is not None else np.full(int(known.sum()), np.nan),
+        skipped=int((~known).sum()),
+    )
+
+
+def read_reading_batches(
+    file: BinaryIO,
+    max_bytes: int | None = None,
+    max_rows: int | None = None,
+) -> Iterator[ReadingBatch]:
+    """Read timestamped temperature, humidity and PPFD readings from an upload of any supported format.
+
+    Yields batches of up to METRICS_CHUNK_ROWS rows. Rows without a
+    parseable timestamp can't be stored and are counted in skipped.
+    """
+    max_bytes = config.MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    max_rows = config.MAX_UPLOAD_ROWS if max_rows is None else max_rows
+    upload_format, source = open_upload(file, max_bytes)
+
+    with upload_read_errors(upload_format):
+        if upload_format in COLUMNAR_FORMATS:
+            headers, batches = open_record_batches(source, upload_format)
+        else:
+            rows = csv.DictReader(io.TextIOWrapper(source, encoding="utf-8-sig", newline=""))
+            headers = list(rows.fieldnames or [])
+
+        columns = detect_environment_columns(headers)
+        timestamp_column = detect_column(headers, TIMESTAMP_ALIASES)
+        if timestamp_column is None or columns["temperature"] is None or columns["humidity"] is None:
+            raise InvalidUploadError("Readings need timestamp, temperature and humidity columns.")
+        temperature_unit = header_temperature_unit(columns["temperature"])
+
+        def unit_for(temperature: np.ndarray) -> str | None:
+            nonlocal temperature_unit
+            if temperature_unit is None:
+                temperature_unit = guess_temperature_unit(temperature)
+            return temperature_unit
+
+        total = 0
+        if upload_format in COLUMNAR_FORMATS:
+            for batch in batches:
+                total += batch.num_rows
+                if total > max_rows:
+                    raise UploadTooLargeError(f"Upload exceeds the {max_rows} row limit.")
+                temperature = column_to_floats(batch.column(columns["temperature"]))
+                yield _make_reading_batch(
+                    column_to_epoch_seconds(batch.column(timestamp_column)),
+                    temperature,
+                    column_to_floats(batch.column(columns["humidity"])),
+                    column_to_floats(batch.column(columns["ppfd"])) if columns["ppfd"] else None,
+                    unit_for(temperature),
+                )
+            return
+
+        chunk: list[dict[str, str]] = []
+
+        def flush() -> ReadingBatch:
+            temperature = to_float_array([row.get(columns["temperature"]) for row in chunk])
+            batch = _make_reading_batch(
+                [to_epoch_seconds(parse_timestamp(row.get(timestamp_column))) for row in chunk],
+                temperature,
+                to_float_array([row.get(columns["humidity"]) for row in chunk]),
+                to_float_array([row.get(columns["ppfd"]) for row in chunk]) if columns["ppfd"] else None,
+                unit_for(temperature),
+            )
+            chunk.clear()
+            return batch
+
+        for row in rows:
+            total += 1
+            if total > max_rows:
+                raise UploadTooLargeError(f"Upload exceeds the {max_rows} row limit.")
+            chunk.append(row)
+            if len(chunk) >= config.METRICS_CHUNK_ROWS:
+                yield flush()
+        if chunk:
+            yield flush()
+
+
+def parse_upload(file_content: str, growth_stage: str | None = None) -> tuple[str, EnvironmentMetrics | None]:
+    """Parse CSV file content into prompt text and server-side environment metrics."""
+    return parse_csv_stream(io.StringIO(file_content, newline=""), growth_stage)
+
+
+def parse_csv_data(file_content: str, growth_stage: str | None = None) -> str:
+    """Parse CSV file content and format it as a readable string."""
+    return parse_upload(file_content, growth_stage)[0]
@@ -0,0 +1,325 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Literal
+from .concurrency import process_alive
+from .models import AnalysisResponse
+
+logger = logging.getLogger(__name__)
+
+JobState = Literal["queued", "running", "succeeded", "failed"]
+TERMINAL_STATES = ("succeeded", "failed")
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler for failures that retrying cannot fix."""
+
+
+@dataclass
+class Job:
+    """A queued analysis and its outcome."""
+    growth_stage: str
+    payload: bytes | None
+    filename: str | None = None
+    client: str | None = None
+    # Process id of the worker running the job.
+    owner: int | None = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobState = "queued"
+    attempts: int = 0
+    result: AnalysisResponse | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+
+class MemoryJobStore:
+    """Keeps jobs in process memory; they are lost on restart.
+
+    Finished jobs are kept for ttl_seconds, and at most max_finished of them,
+    so their results can still be polled without the store growing forever.
+    """
+
+    def __init__(self, max_finished: int = 1000, ttl_seconds: float = 3600.0):
+        self.max_finished = max_finished
+        self.ttl_seconds = ttl_seconds
+        self._jobs: dict[str, Job] = {}
+        # Finished job ids, oldest first.
+        self._finished: OrderedDict[str, float] = OrderedDict()
+        # Reentrant because claim() and requeue_orphans() save while holding it.
+        self._lock = threading.RLock()
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            job.updated_at = time.time()
+            self._jobs[job.id] = job
+            if job.status in TERMINAL_STATES:
+                self._finished[job.id] = job.updated_at
+                self._finished.move_to_end(job.id)
+            self._evict()
+
+    def _evict(self) -> None:
+        expired_before = time.time() - self.ttl_seconds
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if len(self._finished) <= self.max_finished and finished_at >= expired_before:
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            self._evict()
+            return self._jobs.get(job_id)
+
+    def pending(self) -> list[Job]:
+        with self._lock:
+            return [job for job in self._jobs.values() if job.status not in TERMINAL_STATES]
+
+    def claim(self, job_id: str, owner: int) -> Job | None:
+        """Mark a queued job as running for owner; None if it is not queued."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "queued":
+                return None
+            job.status = "running"
+            job.owner = owner
+            self.save(job)
+            return job
+
+    def requeue_orphans(self, owner: int, stale_before: float) -> None:
+        """Queue again the running jobs not updated since stale_before, e.g. left by an earlier event loop."""
+        with self._lock:
+            for job in list(self._jobs.values()):
+                if job.status == "running" and job.updated_at < stale_before:
+                    job.status = "queued"
+                    self.save(job)
+
+
+class SQLiteJobStore:
+    """Keeps jobs in SQLite so queued work survives restarts.
+
+    Worker processes sharing the file each see every job; a job runs in the
+    one process whose claim() on it succeeds.
+    """
+
+    def __init__(self, path: str | Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Several worker processes may share the file; WAL lets readers run alongside a writer.
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=5)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    growth_stage TEXT NOT NULL,
+                    filename TEXT,
+                    payload BLOB,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "client" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN client TEXT")
+            if "owner" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner INTEGER")
+
+    def save(self, job: Job) -> None:
+        job.updated_at = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs "
+                "(id, growth_stage, filename, payload, status, attempts, result, error, created_at, updated_at, client, owner) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.id, job.growth_stage, job.filename, job.payload, job.status, job.attempts,
+                    job.result.model_dump_json() if job.result else None, job.error,
+                    job.created_at, job.updated_at, job.client, job.owner,
+                ),
+            )
+
+    def _row_to_job(self, row) -> Job:
+        job_id, growth_stage, filename, payload, status, attempts, result, error, created_at, updated_at, client, owner = row
+        return Job(
+            id=job_id,
+            growth_stage=growth_stage,
+            filename=filename,
+            client=client,
+            owner=owner,
+            payload=payload,
+            status=status,
+            attempts=attempts,
+            result=AnalysisResponse.model_validate_json(result) if result else None,
+            error=error,
+            created_at=created_at,
+            updated_at=updated_at,
+        )
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def pending(self) -> list[Job]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def claim(self, job_id: str, owner: int) -> Job | None:
+        """Atomically mark a queued job as running for owner; None if another worker has it."""
+        with self._lock, self._conn:
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, updated_at = ? WHERE id = ? AND status = 'queued'",
+                (owner, time.time(), job_id),
+            ).rowcount
+        return self.get(job_id) if claimed else None
+
+    def requeue_orphans(self, owner: int, stale_before: float) -> None:
+        """Queue again the running jobs whose worker has exited or that were not updated since stale_before."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued' WHERE status = 'running' AND updated_at < ?", (stale_before,)
+            )
+            owners = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE status = 'running'"
+            )]
+            for stale in owners:
+                if stale is None or (stale != owner and not process_alive(stale)):
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'queued' WHERE status = 'running' AND owner IS ?", (stale,)
+                    )
+
+
+class JobQueue:
+    """Runs jobs on a fixed pool of asyncio workers with retries.
+
+    Workers are started on the running event loop the first time a job is
+    submitted. Store calls run in worker threads, so a busy SQLite file never
+    blocks the event loop. Jobs still pending in the store (e.g. after a restart with the
+    SQLite store) are picked up again at that point. A worker claims a job in
+    the store before each attempt, so when several processes share a store
+    each job runs in only one of them. Running jobs whose process has exited,
+    or that have not been updated for lease_seconds, are queued again.
+    """
+
+    def __init__(
+        self,
+        store: MemoryJobStore | SQLiteJobStore,
+        handler: Callable[[Job], Awaitable[AnalysisResponse]],
+        workers: int,
+        max_attempts: int,
+        retry_backoff: float,
+        lease_seconds: float = 600.0,
+    ):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease_seconds = lease_seconds
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        # One event per caller waiting on a job, removed when the wait ends.
+        self._changed: dict[str, set[asyncio.Event]] = {}
+
+    async def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._changed = {}
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        await asyncio.to_thread(self.store.requeue_orphans, os.getpid(), time.time() - self.lease_seconds)
+        for job in await asyncio.to_thread(self.store.pending):
+            self._queue.put_nowait(job.id)
+
+    async def submit(self, job: Job) -> Job:
+        await asyncio.to_thread(self.store.save, job)
+        await self._ensure_started()
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def wait_for_change(self, job_id: str, timeout: float) -> None:
+        """Wait until the job's status changes or timeout elapses."""
+        await self._ensure_started()
+        event = asyncio.Event()
+        waiters = self._changed.setdefault(job_id, set())
+        waiters.add(event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except TimeoutError:
+            pass
+        finally:
+            waiters.discard(event)
+            if not waiters and self._changed.get(job_id) is waiters:
+                del self._changed[job_id]
+
+    async def _save(self, job: Job) -> None:
+        await asyncio.to_thread(self.store.save, job)
+        if job.status in TERMINAL_STATES:
+            waiters = self._changed.pop(job.id, ())
+        else:
+            waiters = self._changed.get(job.id, ())
+        for event in waiters:
+            event.set()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await asyncio.to_thread(self.store.claim, job_id, os.getpid())
+                if job is not None:
+                    await self._run(job)
+            except Exception:
+                logger.exception("job worker crashed on %s", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        """Run a claimed job, claiming it again before each retry."""
+        while True:
+            job.attempts += 1
+            await self._save(job)
+            try:
+                job.result = await self.handler(job)
+            except Exception as exc:
+                job.error = str(exc) or type(exc).__name__
+                retryable = not isinstance(exc, PermanentJobError) and job.attempts < self.max_attempts
+                logger.warning("job %s attempt %d failed: %r", job.id, job.attempts, exc)
+                if retryable:
+                    job.status = "queued"
+                    await self._save(job)
+                    await asyncio.sleep(self.retry_backoff * 2 ** (job.attempts - 1))
+                    job = await asyncio.to_thread(self.store.claim, job.id, os.getpid())
+                    if job is None:
+                        return
+                    continue
+                job.status = "failed"
+            else:
+                job.status = "succeeded"
+                job.error = None
+            job.payload = None
+            await self._save(job)
+            return
+
+    async def drain(self) -> None:
+        """Wait until every queued job has been processed."""
+        if self._queue is not None:
+            await self._queue.join()
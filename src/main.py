@@ -1,72 +1,185 @@
-from pathlib import Path
-import io
+from contextlib import asynccontextmanager
+from pathlib import Path, PurePosixPath
+from typing import AsyncIterator
+import asyncio
 import csv
-from fastapi import FastAPI, Request, Form, File, UploadFile
-from fastapi.staticfiles import StaticFiles
+import io
+import json
+import logging
+import math
+import time
+import zipfile
+from fastapi import FastAPI, HTTPException, Request, Response, Form, File, UploadFile
+from fastapi import Path as PathParam
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.messages import SystemMessage, HumanMessage
-from .models import AnalysisResponse
-
-product_links = ""
-
-try:
-    with open("./src/product_links.csv") as file:
-        product_links = file.readlines()
-except FileNotFoundError:
-    print("Please include product_links.csv")
-
-SYSTEM_MESSAGE = f"""You are an experienced, patient, and beginner-friendly mentor for indoor cannabis growers. Your goal is to help new growers understand and optimize their grow environment using simple, clear language.
-
-Users will provide CSV files with environmental data (like humidity, light, temperature, and soil moisture) and tell you their plant's growth stage: seedling, vegetation, or flowering.
-
-Here are the ideal environmental conditions you should use as a guide:
--   **Seedling Stage:**
-    *   VPD (Vapor Pressure Deficit): Keep it between 0.4-0.8 kPa. Think of VPD as how thirsty your plant is; this range means your seedlings are comfortably hydrated.
-    *   Temperature: Aim for 68-77°F (20-25°C).
-    *   Humidity: High, around 70-80%. Seedlings love a humid environment.
--   **Vegetation Stage:**
-    *   VPD: Target 0.8-1.2 kPa. Your plants are growing bigger and can handle being a bit thirstier, which encourages them to drink more.
-    *   Temperature: A bit warmer, 72-82°F (22-28°C).
-    *   Humidity: Moderate, 55-70%.
--   **Flowering Stage:**
-    *   VPD: Higher, 1.2-1.6 kPa. This helps the plants focus energy on flower production.
-    *   Temperature: Slightly cooler, 68-79°F (20-26°C).
-    *   Humidity: Lower, 40-50%. This helps prevent mold and encourages resin production.
-
-When providing advice, you MUST:
-1.  Start with a simple, easy-to-understand summary of their current environmental conditions. Avoid jargon or explain it clearly.
-2.  Provide 2-3 concrete, actionable recommendations. Explain *why* each recommendation is important and *how* a new grower can implement it (e.g., "Raise your light by a few inches," "Use a humidifier to increase moisture in the air").
-3.  Ensure at least ONE recommendation includes a relevant product link from the provided `product_links.csv` content. Make sure the product is truly helpful for a new grower based on their specific needs.
-
-Here are some product suggestions from our database; only use them if they match the grower's specific needs and your recommendations:
-{product_links}
-
-Prioritize your recommendations as **High Impact**, **Medium Impact**, or **Low Impact** based on how crucial they are for plant health and yield. Present your response in an easy-to-read format with bullet points or clear headings.
-"""
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from langchain_core.exceptions import OutputParserException
+from pydantic import ValidationError
+from . import config
+from .catalog import CatalogProduct, ProductCatalog
+from .cache import MemoryBackend, ResponseCache, SQLiteBackend, make_cache_key
+from .assets import Asset, StaticAssets
+from .concurrency import CapacityExceededError, LLMLimiter, SQLiteLLMLimiter
+from .context_cache import ContextCache, GeminiContextCache, NullContextCache
+from .batch import run_deduplicated
+from .jobs import TERMINAL_STATES, Job, JobQueue, MemoryJobStore, PermanentJobError, SQLiteJobStore
+from .models import (
+    AnalysisResponse,
+    BatchItem,
+    BatchItemResult,
+    BatchRequest,
+    BatchResponse,
+    JobStatus,
+    TentAppendResult,
+    TentBaseline,
+    TentSummary,
+)
+from .environment import EnvironmentMetrics
+from .evals import record_case
+from .grounding import ground_products
+from .ingest import (
+    ByteLimitedReader,
+    InvalidUploadError,
+    UnsupportedUploadError,
+    UploadTooLargeError,
+    parse_upload_file,
+    read_reading_batches,
+)
+from .quotas import (
+    API_KEY_HEADER,
+    ClientQuotas,
+    MemoryQuotaStore,
+    QuotaExceededError,
+    SQLiteQuotaStore,
+    TokenBudgetExceededError,
+    client_key,
+    current_client,
+    identified_by_api_key,
+)
+from .prompts import SYSTEM_MESSAGE, SYSTEM_MESSAGE_VERSION, build_messages, system_prompt
+from .resilience import CircuitBreaker, LLMUnavailableError, ResilientChatModel
+from .rules import build_rules_response, rules_can_answer
+from .similarity import SimilarityCache
+from .stages import STAGE_TARGETS
+from .tents import TentStore, build_tent_prompt, format_ts, tent_key
+from .telemetry import (
+    DEGRADED_RESPONSES,
+    PRODUCT_LINKS,
+    QUOTA_REJECTIONS,
+    REQUEST_SECONDS,
+    RULES_RESPONSES,
+    STARTUP_SECONDS,
+    STRUCTURED_OUTPUTS,
+    gauge_lines,
+    log_trace,
+    record_llm_call,
+    render_metrics,
+    start_trace,
+    timed,
+)
+
+logger = logging.getLogger(__name__)
+
+
+GEMINI_MODEL = "gemini-2.5-flash"
 
 BASE_DIR = Path(__file__).resolve().parent
+PRODUCT_LINKS_PATH = BASE_DIR / "product_links.csv"
 STATIC_DIR = BASE_DIR / "static"
 TEMPLATE_DIR = BASE_DIR / "templates"
 
-app = FastAPI()
 
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The catalog is read at startup rather than at import, so importing the
+    # app (test collection, worker spawn) stays cheap.
+    await run_in_threadpool(get_catalog)
+    if config.WARM_START:
+        await warm_up()
+    yield
+    await drain(config.SHUTDOWN_GRACE_SECONDS)
+
+
+app = FastAPI(lifespan=lifespan)
+
+static_assets = StaticAssets(STATIC_DIR, mount_path="/static")
+app.mount("/static", static_assets, name="static")
 templates = Jinja2Templates(directory=TEMPLATE_DIR)
+templates.env.globals["static_url"] = static_assets.url
 
 _model = None
 _structured_model = None
+_circuit_breaker = None
+_context_cache = None
+_llm_limiter = None
+_response_cache = None
+_catalog = None
+_job_queue = None
+_index_page = None
+_tent_store = None
+_client_quotas = None
+_similarity_cache = None
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Get or initialize the circuit breaker shared by all model calls."""
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        _circuit_breaker = CircuitBreaker(
+            failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=config.BREAKER_RESET_SECONDS,
+        )
+    return _circuit_breaker
 
 def get_model():
-    """Get or initialize the chat model."""
+    """Get or initialize the chat model, wrapped with deadlines, retries and the circuit breaker."""
     global _model
     if _model is None:
-        _model = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
+        # Model clients are imported on first use: langchain_google_genai
+        # alone takes longer to import than the rest of the app.
+        if config.LLM_PROVIDER == "fake":
+            from .fake_llm import FakeChatModel
+            inner = FakeChatModel(
+                latency=config.FAKE_LLM_LATENCY_SECONDS,
+                jitter=config.FAKE_LLM_JITTER_SECONDS,
+                failure_rate=config.FAKE_LLM_FAILURE_RATE,
+            )
+        else:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            # Retries and deadlines are handled by ResilientChatModel.
+            inner = ChatGoogleGenerativeAI(
+                model=GEMINI_MODEL,
+                max_retries=0,
+                timeout=config.LLM_TIMEOUT_SECONDS,
+            )
+        _model = ResilientChatModel(
+            inner,
+            timeout=config.LLM_TIMEOUT_SECONDS,
+            max_retries=config.LLM_MAX_RETRIES,
+            backoff_base=config.LLM_RETRY_BACKOFF_SECONDS,
+            backoff_max=config.LLM_RETRY_BACKOFF_MAX_SECONDS,
+            breaker=get_circuit_breaker(),
+            hedge=config.LLM_HEDGE,
+            hedge_min_samples=config.LLM_HEDGE_MIN_SAMPLES,
         )
     return _model
 
+def get_context_cache() -> ContextCache:
+    """Get or initialize the provider context cache for the system prompt."""
+    global _context_cache
+    if _context_cache is None:
+        if config.CONTEXT_CACHE and config.LLM_PROVIDER == "gemini":
+            _context_cache = GeminiContextCache(
+                model=GEMINI_MODEL,
+                system_instruction=SYSTEM_MESSAGE,
+                version=SYSTEM_MESSAGE_VERSION,
+                ttl_seconds=config.CONTEXT_CACHE_TTL_SECONDS,
+                min_tokens=config.CONTEXT_CACHE_MIN_TOKENS,
+            )
+        else:
+            _context_cache = NullContextCache()
+    return _context_cache
+
 def get_structured_model():
     """Get or initialize the structured chat model."""
     global _structured_model
@@ -75,78 +188,935 @@ def get_structured_model():
         _structured_model = base_model.with_structured_output(AnalysisResponse)
     return _structured_model
 
+def get_llm_limiter() -> LLMLimiter | SQLiteLLMLimiter:
+    """Get or initialize the limiter for in-flight LLM calls."""
+    global _llm_limiter
+    if _llm_limiter is None:
+        if config.LIMITER_BACKEND == "sqlite":
+            _llm_limiter = SQLiteLLMLimiter(
+                config.LIMITER_PATH,
+                max_in_flight=config.MAX_INFLIGHT_LLM_CALLS,
+                max_queued=config.MAX_QUEUED_LLM_CALLS,
+                queue_timeout=config.LLM_QUEUE_TIMEOUT_SECONDS,
+                lease_seconds=config.LIMITER_LEASE_SECONDS,
+            )
+        else:
+            _llm_limiter = LLMLimiter(
+                max_in_flight=config.MAX_INFLIGHT_LLM_CALLS,
+                max_queued=config.MAX_QUEUED_LLM_CALLS,
+                queue_timeout=config.LLM_QUEUE_TIMEOUT_SECONDS,
+            )
+    return _llm_limiter
+
+def get_catalog() -> ProductCatalog:
+    """Get or initialize the product catalog, reloading it if the CSV changed."""
+    global _catalog
+    if _catalog is None:
+        _catalog = ProductCatalog(PRODUCT_LINKS_PATH)
+    else:
+        _catalog.reload_if_changed()
+    return _catalog
+
+def get_response_cache() -> ResponseCache | None:
+    """Get or initialize the analysis response cache, or None when disabled."""
+    global _response_cache
+    if _response_cache is None and config.CACHE_BACKEND != "none":
+        if config.CACHE_BACKEND == "sqlite":
+            backend = SQLiteBackend(
+                config.CACHE_PATH,
+                max_entries=config.CACHE_MAX_ENTRIES,
+                ttl_seconds=config.CACHE_TTL_SECONDS,
+            )
+        else:
+            backend = MemoryBackend(
+                max_entries=config.CACHE_MAX_ENTRIES,
+                ttl_seconds=config.CACHE_TTL_SECONDS,
+            )
+        _response_cache = ResponseCache(backend)
+    return _response_cache
+
+def get_similarity_cache() -> SimilarityCache | None:
+    """Get or initialize the near-duplicate analysis cache, or None when disabled."""
+    global _similarity_cache
+    if _similarity_cache is None and config.SIMILARITY_CACHE:
+        _similarity_cache = SimilarityCache(
+            threshold=config.SIMILARITY_THRESHOLD,
+            max_entries=config.SIMILARITY_CACHE_MAX_ENTRIES,
+            ttl_seconds=config.SIMILARITY_CACHE_TTL_SECONDS,
+            min_readings=config.SIMILARITY_MIN_READINGS,
+        )
+    return _similarity_cache
+
+def get_job_queue() -> JobQueue:
+    """Get or initialize the background job queue."""
+    global _job_queue
+    if _job_queue is None:
+        if config.JOB_STORE == "sqlite":
+            store = SQLiteJobStore(config.JOB_STORE_PATH)
+        else:
+            store = MemoryJobStore(config.JOB_MAX_FINISHED, config.JOB_RETENTION_SECONDS)
+        _job_queue = JobQueue(
+            store,
+            handler=process_job,
+            workers=config.JOB_WORKERS,
+            max_attempts=config.JOB_MAX_ATTEMPTS,
+            retry_backoff=config.JOB_RETRY_BACKOFF_SECONDS,
+            lease_seconds=config.JOB_LEASE_SECONDS,
+        )
+    return _job_queue
+
+def get_tent_store() -> TentStore:
+    """Get or initialize the per-tent reading store."""
+    global _tent_store
+    if _tent_store is None:
+        _tent_store = TentStore(config.TENT_STORE_PATH)
+    return _tent_store
+
+def get_client_quotas() -> ClientQuotas | None:
+    """Get or initialize the per-client rate limits and token budgets; None when both are off."""
+    global _client_quotas
+    if _client_quotas is None and (config.RATE_LIMIT_PER_MINUTE or config.DAILY_TOKEN_BUDGET):
+        store = SQLiteQuotaStore(config.QUOTA_PATH) if config.QUOTA_BACKEND == "sqlite" else MemoryQuotaStore()
+        _client_quotas = ClientQuotas(
+            store,
+            requests_per_minute=config.RATE_LIMIT_PER_MINUTE,
+            burst=config.RATE_LIMIT_BURST,
+            daily_token_budget=config.DAILY_TOKEN_BUDGET,
+        )
+    return _client_quotas
+
+async def warm_up() -> None:
+    """Build the model clients, catalog, caches and index page before the first request."""
+    start = time.perf_counter()
+    get_catalog()
+    get_response_cache()
+    get_llm_limiter()
+    get_client_quotas()
+    get_index_page()
+    try:
+        get_structured_model()
+        system_prompt()
+        await get_context_cache().cached_content()
+    except Exception as exc:
+        logger.warning("could not pre-warm the model client, it will be built on first use: %s", exc)
+    STARTUP_SECONDS["warm_up"] = time.perf_counter() - start
+    logger.info(
+        "worker ready %s",
+        " ".join(f"{phase}={seconds * 1000:.1f}ms" for phase, seconds in STARTUP_SECONDS.items()),
+    )
+
+async def drain(timeout: float) -> None:
+    """Let queued background jobs finish, for up to timeout seconds.
+
+    In-flight HTTP requests are drained by the server before the lifespan
+    shutdown runs.
+    """
+    if _job_queue is None:
+        return
+    try:
+        await asyncio.wait_for(_job_queue.drain(), timeout)
+    except TimeoutError:
+        logger.warning("shutting down with %d background jobs unfinished", len(_job_queue.store.pending()))
+
+@app.exception_handler(CapacityExceededError)
+async def capacity_exceeded_handler(request: Request, exc: CapacityExceededError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(config.LLM_QUEUE_TIMEOUT_SECONDS))},
+    )
+
+@app.exception_handler(UploadTooLargeError)
+async def upload_too_large_handler(request: Request, exc: UploadTooLargeError):
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
+@app.exception_handler(UnsupportedUploadError)
+async def unsupported_upload_handler(request: Request, exc: UnsupportedUploadError):
+    return JSONResponse(status_code=415, content={"detail": str(exc)})
+
+@app.exception_handler(InvalidUploadError)
+async def invalid_upload_handler(request: Request, exc: InvalidUploadError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+def get_index_page() -> Asset:
+    """Get or pre-render the empty upload page served at /."""
+    global _index_page
+    if _index_page is None:
+        html = templates.get_template("index.html").render()
+        _index_page = Asset.build(html.encode("utf-8"), "text/html")
+    return _index_page
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
-    return templates.TemplateResponse(request, "index.html")
+    return get_index_page().response(request)
 
-def parse_csv_data(file_content: str) -> str:
-    """Parse CSV file content and format it as a readable string."""
-    csv_reader = csv.DictReader(io.StringIO(file_content))
-    rows = list(csv_reader)
+async def shed_over_quota(request: Request) -> JSONResponse | None:
+    """Identify the client and, for requests that may call the model, enforce its quotas.
 
-    if not rows:
-        return "No data found in CSV file."
+    Runs before the body is read, so a refused upload is never parsed.
+    Returns the 429 response to send, or None to handle the request. The
+    quota store may block on a shared SQLite file, so it is checked off the
+    event loop.
+    """
+    key = client_key(request.headers.get(API_KEY_HEADER), request.client.host if request.client else None)
+    current_client.set(key)
+    quotas = get_client_quotas()
+    if quotas is None or request.method != "POST":
+        return None
+    try:
+        await run_in_threadpool(quotas.admit, key)
+    except QuotaExceededError as exc:
+        reason = "token_budget" if isinstance(exc, TokenBudgetExceededError) else "rate_limit"
+        QUOTA_REJECTIONS.inc(reason=reason)
+        logger.info("refused %s %s for %s: %s", request.method, request.url.path, key, reason)
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(exc)},
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
+        )
+    return None
 
-    data_summary = []
-    data_summary.append(f"Environmental data ({len(rows)} readings):")
-    data_summary.append("\nColumn headers: " + ", ".join(rows[0].keys()))
-    data_summary.append("\nData:")
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time every request and, when enabled, log a per-request trace."""
+    trace = start_trace()
+    start = time.perf_counter()
+    response = await shed_over_quota(request)
+    if response is None:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - start
 
-    for i, row in enumerate(rows, 1):
-        row_data = ", ".join([f"{k}: {v}" for k, v in row.items() if v])
-        data_summary.append(f"Reading {i}: {row_data}")
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    REQUEST_SECONDS.observe(elapsed, method=request.method, path=path, status=response.status_code)
+    if "first_request" not in STARTUP_SECONDS:
+        STARTUP_SECONDS["first_request"] = elapsed
+        logger.info("first request %s %s took %.1fms", request.method, path, elapsed * 1000)
+    if config.TRACE_REQUESTS and path != "/metrics":
+        log_trace(trace, request.method, path, response.status_code, elapsed)
+    return response
 
-    return "\n".join(data_summary)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Expose stage latency histograms, prompt sizes and token counts for Prometheus."""
+    extra = []
+    limiter = get_llm_limiter()
+    extra += gauge_lines("grow_assist_llm_in_flight", "LLM calls currently running.", limiter.in_flight)
+    extra += gauge_lines("grow_assist_llm_queued", "LLM calls waiting for a slot.", limiter.queued)
+    extra += gauge_lines(
+        "grow_assist_llm_circuit_open",
+        "1 while the circuit breaker is rejecting model calls.",
+        int(get_circuit_breaker().state == "open"),
+    )
+    for phase, seconds in STARTUP_SECONDS.items():
+        extra += gauge_lines(f"grow_assist_startup_{phase}_seconds", f"Seconds spent on {phase} in this worker.", seconds)
+    cache = get_response_cache()
+    if cache is not None:
+        extra += gauge_lines("grow_assist_cache_hits", "Analysis cache hits since start.", cache.hits)
+        extra += gauge_lines("grow_assist_cache_misses", "Analysis cache misses since start.", cache.misses)
+    similarity_cache = get_similarity_cache()
+    if similarity_cache is not None:
+        stats = similarity_cache.stats()
+        extra += gauge_lines("grow_assist_similar_cache_hits", "Near-duplicate cache hits since start.", stats["hits"])
+        extra += gauge_lines("grow_assist_similar_cache_misses", "Near-duplicate cache misses since start.", stats["misses"])
+        extra += gauge_lines("grow_assist_similar_cache_entries", "Analyses held in the near-duplicate cache.", stats["entries"])
+        if stats["hit_age_seconds_max"] is not None:
+            extra += gauge_lines(
+                "grow_assist_similar_cache_hit_age_seconds_max",
+                "Age of the oldest analysis reused from the near-duplicate cache.",
+                stats["hit_age_seconds_max"],
+            )
+    return PlainTextResponse(render_metrics(extra), media_type="text/plain; version=0.0.4")
 
+@app.get("/quota")
+async def quota_usage():
+    """Report the calling client's model token usage for today."""
+    quotas = get_client_quotas()
+    if quotas is None:
+        return {"daily_token_budget": None}
+    return await run_in_threadpool(quotas.usage, current_client.get())
 
-@app.post("/analyze", response_class=HTMLResponse)
-async def analyze(
-    request: Request,
-    growth_stage: str = Form(...),
-    csv_file: UploadFile = File(...)
-):
-    """Analyze environmental data from CSV for the selected growth stage."""
-    file_content = await csv_file.read()
-    csv_text = file_content.decode('utf-8')
-    parsed_data = parse_csv_data(csv_text)
+@app.get("/cache/stats")
+async def cache_stats():
+    """Report hit/miss counters for the exact and near-duplicate analysis caches."""
+    cache = get_response_cache()
+    stats = cache.stats() if cache is not None else {"backend": None}
+    similarity_cache = get_similarity_cache()
+    stats["similar"] = similarity_cache.stats() if similarity_cache is not None else None
+    return stats
 
-    user_prompt = f"""Growth Stage: {growth_stage}
+async def record_model_call(call: str, messages, response=None, completion_text: str | None = None) -> None:
+    """Record a model call's telemetry and charge its tokens to the client it was made for."""
+    prompt_tokens, completion_tokens = record_llm_call(call, messages, response, completion_text)
+    key, quotas = current_client.get(), get_client_quotas()
+    if key is not None and quotas is not None:
+        await run_in_threadpool(quotas.charge, key, prompt_tokens + completion_tokens)
 
-{parsed_data}
+def select_products(growth_stage: str, metrics: EnvironmentMetrics | None) -> list[CatalogProduct]:
+    """Retrieve the catalog products relevant to the issues found in the data."""
+    issues = metrics.issues(growth_stage) if metrics is not None else []
+    return get_catalog().products_for_issues(issues, k=config.PROMPT_PRODUCT_COUNT)
 
-Analyze this environmental data for the {growth_stage} stage.
 
-Provide recommendations for optimization with product links.
-"""
+async def prepare_messages(
+    growth_stage: str,
+    parsed_data: str,
+    metrics: EnvironmentMetrics | None,
+) -> tuple[list, dict]:
+    """Build the prompt for an analysis.
 
-    system_msg = SystemMessage(SYSTEM_MESSAGE)
-    human_msg = HumanMessage(user_prompt)
-    messages = [system_msg, human_msg]
+    Returns (messages, model_kwargs). When the system prompt is held in the
+    provider's context cache, messages carry only the variable suffix and
+    model_kwargs point the prefix-using calls at the cache.
+    """
+    cached_content = await get_context_cache().cached_content()
+    messages = build_messages(
+        growth_stage,
+        parsed_data,
+        select_products(growth_stage, metrics),
+        prefix_cached=cached_content is not None,
+    )
+    return messages, {"cached_content": cached_content} if cached_content else {}
+
+
+async def analyze_two_pass(
+    messages: list,
+    timings: dict[str, float],
+    model_kwargs: dict | None = None,
+) -> AnalysisResponse:
+    """Produce free-text advice, then have the structured model convert it."""
+    limiter = get_llm_limiter()
 
     base_model = get_model()
-    grounded_response = base_model.invoke(
-        messages,
-    )
+    with timed(timings, "grounded_invoke"):
+        async with limiter.slot():
+            grounded_response = await base_model.ainvoke(
+                messages,
+                **(model_kwargs or {}),
+            )
+    await record_model_call("grounded", messages, grounded_response)
+
+    return await structure_analysis(grounded_response.content, timings)
 
+
+async def structure_analysis(analysis_text: str, timings: dict[str, float]) -> AnalysisResponse:
+    """Have the structured model convert free-text advice into an AnalysisResponse."""
     structured_model = get_structured_model()
     structure_prompt = f"""Convert this analysis into the required structured format.
 
 Original Analysis with Researched Products:
-{grounded_response.content}
+{analysis_text}
 
 Ensure all product URLs are included exactly as provided."""
 
-    analysis_response = structured_model.invoke([
-        HumanMessage(structure_prompt),
-    ])
-
-    return templates.TemplateResponse(
-        request,
-        "index.html",
-        {
-            "growth_stage": growth_stage,
-            "csv_filename": csv_file.filename,
-            "analysis": analysis_response
-        }
+    from langchain.messages import HumanMessage
+    structure_messages = [HumanMessage(structure_prompt)]
+    with timed(timings, "structured_invoke"):
+        async with get_llm_limiter().slot():
+            analysis_response = await structured_model.ainvoke(structure_messages)
+    await record_model_call("structured", structure_messages, analysis_response)
+    STRUCTURED_OUTPUTS.inc(outcome="valid")
+    return analysis_response
+
+
+async def analyze_single_pass(
+    messages: list,
+    timings: dict[str, float],
+    model_kwargs: dict | None = None,
+) -> AnalysisResponse | None:
+    """Have the structured model produce the AnalysisResponse directly.
+
+    Returns None when the model output does not validate, so the caller can
+    fall back to the two-pass pipeline.
+    """
+    structured_model = get_structured_model()
+    try:
+        with timed(timings, "single_invoke"):
+            async with get_llm_limiter().slot():
+                response = await structured_model.ainvoke(messages, **(model_kwargs or {}))
+    except (ValidationError, OutputParserException) as exc:
+        logger.warning("Single-pass analysis failed validation, falling back to two-pass: %s", exc)
+        await record_model_call("single", messages, completion_text="")
+        STRUCTURED_OUTPUTS.inc(outcome="reask")
+        return None
+    await record_model_call("single", messages, response)
+    STRUCTURED_OUTPUTS.inc(outcome="valid")
+    return response
+
+
+def ground_analysis(analysis_response: AnalysisResponse) -> AnalysisResponse:
+    """Snap the model's product links to catalog entries, dropping those that match none."""
+    analysis_response, outcomes = ground_products(analysis_response, get_catalog(), config.PRODUCT_MATCH_THRESHOLD)
+    for outcome, count in outcomes.items():
+        PRODUCT_LINKS.inc(count, outcome=outcome)
+    if outcomes.keys() - {"valid"}:
+        logger.info(
+            "product links snapped=%d dropped=%d searched=%d",
+            outcomes["snapped"], outcomes["dropped"], outcomes["searched"],
+        )
+    return analysis_response
+
+
+def degraded_analysis(
+    growth_stage: str,
+    metrics: EnvironmentMetrics | None,
+    exc: LLMUnavailableError,
+) -> AnalysisResponse:
+    """Rules-based advice for when the model is unavailable; never cached."""
+    logger.warning("model unavailable, answering with rules-based advice: %s", exc)
+    DEGRADED_RESPONSES.inc()
+    return build_rules_response(growth_stage, metrics, get_catalog())
+
+
+def rules_fast_path(growth_stage: str, metrics: EnvironmentMetrics | None) -> AnalysisResponse | None:
+    """Answer from the rules engine when the configured mode allows it, else None."""
+    if not rules_can_answer(growth_stage, metrics, config.RULES_ENGINE, config.RULES_MIN_READINGS):
+        return None
+    with timed(None, "rules"):
+        analysis_response = build_rules_response(growth_stage, metrics, get_catalog())
+    RULES_RESPONSES.inc()
+    logger.info("analysis mode=rules issues=%s", ",".join(metrics.issues(growth_stage)) or "none")
+    return analysis_response
+
+
+def prompt_version() -> str:
+    """Version of everything besides the upload that shapes the prompt."""
+    return f"{SYSTEM_MESSAGE_VERSION}:{get_catalog().version}"
+
+
+def similar_analysis(growth_stage: str, metrics: EnvironmentMetrics | None) -> AnalysisResponse | None:
+    """The cached analysis of a nearly identical environment, if there is one."""
+    similarity_cache = get_similarity_cache()
+    if similarity_cache is None or not similarity_cache.usable(growth_stage, metrics):
+        return None
+    analysis_response = similarity_cache.get(growth_stage, metrics, prompt_version())
+    if analysis_response is not None:
+        logger.info("analysis similarity cache hit")
+    return analysis_response
+
+
+def remember_analysis(
+    growth_stage: str,
+    parsed_data: str,
+    metrics: EnvironmentMetrics | None,
+    analysis_response: AnalysisResponse,
+) -> None:
+    """Keep a model-produced analysis for near-duplicate reuse and, when enabled, the eval corpus."""
+    similarity_cache = get_similarity_cache()
+    if similarity_cache is not None and similarity_cache.usable(growth_stage, metrics):
+        similarity_cache.set(growth_stage, metrics, prompt_version(), analysis_response)
+    if config.EVAL_RECORD:
+        try:
+            record_case(config.EVAL_CORPUS_PATH, growth_stage, parsed_data, metrics, analysis_response)
+        except OSError as exc:
+            logger.warning("could not record eval case: %s", exc)
+
+
+async def run_analysis(
+    growth_stage: str,
+    parsed_data: str,
+    metrics: EnvironmentMetrics | None = None,
+) -> AnalysisResponse:
+    """Run the configured LLM pipeline for parsed environmental data."""
+    rules_response = rules_fast_path(growth_stage, metrics)
+    if rules_response is not None:
+        return rules_response
+
+    cache = get_response_cache()
+    cache_key = make_cache_key(parsed_data, growth_stage, prompt_version())
+    if cache is not None:
+        cached = await run_in_threadpool(cache.get, cache_key)
+        if cached is not None:
+            logger.info("analysis cache hit key=%s", cache_key[:12])
+            return cached
+    similar = similar_analysis(growth_stage, metrics)
+    if similar is not None:
+        return similar
+
+    messages, model_kwargs = await prepare_messages(growth_stage, parsed_data, metrics)
+    timings: dict[str, float] = {}
+    mode = config.ANALYSIS_MODE
+
+    analysis_response = None
+    try:
+        if mode == "single":
+            analysis_response = await analyze_single_pass(messages, timings, model_kwargs)
+            if analysis_response is None:
+                mode = "single+fallback"
+        if analysis_response is None:
+            analysis_response = await analyze_two_pass(messages, timings, model_kwargs)
+    except LLMUnavailableError as exc:
+        return degraded_analysis(growth_stage, metrics, exc)
+    analysis_response = ground_analysis(analysis_response)
+
+    logger.info(
+        "analysis mode=%s %s",
+        mode,
+        " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in timings.items()),
+    )
+    if cache is not None:
+        await run_in_threadpool(cache.set, cache_key, analysis_response)
+    remember_analysis(growth_stage, parsed_data, metrics, analysis_response)
+    return analysis_response
+
+
+async def read_upload(csv_file: UploadFile, growth_stage: str) -> tuple[str, EnvironmentMetrics | None]:
+    """Parse an uploaded CSV off the event loop, enforcing the upload limits."""
+    if csv_file.size is not None and csv_file.size > config.MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(f"Upload exceeds the {config.MAX_UPLOAD_BYTES} byte limit.")
+    with timed(None, "parse_upload"):
+        return await run_in_threadpool(parse_upload_file, csv_file.file, growth_stage)
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_analysis(
+    growth_stage: str,
+    parsed_data: str,
+    metrics: EnvironmentMetrics | None,
+) -> AsyncIterator[str]:
+    """Yield SSE events for an analysis as soon as each piece is available.
+
+    Events, in order: metrics (computed locally), token (free-text deltas from
+    the model), summary, one recommendation per validated Recommendation, and
+    finally done with the full AnalysisResponse. Failures are sent as an
+    error event since the response status has already been sent.
+
+    Token events come from the two-pass pipeline's free-text call, so in
+    "single" ANALYSIS_MODE they are sent only when the single structured call
+    fails validation and the stream falls back to two-pass.
+    """
+    if metrics is not None and metrics.count:
+        yield sse_event("metrics", metrics.summary(growth_stage))
+
+    try:
+        analysis_response = rules_fast_path(growth_stage, metrics)
+        cache = get_response_cache()
+        cache_key = make_cache_key(parsed_data, growth_stage, prompt_version())
+        if analysis_response is None and cache is not None:
+            analysis_response = await run_in_threadpool(cache.get, cache_key)
+        if analysis_response is None:
+            analysis_response = similar_analysis(growth_stage, metrics)
+
+        if analysis_response is None:
+            timings: dict[str, float] = {}
+            messages, model_kwargs = await prepare_messages(growth_stage, parsed_data, metrics)
+            mode = config.ANALYSIS_MODE
+            if mode == "single":
+                analysis_response = await analyze_single_pass(messages, timings, model_kwargs)
+                if analysis_response is None:
+                    mode = "single+fallback"
+            if analysis_response is None:
+                text_parts = []
+                with timed(timings, "grounded_stream"):
+                    async with get_llm_limiter().slot():
+                        async for chunk in get_model().astream(messages, **model_kwargs):
+                            if chunk.text:
+                                text_parts.append(chunk.text)
+                                yield sse_event("token", {"text": chunk.text})
+                await record_model_call("grounded", messages, completion_text="".join(text_parts))
+                analysis_response = await structure_analysis("".join(text_parts), timings)
+
+            analysis_response = ground_analysis(analysis_response)
+            logger.info(
+                "analysis mode=stream:%s %s",
+                mode,
+                " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in timings.items()),
+            )
+            if cache is not None:
+                await run_in_threadpool(cache.set, cache_key, analysis_response)
+            remember_analysis(growth_stage, parsed_data, metrics, analysis_response)
+    except LLMUnavailableError as exc:
+        analysis_response = degraded_analysis(growth_stage, metrics, exc)
+    except (CapacityExceededError, ValidationError, OutputParserException) as exc:
+        yield sse_event("error", {"detail": str(exc)})
+        return
+
+    yield sse_event("summary", {"summary": analysis_response.summary})
+    for recommendation in analysis_response.recommendations:
+        yield sse_event("recommendation", recommendation.model_dump())
+    yield sse_event("done", analysis_response.model_dump())
+
+
+@app.post("/analyze/stream")
+async def analyze_stream(
+    growth_stage: str = Form(...),
+    csv_file: UploadFile = File(...)
+):
+    """Stream an analysis as Server-Sent Events; /analyze remains the non-streaming fallback."""
+    parsed_data, metrics = await read_upload(csv_file, growth_stage)
+    return StreamingResponse(
+        stream_analysis(growth_stage, parsed_data, metrics),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def analyze_batch_item(item: BatchItem) -> AnalysisResponse:
+    """Parse and analyze one item of a batch request."""
+    parsed_data, metrics = await run_in_threadpool(
+        parse_upload_file, io.BytesIO(item.csv.encode("utf-8")), item.growth_stage
     )
+    return await run_analysis(item.growth_stage, parsed_data, metrics)
 
+
+async def run_batch(items: list[BatchItem]) -> BatchResponse:
+    """Analyze batch items concurrently, analyzing identical inputs only once."""
+    if len(items) > config.BATCH_MAX_ITEMS:
+        raise UploadTooLargeError(f"Batch exceeds the {config.BATCH_MAX_ITEMS} item limit.")
+    if sum(len(item.csv.encode("utf-8")) for item in items) > config.MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(f"Batch exceeds the {config.MAX_UPLOAD_BYTES} byte limit.")
+
+    outcomes = await run_deduplicated(
+        items,
+        key=lambda item: make_cache_key(item.csv, item.growth_stage, ""),
+        worker=analyze_batch_item,
+        concurrency=config.BATCH_CONCURRENCY,
+    )
+
+    results = []
+    for item, outcome in zip(items, outcomes):
+        if isinstance(outcome, Exception):
+            logger.warning("batch item %s failed: %r", item.id, outcome)
+            results.append(BatchItemResult(id=item.id, error=str(outcome) or type(outcome).__name__))
+        else:
+            results.append(BatchItemResult(id=item.id, analysis=outcome))
+    return BatchResponse(results=results)
+
+
+@app.post("/analyze/batch", response_model=BatchResponse)
+async def analyze_batch(batch: BatchRequest):
+    """Analyze many (CSV, growth stage) pairs in one request."""
+    return await run_batch(batch.items)
+
+
+def read_zip_items(file, growth_stage: str) -> list[BatchItem]:
+    """Turn each CSV in a zip archive into a BatchItem.
+
+    A CSV inside a folder named after a growth stage (e.g. flowering/tent2.csv)
+    uses that stage; all others use growth_stage.
+    """
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Upload is not a valid zip archive.")
+
+    members = [info for info in archive.infolist() if not info.is_dir() and info.filename.lower().endswith(".csv")]
+    if len(members) > config.BATCH_MAX_ITEMS:
+        raise UploadTooLargeError(f"Batch exceeds the {config.BATCH_MAX_ITEMS} item limit.")
+    if sum(info.file_size for info in members) > config.MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(f"Uncompressed archive exceeds the {config.MAX_UPLOAD_BYTES} byte limit.")
+
+    items = []
+    for info in members:
+        folder = PurePosixPath(info.filename).parent.name.lower()
+        with archive.open(info) as member:
+            content = ByteLimitedReader(member, config.MAX_UPLOAD_BYTES).readall()
+        items.append(BatchItem(
+            id=info.filename,
+            csv=content.decode("utf-8-sig", errors="replace"),
+            growth_stage=folder if folder in STAGE_TARGETS else growth_stage,
+        ))
+    return items
+
+
+@app.post("/analyze/batch/zip", response_model=BatchResponse)
+async def analyze_batch_zip(
+    growth_stage: str = Form(...),
+    archive: UploadFile = File(...)
+):
+    """Analyze every CSV in an uploaded zip archive."""
+    if archive.size is not None and archive.size > config.MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(f"Upload exceeds the {config.MAX_UPLOAD_BYTES} byte limit.")
+    items = await run_in_threadpool(read_zip_items, archive.file, growth_stage)
+    if not items:
+        raise HTTPException(status_code=400, detail="Archive contains no CSV files.")
+    return await run_batch(items)
+
+
+async def process_job(job: Job) -> AnalysisResponse:
+    """Parse and analyze the upload stored with a background job."""
+    current_client.set(job.client)
+    try:
+        parsed_data, metrics = await run_in_threadpool(
+            parse_upload_file, io.BytesIO(job.payload), job.growth_stage
+        )
+    except (UploadTooLargeError, UnsupportedUploadError, InvalidUploadError, UnicodeDecodeError, csv.Error) as exc:
+        raise PermanentJobError(str(exc)) from exc
+    return await run_analysis(job.growth_stage, parsed_data, metrics)
+
+
+def job_status(job: Job) -> JobStatus:
+    return JobStatus(
+        id=job.id,
+        status=job.status,
+        growth_stage=job.growth_stage,
+        filename=job.filename,
+        attempts=job.attempts,
+        analysis=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
+
+
+@app.post("/jobs", status_code=202, response_model=JobStatus)
+async def submit_job(
+    response: Response,
+    growth_stage: str = Form(...),
+    csv_file: UploadFile = File(...)
+):
+    """Queue an analysis and return its job ID immediately."""
+    if csv_file.size is not None and csv_file.size > config.MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(f"Upload exceeds the {config.MAX_UPLOAD_BYTES} byte limit.")
+    payload = await csv_file.read(config.MAX_UPLOAD_BYTES + 1)
+    if len(payload) > config.MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(f"Upload exceeds the {config.MAX_UPLOAD_BYTES} byte limit.")
+
+    job = await get_job_queue().submit(
+        Job(growth_stage=growth_stage, payload=payload, filename=csv_file.filename, client=current_client.get())
+    )
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job_status(job)
+
+
+async def get_job_or_404(job_id: str) -> Job:
+    job = await run_in_threadpool(get_job_queue().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Poll a background job for its status and, once finished, its analysis."""
+    return job_status(await get_job_or_404(job_id))
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Subscribe to a job's status changes as Server-Sent Events until it finishes."""
+    await get_job_or_404(job_id)
+    queue = get_job_queue()
+
+    async def events() -> AsyncIterator[str]:
+        last = None
+        while True:
+            job = await run_in_threadpool(queue.store.get, job_id)
+            if job is None:
+                return
+            status = job_status(job)
+            if (status.status, status.attempts) != last:
+                last = (status.status, status.attempts)
+                yield sse_event("status", status.model_dump())
+            else:
+                yield ": keep-alive\n\n"
+            if job.status in TERMINAL_STATES:
+                return
+            await queue.wait_for_change(job_id, timeout=15)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+TENT_ID = PathParam(pattern=r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def tent_key_for_client(tent_id: str) -> str:
+    """Storage key of the calling client's tent; each client has its own tent ids.
+
+    Tents are kept per API key. An address is not a stable owner: it changes
+    for one grower and is shared by everyone behind the same NAT or proxy.
+    """
+    client = current_client.get()
+    if not identified_by_api_key(client):
+        raise HTTPException(status_code=401, detail="Tent profiles require an X-API-Key header.")
+    return tent_key(client, tent_id)
+
+
+def tent_schedule() -> tuple[int, int]:
+    return config.TENT_LIGHTS_ON_HOUR, config.TENT_LIGHTS_OFF_HOUR
+
+
+def append_tent_readings(tent_id: str, key: str, file, growth_stage: str | None) -> TentAppendResult:
+    """Store an upload's readings and, when growth_stage is given, make it the tent's current stage.
+
+    The readings join the stage's baselines only once they have been
+    analyzed, so an analysis compares them with the baseline from before.
+    """
+    store = get_tent_store()
+    received = inserted = skipped = 0
+    for batch in read_reading_batches(file):
+        received += len(batch)
+        skipped += batch.skipped
+        inserted += store.append(key, batch)
+    info = store.info(key)
+    stage = growth_stage.strip().lower() if growth_stage else info and info.growth_stage
+    if info is not None and stage in STAGE_TARGETS:
+        store.update_baselines(key, stage, tent_schedule(), through_seq=info.analyzed_through)
+    return TentAppendResult(
+        tent_id=tent_id,
+        received=received,
+        inserted=inserted,
+        duplicates=received - inserted,
+        skipped=skipped,
+        total_readings=info.readings if info else 0,
+    )
+
+
+def get_tent_or_404(key: str):
+    info = get_tent_store().info(key)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Tent not found.")
+    return info
+
+
+@app.post("/tents/{tent_id}/readings", response_model=TentAppendResult)
+async def add_tent_readings(
+    tent_id: str = TENT_ID,
+    csv_file: UploadFile = File(...),
+    growth_stage: str | None = Form(None),
+):
+    """Append an upload to a tent's history; readings already stored for a timestamp are ignored.
+
+    growth_stage, when given, becomes the tent's current stage. The new
+    readings are added to that stage's baselines after they are analyzed.
+    """
+    if csv_file.size is not None and csv_file.size > config.MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(f"Upload exceeds the {config.MAX_UPLOAD_BYTES} byte limit.")
+    with timed(None, "parse_upload"):
+        return await run_in_threadpool(
+            append_tent_readings, tent_id, tent_key_for_client(tent_id), csv_file.file, growth_stage
+        )
+
+
+@app.get("/tents/{tent_id}", response_model=TentSummary)
+async def get_tent(tent_id: str = TENT_ID):
+    """A tent's stored history, its day/night baselines per stage and how much is not yet analyzed."""
+    key = tent_key_for_client(tent_id)
+    info = get_tent_or_404(key)
+    return TentSummary(
+        tent_id=tent_id,
+        readings=info.readings,
+        first_reading_at=format_ts(info.first_ts),
+        last_reading_at=format_ts(info.last_ts),
+        pending_readings=info.pending,
+        last_analyzed_at=info.analyzed_at,
+        growth_stage=info.growth_stage,
+        baselines=[
+            TentBaseline(
+                growth_stage=baseline.growth_stage,
+                period=baseline.period,
+                readings=baseline.readings,
+                **{
+                    field: value
+                    for q, (_, mean, spread) in baseline.stats.items()
+                    for field, value in ((q, mean), (f"{q}_spread", spread))
+                },
+            )
+            for baseline in get_tent_store().baselines(key)
+        ],
+    )
+
+
+def prepare_tent_prompt(key: str, growth_stage: str) -> tuple[str, EnvironmentMetrics | None, int]:
+    """Build the tent's prompt against its baselines from the readings already analyzed."""
+    store = get_tent_store()
+    stage = growth_stage.strip().lower()
+    if stage in STAGE_TARGETS:
+        store.update_baselines(key, stage, tent_schedule(), through_seq=store.info(key).analyzed_through)
+    return build_tent_prompt(
+        store, key, growth_stage, config.DIGEST_RAW_ROW_LIMIT, tent_schedule(), config.TENT_BASELINE_MIN_READINGS
+    )
+
+
+def finish_tent_analysis(key: str, growth_stage: str, through_seq: int) -> None:
+    """Mark the readings up to through_seq analyzed, then fold them into the stage's baselines."""
+    store = get_tent_store()
+    store.mark_analyzed(key, through_seq)
+    stage = growth_stage.strip().lower()
+    if stage in STAGE_TARGETS:
+        store.update_baselines(key, stage, tent_schedule(), through_seq=through_seq)
+
+
+@app.post("/tents/{tent_id}/analyze", response_model=AnalysisResponse)
+async def analyze_tent(tent_id: str = TENT_ID, growth_stage: str = Form(...)):
+    """Analyze a tent from its baselines, or rolling aggregates, plus the readings added since its last analysis.
+
+    Once the tent has a baseline for the stage the prompt carries only how
+    the new readings deviate from it, so its size is independent of how
+    much history the tent has.
+    """
+    key = tent_key_for_client(tent_id)
+    get_tent_or_404(key)
+    with timed(None, "parse_upload"):
+        parsed_data, metrics, through_seq = await run_in_threadpool(prepare_tent_prompt, key, growth_stage)
+    analysis_response = await run_analysis(growth_stage, parsed_data, metrics)
+    await run_in_threadpool(finish_tent_analysis, key, growth_stage, through_seq)
+    return analysis_response
+
+
+def results_context(
+    growth_stage: str,
+    analysis_response: AnalysisResponse,
+    metrics: EnvironmentMetrics | None,
+) -> dict:
+    """Template variables for the results block (templates/_results.html)."""
+    return {
+        "growth_stage": growth_stage,
+        "analysis": analysis_response,
+        "metrics": metrics.summary(growth_stage) if metrics and metrics.count else None,
+    }
+
+
+@app.post("/analyze/fragment")
+async def analyze_fragment(
+    request: Request,
+    growth_stage: str = Form(...),
+    csv_file: UploadFile = File(...)
+):
+    """Analyze and return only the results, for updating the page in place.
+
+    Returns the AnalysisResponse as JSON when the client accepts
+    application/json, otherwise the rendered results HTML partial.
+    """
+    parsed_data, metrics = await read_upload(csv_file, growth_stage)
+
+    analysis_response = await run_analysis(growth_stage, parsed_data, metrics)
+
+    if "application/json" in request.headers.get("accept", ""):
+        return JSONResponse(analysis_response.model_dump())
+    with timed(None, "render"):
+        return templates.TemplateResponse(
+            request,
+            "_results.html",
+            results_context(growth_stage, analysis_response, metrics),
+        )
+
+
+@app.post("/analyze", response_class=HTMLResponse)
+async def analyze(
+    request: Request,
+    growth_stage: str = Form(...),
+    csv_file: UploadFile = File(...)
+):
+    """Analyze environmental data from CSV for the selected growth stage."""
+    parsed_data, metrics = await read_upload(csv_file, growth_stage)
+
+    analysis_response = await run_analysis(growth_stage, parsed_data, metrics)
+
+    with timed(None, "render"):
+        return templates.TemplateResponse(
+            request,
+            "index.html",
+            {
+                **results_context(growth_stage, analysis_response, metrics),
+                "csv_filename": csv_file.filename,
+            }
+        )
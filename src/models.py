@@ -1,5 +1,6 @@
 from typing import Literal
 from pydantic import BaseModel, Field, field_validator
+from . import config
 
 
 class ProductLink(BaseModel):
@@ -58,3 +59,75 @@ class AnalysisResponse(BaseModel):
         if not any(rec.product is not None for rec in recommendations):
             raise ValueError("At least one recommendation must include a product link")
         return recommendations
+
+
+class BatchItem(BaseModel):
+    """One tent's data in a batch analysis request."""
+    id: str | None = Field(default=None, description="Caller-supplied identifier echoed back in the result")
+    csv: str = Field(max_length=config.MAX_UPLOAD_BYTES, description="CSV file content")
+    growth_stage: str = Field(description="Growth stage: seedling, vegetation, or flowering")
+
+
+class BatchRequest(BaseModel):
+    """A batch of tents to analyze together."""
+    items: list[BatchItem] = Field(min_length=1, max_length=config.BATCH_MAX_ITEMS)
+
+
+class BatchItemResult(BaseModel):
+    """The analysis, or the error, for one batch item."""
+    id: str | None = None
+    analysis: AnalysisResponse | None = None
+    error: str | None = None
+
+
+class BatchResponse(BaseModel):
+    """Results for a batch request, in the same order as the items."""
+    results: list[BatchItemResult]
+
+
+class JobStatus(BaseModel):
+    """State of a background analysis job."""
+    id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    growth_stage: str
+    filename: str | None = None
+    attempts: int = 0
+    analysis: AnalysisResponse | None = None
+    error: str | None = None
+    created_at: float
+    updated_at: float
+
+
+class TentAppendResult(BaseModel):
+    """Outcome of appending an upload to a tent's stored readings."""
+    tent_id: str
+    received: int = Field(description="Timestamped readings in the upload")
+    inserted: int = Field(description="Readings that were new and stored")
+    duplicates: int = Field(description="Readings whose timestamp was already stored")
+    skipped: int = Field(default=0, description="Rows without a parseable timestamp")
+    total_readings: int
+
+
+class TentBaseline(BaseModel):
+    """A tent's typical conditions in one growth stage, lights on (day) or off (night)."""
+    growth_stage: str
+    period: Literal["day", "night"]
+    readings: int
+    temperature_f: float | None = None
+    temperature_f_spread: float | None = None
+    humidity_pct: float | None = None
+    humidity_pct_spread: float | None = None
+    vpd_kpa: float | None = None
+    vpd_kpa_spread: float | None = None
+
+
+class TentSummary(BaseModel):
+    """Stored history and profile of a tent."""
+    tent_id: str
+    readings: int
+    first_reading_at: str | None = None
+    last_reading_at: str | None = None
+    pending_readings: int = Field(description="Readings not yet covered by an analysis")
+    last_analyzed_at: float | None = None
+    growth_stage: str | None = Field(default=None, description="Stage of the tent's latest upload or analysis")
+    baselines: list[TentBaseline] = Field(default_factory=list)
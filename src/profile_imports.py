@@ -0,0 +1,152 @@
+"""Import-time profiler: how long importing a module takes and what it loads.
+
+Run with `uv run python -m src.profile_imports` (add --help for options).
+Each run imports the module in a fresh interpreter with `-X importtime`, the
+way a worker process or test session starts, and reports the wall time, the
+number of modules loaded and the slowest imports by cumulative time.
+"""
+import argparse
+import json
+import subprocess
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Written to stderr by the probe right before the import, so the interpreter's
+# own startup imports are left out of the profile.
+MARKER = "-- profile_imports: start --"
+
+# Run in the child interpreter: time the import and list what it loaded.
+PROBE = """
+import importlib, json, sys, time
+print(sys.argv[2], file=sys.stderr, flush=True)
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+
+@dataclass
+class ImportEntry:
+    """One line of `-X importtime` output, times in microseconds."""
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class ImportProfile:
+    module: str
+    seconds: float
+    module_count: int
+    modules: list[str] = field(default_factory=list)
+    entries: list[ImportEntry] = field(default_factory=list)
+
+    def loaded(self, prefix: str) -> bool:
+        """Whether prefix, or any submodule of it, was imported."""
+        return any(name == prefix or name.startswith(prefix + ".") for name in self.modules)
+
+
+def parse_importtime(stderr: str) -> list[ImportEntry]:
+    """Parse the `import time: self | cumulative | name` lines Python writes to stderr."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        name = parts[2].rstrip()
+        entries.append(ImportEntry(
+            name=name.strip(),
+            self_us=int(parts[0]),
+            cumulative_us=int(parts[1]),
+            depth=(len(name) - len(name.lstrip())) // 2,
+        ))
+    return entries
+
+
+def profile_import(module: str = "src.main", runs: int = 1) -> ImportProfile:
+    """Import module in `runs` fresh interpreters and keep the fastest run."""
+    best = None
+    for _ in range(max(1, runs)):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE, module, MARKER],
+            cwd=PROJECT_DIR,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"importing {module} failed:\n{completed.stderr[-2000:]}")
+        result = json.loads(completed.stdout.splitlines()[-1])
+        if best is None or result["seconds"] < best.seconds:
+            best = ImportProfile(
+                module=module,
+                seconds=result["seconds"],
+                module_count=len(result["modules"]),
+                modules=result["modules"],
+                entries=parse_importtime(completed.stderr.partition(MARKER)[2]),
+            )
+    return best
+
+
+def top_level_costs(entries: list[ImportEntry]) -> dict[str, int]:
+    """Cumulative microseconds per top-level package, counting each import once."""
+    costs: dict[str, int] = {}
+    for entry in entries:
+        if entry.depth == 0:
+            package = entry.name.split(".")[0]
+            costs[package] = costs.get(package, 0) + entry.cumulative_us
+    return costs
+
+
+def format_profile(profile: ImportProfile, top: int = 15) -> str:
+    lines = [
+        f"import {profile.module}: {profile.seconds * 1000:.0f} ms, {profile.module_count} modules",
+        "",
+        f"{'cumulative ms':>14}  {'self ms':>8}  module",
+    ]
+    for entry in sorted(profile.entries, key=lambda entry: -entry.cumulative_us)[:top]:
+        lines.append(f"{entry.cumulative_us / 1000:>14.1f}  {entry.self_us / 1000:>8.1f}  {entry.name}")
+    lines += ["", f"{'cumulative ms':>14}  top-level package"]
+    for package, us in sorted(top_level_costs(profile.entries).items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"{us / 1000:>14.1f}  {package}")
+    return "\n".join(lines)
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="src.main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to try; the fastest is reported")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--json", dest="json_path", help="Also write the profile as JSON to this path")
+    parser.add_argument("--max-seconds", type=float, help="Exit non-zero if the import takes longer")
+    parser.add_argument("--max-modules", type=int, help="Exit non-zero if the import loads more modules")
+    parser.add_argument("--forbid", action="append", default=[], metavar="MODULE",
+                        help="Exit non-zero if this module is imported (repeatable)")
+    args = parser.parse_args(argv)
+
+    profile = profile_import(args.module, args.runs)
+    print(format_profile(profile, args.top))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(asdict(profile), f, indent=2)
+
+    failures = []
+    if args.max_seconds is not None and profile.seconds > args.max_seconds:
+        failures.append(f"import took {profile.seconds:.2f}s, above {args.max_seconds}s")
+    if args.max_modules is not None and profile.module_count > args.max_modules:
+        failures.append(f"import loaded {profile.module_count} modules, above {args.max_modules}")
+    failures += [f"import loaded {name}" for name in args.forbid if profile.loaded(name)]
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,86 @@
+import hashlib
+from functools import cache
+from .catalog import CatalogProduct
+
+# The stable prompt prefix: instructions and stage targets only. Nothing
+# request-specific may go in here, so the bytes sent to the provider are
+# identical on every call and the prefix can be served from the provider's
+# context cache. Any edit changes SYSTEM_MESSAGE_VERSION, which also
+# invalidates cached analyses.
+SYSTEM_MESSAGE = """You are an experienced, patient, and beginner-friendly mentor for indoor cannabis growers. Your goal is to help new growers understand and optimize their grow environment using simple, clear language.
+
+Users will provide CSV files with environmental data (like humidity, light, temperature, and soil moisture) and tell you their plant's growth stage: seedling, vegetation, or flowering.
+
+Here are the ideal environmental conditions you should use as a guide:
+-   **Seedling Stage:**
+    *   VPD (Vapor Pressure Deficit): Keep it between 0.4-0.8 kPa. Think of VPD as how thirsty your plant is; this range means your seedlings are comfortably hydrated.
+    *   Temperature: Aim for 68-77°F (20-25°C).
+    *   Humidity: High, around 70-80%. Seedlings love a humid environment.
+-   **Vegetation Stage:**
+    *   VPD: Target 0.8-1.2 kPa. Your plants are growing bigger and can handle being a bit thirstier, which encourages them to drink more.
+    *   Temperature: A bit warmer, 72-82°F (22-28°C).
+    *   Humidity: Moderate, 55-70%.
+-   **Flowering Stage:**
+    *   VPD: Higher, 1.2-1.6 kPa. This helps the plants focus energy on flower production.
+    *   Temperature: Slightly cooler, 68-79°F (20-26°C).
+    *   Humidity: Lower, 40-50%. This helps prevent mold and encourages resin production.
+
+When providing advice, you MUST:
+1.  Start with a simple, easy-to-understand summary of their current environmental conditions. Avoid jargon or explain it clearly.
+2.  Provide 2-3 concrete, actionable recommendations. Explain *why* each recommendation is important and *how* a new grower can implement it (e.g., "Raise your light by a few inches," "Use a humidifier to increase moisture in the air").
+3.  Ensure at least ONE recommendation includes a relevant product link from the product suggestions provided with the data. Make sure the product is truly helpful for a new grower based on their specific needs. Only use the products listed; never invent product names or URLs.
+
+Prioritize your recommendations as **High Impact**, **Medium Impact**, or **Low Impact** based on how crucial they are for plant health and yield. Present your response in an easy-to-read format with bullet points or clear headings.
+"""
+
+SYSTEM_MESSAGE_VERSION = hashlib.sha256(SYSTEM_MESSAGE.encode("utf-8")).hexdigest()[:12]
+
+
+@cache
+def system_prompt():
+    """The prefix message, built once on first use; every request reuses it.
+
+    Message classes are imported here rather than at module level so that
+    importing the web layer does not load langchain.
+    """
+    from langchain.messages import SystemMessage
+    return SystemMessage(SYSTEM_MESSAGE)
+
+
+def __getattr__(name: str):
+    # SYSTEM_PROMPT stays importable by name; it is built on first access.
+    if name == "SYSTEM_PROMPT":
+        return system_prompt()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def build_user_prompt(growth_stage: str, parsed_data: str, products: list[CatalogProduct]) -> str:
+    """The variable suffix of the prompt: the upload and the products relevant to it."""
+    product_lines = "\n".join(product.to_prompt_line() for product in products)
+    return f"""Growth Stage: {growth_stage}
+
+{parsed_data}
+
+Here are some product suggestions from our database; only use them if they match the grower's specific needs and your recommendations:
+{product_lines}
+
+Analyze this environmental data for the {growth_stage} stage.
+
+Provide recommendations for optimization with product links.
+"""
+
+
+def build_messages(
+    growth_stage: str,
+    parsed_data: str,
+    products: list[CatalogProduct],
+    prefix_cached: bool = False,
+) -> list:
+    """Build the messages for an analysis request.
+
+    With prefix_cached the provider already holds SYSTEM_MESSAGE in its
+    context cache, so only the user prompt is sent.
+    """
+    from langchain.messages import HumanMessage
+    user_prompt = HumanMessage(build_user_prompt(growth_stage, parsed_data, products))
+    return [user_prompt] if prefix_cached else [system_prompt(), user_prompt]
@@ -0,0 +1,196 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+# Header carrying the caller's API key.
+API_KEY_HEADER = "x-api-key"
+API_KEY_CLIENT_PREFIX = "key:"
+
+# Client the current request, or background job, is being served for; model
+# token usage is charged to it.
+current_client: ContextVar[str | None] = ContextVar("current_client", default=None)
+
+
+class QuotaExceededError(Exception):
+    """Raised when a client may not start another analysis yet."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitedError(QuotaExceededError):
+    """The client's request rate is above its token bucket's refill rate."""
+
+
+class TokenBudgetExceededError(QuotaExceededError):
+    """The client has used its model token budget for the day."""
+
+
+def client_key(api_key: str | None, host: str | None) -> str:
+    """Identify a client by its API key when it sends one, else by address.
+
+    API keys are hashed so they are never stored.
+    """
+    if api_key:
+        return API_KEY_CLIENT_PREFIX + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    return f"ip:{host or 'unknown'}"
+
+
+def identified_by_api_key(key: str | None) -> bool:
+    """Whether a client_key() came from an API key rather than the caller's address."""
+    return key is not None and key.startswith(API_KEY_CLIENT_PREFIX)
+
+
+def utc_day(now: float) -> str:
+    return datetime.fromtimestamp(now, timezone.utc).date().isoformat()
+
+
+def seconds_until_next_day(now: float) -> float:
+    return 86400 - now % 86400
+
+
+class MemoryQuotaStore:
+    """Token buckets and daily token usage in process memory."""
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._usage: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        """Take one token from key's bucket; returns 0, or seconds until a token is available."""
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated_at) * rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1, now)
+            return 0.0
+
+    def add_usage(self, key: str, day: str, tokens: int) -> None:
+        with self._lock:
+            self._usage[key, day] = self._usage.get((key, day), 0) + tokens
+            for stale in [k for k in self._usage if k[1] < day]:
+                del self._usage[stale]
+
+    def usage(self, key: str, day: str) -> int:
+        with self._lock:
+            return self._usage.get((key, day), 0)
+
+
+class SQLiteQuotaStore:
+    """Token buckets and daily token usage in SQLite, shared by every worker process."""
+
+    def __init__(self, path: str | Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=5)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS rate_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS token_usage (
+                    key TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    PRIMARY KEY (key, day)
+                )"""
+            )
+
+    def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        """Take one token from key's bucket; returns 0, or seconds until a token is available."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM rate_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, updated_at = row if row else (float(burst), now)
+                tokens = min(float(burst), tokens + (now - updated_at) * rate)
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    (key, tokens - 1 if not wait else tokens, now),
+                )
+            finally:
+                self._conn.execute("COMMIT")
+        return wait
+
+    def add_usage(self, key: str, day: str, tokens: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO token_usage (key, day, tokens) VALUES (?, ?, ?) "
+                "ON CONFLICT (key, day) DO UPDATE SET tokens = tokens + excluded.tokens",
+                (key, day, tokens),
+            )
+            self._conn.execute("DELETE FROM token_usage WHERE day < ?", (day,))
+
+    def usage(self, key: str, day: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tokens FROM token_usage WHERE key = ? AND day = ?", (key, day)
+            ).fetchone()
+        return row[0] if row else 0
+
+
+class ClientQuotas:
+    """Per-client request rate limits and daily model token budgets.
+
+    Each client has a token bucket holding up to `burst` requests and
+    refilled at requests_per_minute. Prompt and completion tokens of every
+    model call made for the client are added to its usage for the UTC day;
+    once that reaches daily_token_budget, further requests are refused until
+    the next day. A limit of 0 disables it.
+    """
+
+    def __init__(
+        self,
+        store: MemoryQuotaStore | SQLiteQuotaStore,
+        requests_per_minute: float,
+        burst: int,
+        daily_token_budget: int,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.daily_token_budget = daily_token_budget
+        self._clock = clock
+
+    def admit(self, key: str) -> None:
+        """Count a request against the client's limits, raising QuotaExceededError if it is over one."""
+        now = self._clock()
+        if self.daily_token_budget and self.store.usage(key, utc_day(now)) >= self.daily_token_budget:
+            raise TokenBudgetExceededError(
+                "Daily model token budget used up, please retry tomorrow.", seconds_until_next_day(now)
+            )
+        if self.requests_per_minute:
+            wait = self.store.take(key, self.requests_per_minute / 60, max(1, self.burst), now)
+            if wait:
+                raise RateLimitedError("Too many requests, please slow down.", wait)
+
+    def charge(self, key: str, tokens: int) -> None:
+        """Add model tokens used for the client to today's usage."""
+        if tokens > 0:
+            self.store.add_usage(key, utc_day(self._clock()), tokens)
+
+    def usage(self, key: str) -> dict:
+        used = self.store.usage(key, utc_day(self._clock()))
+        return {
+            "tokens_used": used,
+            "daily_token_budget": self.daily_token_budget or None,
+            "tokens_remaining": max(0, self.daily_token_budget - used) if self.daily_token_budget else None,
+        }
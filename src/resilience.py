@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import math
+import random
+import sys
+import time
+from collections import deque
+from typing import Awaitable, Callable
+from langchain_core.exceptions import ModelError, OutputParserException
+from pydantic import ValidationError
+from .telemetry import LLM_HEDGES, LLM_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# The model answered, but with output we couldn't parse; retrying the same
+# prompt is the caller's decision, and it says nothing about provider health.
+NON_RETRYABLE_ERRORS = (ValidationError, OutputParserException)
+
+# Failures worth sending the same call again for, besides provider errors
+# that ModelError marks retryable (rate limits, 5xx).
+TRANSIENT_ERRORS = (TimeoutError, ConnectionError)
+
+# Number of recent call latencies kept for the hedging p95.
+LATENCY_WINDOW = 200
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether a failed model call may succeed if sent again.
+
+    Timeouts, dropped connections, rate limits and server errors are;
+    invalid requests and other 4xx errors fail the same way every time.
+    """
+    if isinstance(exc, ModelError):
+        return exc.is_retryable
+    # httpx is only loaded with a provider client, and its errors can't exist before.
+    httpx = sys.modules.get("httpx")
+    return isinstance(exc, TRANSIENT_ERRORS) or (httpx is not None and isinstance(exc, httpx.TransportError))
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when the model could not produce a response within the retry policy."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised without calling the model while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stops calling a failing provider for a while.
+
+    Closed: calls go through. After failure_threshold consecutive failed calls
+    the circuit opens and calls are rejected. Once reset_timeout has passed it
+    is half-open: a single trial call is let through, closing the circuit on
+    success or reopening it on failure.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_started: float | None = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        now = self._clock()
+        # A trial call that never reported back (e.g. it was cancelled) is given up on.
+        if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+            return False
+        self._probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_started = None
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logger.warning("circuit breaker opened after %d failed model calls", self._failures)
+            self._opened_at = self._clock()
+
+
+class ResilientChatModel:
+    """Wraps a chat model (or its structured-output view) with a call policy.
+
+    Every ainvoke/astream call gets a deadline of `timeout` seconds and, when
+    it fails with a transient error (see is_transient), is retried up to
+    max_retries times with full-jitter exponential backoff. With hedge
+    enabled, a second identical call is sent once the first has run longer
+    than the p95 of recent latencies, and whichever succeeds first wins.
+    Other errors are raised as LLMUnavailableError at once. Calls that
+    exhaust their retries count against the circuit breaker; while it is
+    open, calls fail fast with CircuitOpenError.
+    """
+
+    def __init__(
+        self,
+        inner,
+        timeout: float,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        breaker: CircuitBreaker,
+        hedge: bool = False,
+        hedge_min_samples: int = 20,
+        seed: int | None = None,
+    ):
+        self.inner = inner
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._random = random.Random(seed)
+
+    def with_structured_output(self, schema) -> "ResilientChatModel":
+        """Structured-output view with the same policy, sharing this model's circuit breaker."""
+        return ResilientChatModel(
+            self.inner.with_structured_output(schema),
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+            backoff_base=self.backoff_base,
+            backoff_max=self.backoff_max,
+            breaker=self.breaker,
+            hedge=self.hedge,
+            hedge_min_samples=self.hedge_min_samples,
+        )
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (1-based)."""
+        return self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def hedge_delay(self) -> float | None:
+        """Seconds after which to hedge, or None when hedging is off or there is too little data."""
+        if not self.hedge or len(self._latencies) < max(1, self.hedge_min_samples):
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def _check_breaker(self) -> None:
+        if not self.breaker.allow():
+            raise CircuitOpenError("The model is temporarily unavailable.")
+
+    def _give_up_unless_transient(self, exc: Exception, attempt: int) -> None:
+        """Raise LLMUnavailableError for exc unless the failed attempt should be retried."""
+        if not is_transient(exc):
+            # The request itself was refused, which says nothing about provider health.
+            self.breaker.record_success()
+            raise LLMUnavailableError(f"Model call failed: {exc!r}") from exc
+        if attempt >= self.max_retries:
+            self.breaker.record_failure()
+            raise LLMUnavailableError(f"Model call failed after {attempt + 1} attempts: {exc!r}") from exc
+
+    async def ainvoke(self, messages, **kwargs):
+        self._check_breaker()
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                LLM_RETRIES.inc()
+                await asyncio.sleep(self.backoff_delay(attempt))
+            try:
+                response = await self._attempt(lambda: self.inner.ainvoke(messages, **kwargs))
+            except NON_RETRYABLE_ERRORS:
+                self.breaker.record_success()
+                raise
+            except Exception as exc:
+                logger.warning("model call attempt %d failed: %r", attempt + 1, exc)
+                self._give_up_unless_transient(exc, attempt)
+                continue
+            self.breaker.record_success()
+            return response
+
+    async def _attempt(self, make_call: Callable[[], Awaitable]):
+        start = time.perf_counter()
+        hedge_after = self.hedge_delay()
+        if hedge_after is None:
+            response = await asyncio.wait_for(make_call(), self.timeout)
+        else:
+            response = await asyncio.wait_for(self._hedged(make_call, hedge_after), self.timeout)
+        self._latencies.append(time.perf_counter() - start)
+        return response
+
+    async def _hedged(self, make_call: Callable[[], Awaitable], hedge_after: float):
+        first = asyncio.ensure_future(make_call())
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if done:
+                return first.result()
+            LLM_HEDGES.inc()
+            tasks.add(asyncio.ensure_future(make_call()))
+            error: BaseException | None = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                    # The other call would fail the same way; don't wait for it.
+                    if not is_transient(error):
+                        raise error
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def astream(self, messages, **kwargs):
+        """Stream chunks from the inner model.
+
+        The deadline and retries cover the wait for the first chunk; once
+        output has been yielded a failure can't be retried transparently and
+        is raised as LLMUnavailableError.
+        """
+        self._check_breaker()
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                LLM_RETRIES.inc()
+                await asyncio.sleep(self.backoff_delay(attempt))
+            iterator = aiter(self.inner.astream(messages, **kwargs))
+            try:
+                first = await asyncio.wait_for(anext(iterator), self.timeout)
+            except StopAsyncIteration:
+                self.breaker.record_success()
+                return
+            except Exception as exc:
+                logger.warning("model stream attempt %d failed: %r", attempt + 1, exc)
+                aclose = getattr(iterator, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+                self._give_up_unless_transient(exc, attempt)
+                continue
+            break
+
+        yield first
+        try:
+            async for chunk in iterator:
+                yield chunk
+        except Exception as exc:
+            self.breaker.record_failure()
+            raise LLMUnavailableError(f"Model stream failed part way through: {exc!r}") from exc
+        self.breaker.record_success()
@@ -0,0 +1,204 @@
+from typing import Literal
+from .catalog import CatalogProduct, ProductCatalog
+from .environment import EnvironmentMetrics
+from .models import AnalysisResponse, ProductLink, Recommendation
+from .stages import StageTargets, get_stage_targets
+
+# Which StageTargets field each issue prefix is measured against, and its unit.
+ISSUE_TARGETS = {
+    "humidity": ("humidity_pct", "%"),
+    "temperature": ("temperature_f", "°F"),
+    "vpd": ("vpd_kpa", " kPa"),
+}
+
+# Templated advice for each issue EnvironmentMetrics.issues() can report.
+ISSUE_ADVICE: dict[str, tuple[str, str, str]] = {
+    "humidity_high": (
+        "Bring Your Humidity Down",
+        "Your humidity is running above the {stage} range of {range}. If you're using a humidifier, "
+        "turn it down. Increase your exhaust fan speed to pull out moist air, and if that isn't enough, "
+        "a dehumidifier will keep it in check. Too much moisture invites mold and slows growth.",
+        "high",
+    ),
+    "humidity_low": (
+        "Add Some Moisture to the Air",
+        "Your humidity is below the {stage} range of {range}. Lower your exhaust fan speed a little, "
+        "and run a humidifier if needed. Dry air makes plants lose water faster than their roots can keep up.",
+        "high",
+    ),
+    "temperature_high": (
+        "Cool Your Tent Down",
+        "Your tent is warmer than the {stage} range of {range}. Raise your light a few inches, increase "
+        "exhaust fan speed, and make sure fresh air can get in. Heat stress slows growth and can bleach leaves.",
+        "high",
+    ),
+    "temperature_low": (
+        "Warm Your Tent Up",
+        "Your tent is cooler than the {stage} range of {range}. Lower your exhaust fan speed, especially "
+        "with lights off, or add a small heater. Cold slows down your plants' metabolism.",
+        "high",
+    ),
+    "vpd_high": (
+        "Lower Your VPD",
+        "Your VPD is above the {stage} range of {range}, so your plants are losing water too quickly. "
+        "Bring humidity up a little or temperature down a little until VPD settles into range.",
+        "medium",
+    ),
+    "vpd_low": (
+        "Raise Your VPD",
+        "Your VPD is below the {stage} range of {range}, so your plants aren't drinking as much as they "
+        "could. Lower humidity slightly or warm the tent a little to get VPD back into range.",
+        "medium",
+    ),
+    "light_low": (
+        "Give Your Plants More Light",
+        "Your light intensity is on the low side for the {stage} stage. Lower your light closer to the "
+        "canopy or turn up its dimmer gradually, watching for signs of stress.",
+        "medium",
+    ),
+}
+
+# Issue combinations with one well-understood cause that the templates cover
+# on their own; anything else is escalated to the model in "known_issues" mode.
+# light_low is independent of the others and may accompany any of them.
+KNOWN_PATTERNS: set[frozenset[str]] = {
+    frozenset(),
+    *(frozenset([issue]) for issue in ISSUE_ADVICE if issue != "light_low"),
+    frozenset(["humidity_high", "vpd_low"]),
+    frozenset(["humidity_low", "vpd_high"]),
+    frozenset(["temperature_high", "vpd_high"]),
+    frozenset(["temperature_low", "vpd_low"]),
+}
+
+RulesMode = Literal["off", "in_range", "known_issues"]
+
+IN_RANGE_ADVICE = [
+    (
+        "Keep Conditions Steady",
+        "Your environment is inside the {stage} targets. Keep your current settings and avoid big changes; "
+        "a controller that automates your fans makes this easier.",
+        "low",
+    ),
+    (
+        "Check Your Readings Daily",
+        "Glance at temperature and humidity each day, especially when the weather outside changes, so you "
+        "can catch drift before your plants feel it.",
+        "low",
+    ),
+]
+
+# Advice for stages without STAGE_TARGETS, where no reading can be judged in or out of range.
+GENERAL_ADVICE = [
+    (
+        "Match Your Conditions to Your Stage",
+        "We don't have target ranges for the {stage} stage. Compare your readings with the targets for the "
+        "closest of seedling, vegetation or flowering, and adjust your fans and humidifier gradually.",
+        "medium",
+    ),
+    IN_RANGE_ADVICE[1],
+]
+
+# Linked when the catalog has nothing to offer, so a rules response always carries a product.
+FALLBACK_PRODUCT = ProductLink(
+    name="CLOUDLINE PRO T6 Inline Fan",
+    url="https://acinfinity.com/hydroponics-growers/cloudline-pro-t6-quiet-inline-duct-fan-system-with-temperature-humidity-vpd-controller-6-inch/",
+    price_range="$199-229",
+)
+
+
+def product_link(product: CatalogProduct) -> ProductLink:
+    return ProductLink(name=product.name, url=product.url, price_range=product.price or None)
+
+
+def format_range(targets: StageTargets, issue: str) -> str:
+    """The stage's target range for the reading an issue is about, e.g. "55-70%"."""
+    target = ISSUE_TARGETS.get(issue.rsplit("_", 1)[0])
+    if target is None:
+        return ""
+    field_name, unit = target
+    low, high = getattr(targets, field_name)
+    return f"{low:g}-{high:g}{unit}"
+
+
+def build_summary(growth_stage: str, metrics: EnvironmentMetrics | None, issues: list[str]) -> str:
+    if metrics is None or metrics.count == 0:
+        return (
+            f"We couldn't find temperature and humidity columns in your data, so here is general advice "
+            f"for the {growth_stage} stage."
+        )
+    conditions = (
+        f"Across {metrics.count} readings your average VPD was {metrics.mean('vpd_kpa'):.2f} kPa, "
+        f"temperature {metrics.mean('temperature_f'):.1f}°F and humidity {metrics.mean('humidity_pct'):.0f}%"
+    )
+    if get_stage_targets(growth_stage) is None:
+        return f"{conditions}. We don't have targets for the {growth_stage} stage, so here is general advice."
+    shares = metrics.stage_shares(growth_stage)
+    conditions += f", with {shares['all']:.0%} of readings inside every {growth_stage} target."
+    if not issues:
+        return f"Your tent looks great for the {growth_stage} stage. {conditions}"
+    labels = ", ".join(ISSUE_ADVICE[issue][0].lower() for issue in issues if issue in ISSUE_ADVICE)
+    return f"{conditions} The main things to work on: {labels}."
+
+
+def rules_can_answer(
+    growth_stage: str,
+    metrics: EnvironmentMetrics | None,
+    mode: RulesMode,
+    min_readings: int,
+) -> bool:
+    """Whether the rules engine can answer without escalating to the model.
+
+    "in_range" answers only when every condition is inside the stage's
+    targets; "known_issues" also answers when the issues match a
+    KNOWN_PATTERNS combination. Unknown stages and uploads without enough
+    recognized readings always go to the model.
+    """
+    if mode == "off" or metrics is None or metrics.count < min_readings:
+        return False
+    if get_stage_targets(growth_stage) is None:
+        return False
+    issues = metrics.issues(growth_stage)
+    if not issues:
+        return True
+    return mode == "known_issues" and frozenset(issues) - {"light_low"} in KNOWN_PATTERNS
+
+
+def build_rules_response(
+    growth_stage: str,
+    metrics: EnvironmentMetrics | None,
+    catalog: ProductCatalog,
+) -> AnalysisResponse:
+    """Build an AnalysisResponse from templated advice, without calling the model.
+
+    Stages without targets get GENERAL_ADVICE, and FALLBACK_PRODUCT is linked
+    when the catalog has no product to suggest.
+    """
+    targets = get_stage_targets(growth_stage)
+    issues = metrics.issues(growth_stage) if metrics is not None else []
+    stage = growth_stage.strip().lower()
+
+    recommendations = []
+    for issue in issues[:3]:
+        title, description, priority = ISSUE_ADVICE[issue]
+        products = catalog.products_for_issues([issue], k=1)
+        recommendations.append(Recommendation(
+            title=title,
+            description=description.format(stage=stage, range=format_range(targets, issue)),
+            priority=priority,
+            product=product_link(products[0]) if products else None,
+        ))
+
+    for title, description, priority in IN_RANGE_ADVICE if targets is not None else GENERAL_ADVICE:
+        if len(recommendations) >= 2:
+            break
+        recommendations.append(Recommendation(
+            title=title,
+            description=description.format(stage=stage),
+            priority=priority,
+        ))
+
+    if not any(rec.product for rec in recommendations):
+        products = catalog.products_for_issues([], k=1)
+        recommendations[0].product = product_link(products[0]) if products else FALLBACK_PRODUCT
+
+    return AnalysisResponse(summary=build_summary(stage, metrics, issues), recommendations=recommendations)
@@ -0,0 +1,64 @@
+"""Production entry point: several uvicorn worker processes with warm startup.
+
+Run with `uv run python -m src.server` (add --help for options).
+
+With more than one worker the analysis cache, the LLM call limit, the
+per-client quotas and the background job store default to their SQLite
+backends, so every worker shares them. Each worker pre-warms its model clients and catalog in the app's
+lifespan hook, and on SIGTERM stops accepting connections and lets in-flight
+requests and queued jobs finish for up to GROW_ASSIST_SHUTDOWN_GRACE_SECONDS.
+"""
+import argparse
+import logging
+import os
+import time
+from . import config
+
+
+def create_app():
+    """Import the app, recording how long the import took in this worker."""
+    # Workers are fresh processes; log the app's startup and first-request timings.
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    from . import main
+    from .telemetry import STARTUP_SECONDS
+    STARTUP_SECONDS["import"] = time.perf_counter() - start
+    return main.app
+
+
+def share_state_between_workers(workers: int) -> None:
+    """Default the cache, LLM limiter, client quotas and job store to SQLite so worker processes share them.
+
+    Settings given explicitly in the environment are left alone. Workers
+    are started as new processes and read these when they import config.
+    """
+    if workers > 1:
+        os.environ.setdefault("GROW_ASSIST_CACHE_BACKEND", "sqlite")
+        os.environ.setdefault("GROW_ASSIST_LIMITER_BACKEND", "sqlite")
+        os.environ.setdefault("GROW_ASSIST_QUOTA_BACKEND", "sqlite")
+        os.environ.setdefault("GROW_ASSIST_JOB_STORE", "sqlite")
+
+
+def main(argv: list[str] | None = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.WEB_WORKERS)
+    args = parser.parse_args(argv)
+
+    share_state_between_workers(args.workers)
+    uvicorn.run(
+        "src.server:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=int(config.SHUTDOWN_GRACE_SECONDS),
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+import numpy as np
+from .environment import EnvironmentMetrics
+from .models import AnalysisResponse
+from .stages import STAGE_TARGETS
+
+# Features compared between uploads and the difference in each that counts as
+# one unit of distance: means within these tolerances are "the same" tent.
+FEATURE_SCALES = {
+    "vpd_kpa_mean": 0.05,
+    "vpd_kpa_min": 0.1,
+    "vpd_kpa_max": 0.1,
+    "temperature_f_mean": 1.5,
+    "humidity_pct_mean": 3.0,
+    "in_range_all": 0.1,
+}
+
+
+def environment_features(metrics: EnvironmentMetrics, growth_stage: str) -> np.ndarray:
+    """Scaled feature vector of an upload's environment for nearest-neighbour lookups."""
+    shares = metrics.stage_shares(growth_stage)
+    values = {
+        "vpd_kpa_mean": metrics.mean("vpd_kpa"),
+        "vpd_kpa_min": metrics.minimum("vpd_kpa"),
+        "vpd_kpa_max": metrics.maximum("vpd_kpa"),
+        "temperature_f_mean": metrics.mean("temperature_f"),
+        "humidity_pct_mean": metrics.mean("humidity_pct"),
+        "in_range_all": shares["all"],
+    }
+    return np.array([values[name] / scale for name, scale in FEATURE_SCALES.items()], dtype=np.float64)
+
+
+def partition_key(metrics: EnvironmentMetrics, growth_stage: str, prompt_version: str) -> tuple:
+    """Uploads are only compared with others of the same stage, issues and prompt version."""
+    return (growth_stage.strip().lower(), tuple(metrics.issues(growth_stage)), prompt_version)
+
+
+@dataclass
+class _Partition:
+    vectors: np.ndarray = field(default_factory=lambda: np.empty((0, len(FEATURE_SCALES))))
+    responses: list[AnalysisResponse] = field(default_factory=list)
+    created_at: list[float] = field(default_factory=list)
+    used_at: list[float] = field(default_factory=list)
+
+    def remove(self, keep: np.ndarray) -> None:
+        self.vectors = self.vectors[keep]
+        indices = np.flatnonzero(keep)
+        self.responses = [self.responses[i] for i in indices]
+        self.created_at = [self.created_at[i] for i in indices]
+        self.used_at = [self.used_at[i] for i in indices]
+
+
+class SimilarityCache:
+    """Reuses analyses of uploads whose environment is nearly the same.
+
+    Uploads are partitioned by growth stage, out-of-range issues and prompt
+    version, then compared by the Chebyshev distance between their scaled
+    feature vectors (see FEATURE_SCALES): a distance of at most `threshold`
+    means every feature is within threshold times its tolerance. Entries
+    older than ttl_seconds are dropped; beyond max_entries the least recently
+    used entry is evicted. The age of every reused analysis is tracked.
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        max_entries: int,
+        ttl_seconds: float,
+        min_readings: int = 1,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.min_readings = min_readings
+        self._clock = clock
+        self._partitions: dict[tuple, _Partition] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self._hit_ages: list[float] = []
+
+    def usable(self, growth_stage: str, metrics: EnvironmentMetrics | None) -> bool:
+        """Whether the upload has enough readings, for a known stage, to be matched."""
+        return (
+            metrics is not None
+            and metrics.count >= self.min_readings
+            and growth_stage.strip().lower() in STAGE_TARGETS
+        )
+
+    def get(self, growth_stage: str, metrics: EnvironmentMetrics, prompt_version: str) -> AnalysisResponse | None:
+        """The cached analysis of the nearest upload within the threshold, if any."""
+        vector = environment_features(metrics, growth_stage)
+        now = self._clock()
+        with self._lock:
+            partition = self._partitions.get(partition_key(metrics, growth_stage, prompt_version))
+            if partition is not None:
+                self._expire(partition, now)
+            if partition is None or not partition.responses:
+                self.misses += 1
+                return None
+            distances = np.abs(partition.vectors - vector).max(axis=1)
+            nearest = int(distances.argmin())
+            if distances[nearest] > self.threshold:
+                self.misses += 1
+                return None
+            partition.used_at[nearest] = now
+            self.hits += 1
+            self._hit_ages.append(now - partition.created_at[nearest])
+            del self._hit_ages[:-1000]
+            return partition.responses[nearest]
+
+    def set(
+        self,
+        growth_stage: str,
+        metrics: EnvironmentMetrics,
+        prompt_version: str,
+        response: AnalysisResponse,
+    ) -> None:
+        vector = environment_features(metrics, growth_stage)
+        now = self._clock()
+        with self._lock:
+            partition = self._partitions.setdefault(partition_key(metrics, growth_stage, prompt_version), _Partition())
+            partition.vectors = np.vstack([partition.vectors, vector])
+            partition.responses.append(response)
+            partition.created_at.append(now)
+            partition.used_at.append(now)
+            self._evict()
+
+    def _expire(self, partition: _Partition, now: float) -> None:
+        fresh = now - np.array(partition.created_at) <= self.ttl_seconds
+        if not fresh.all():
+            self.expired += int((~fresh).sum())
+            partition.remove(fresh)
+
+    def _evict(self) -> None:
+        while len(self) > self.max_entries:
+            key, partition = min(
+                ((key, partition) for key, partition in self._partitions.items() if partition.responses),
+                key=lambda item: min(item[1].used_at),
+            )
+            keep = np.ones(len(partition.responses), dtype=bool)
+            keep[int(np.argmin(partition.used_at))] = False
+            partition.remove(keep)
+            if not partition.responses:
+                del self._partitions[key]
+            self.evicted += 1
+
+    def __len__(self) -> int:
+        return sum(len(partition.responses) for partition in self._partitions.values())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            ages = sorted(self._hit_ages)
+            entries = len(self)
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "hit_age_seconds_median": ages[len(ages) // 2] if ages else None,
+            "hit_age_seconds_max": ages[-1] if ages else None,
+        }
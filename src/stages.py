@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class StageTargets:
+    """Ideal environmental ranges for one growth stage."""
+    vpd_kpa: tuple[float, float]
+    temperature_f: tuple[float, float]
+    humidity_pct: tuple[float, float]
+
+
+# Mirrors the ranges described to the model in SYSTEM_MESSAGE.
+STAGE_TARGETS: dict[str, StageTargets] = {
+    "seedling": StageTargets(vpd_kpa=(0.4, 0.8), temperature_f=(68, 77), humidity_pct=(70, 80)),
+    "vegetation": StageTargets(vpd_kpa=(0.8, 1.2), temperature_f=(72, 82), humidity_pct=(55, 70)),
+    "flowering": StageTargets(vpd_kpa=(1.2, 1.6), temperature_f=(68, 79), humidity_pct=(40, 50)),
+}
+
+
+def get_stage_targets(growth_stage: str) -> StageTargets | None:
+    """Look up the targets for a growth stage, ignoring case and whitespace."""
+    return STAGE_TARGETS.get(growth_stage.strip().lower())
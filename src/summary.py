@@ -0,0 +1,370 @@
+import random
+import re
+from datetime import datetime
+import numpy as np
+from .stages import get_stage_targets
+
+TIMESTAMP_ALIASES = {"timestamp", "time", "datetime", "date_time", "date", "ts", "recorded_at"}
+TEMPERATURE_ALIASES = {"temperature", "temp", "air_temp", "air_temperature", "temp_f", "temp_c",
+                       "temperature_f", "temperature_c", "temperature_fahrenheit", "temperature_celsius"}
+HUMIDITY_ALIASES = {"humidity", "rh", "relative_humidity", "humidity_pct", "humidity_percent", "rh_pct"}
+VPD_ALIASES = {"vpd", "vpd_kpa", "leaf_vpd"}
+
+TIMESTAMP_FORMATS = ("%m/%d/%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %I:%M %p", "%Y/%m/%d %H:%M")
+
+PERCENTILES = (10, 50, 90)
+
+
+def normalize_header(header: str) -> str:
+    """Lower-case a column header and collapse punctuation into underscores."""
+    header = header.strip().lower().replace("°", "")
+    return re.sub(r"[^a-z0-9]+", "_", header).strip("_")
+
+
+def detect_column(headers: list[str], aliases: set[str]) -> str | None:
+    """Return the first header whose normalized form is one of aliases."""
+    for header in headers:
+        if normalize_header(header) in aliases:
+            return header
+    return None
+
+
+def header_temperature_unit(header: str) -> str | None:
+    """Infer "F" or "C" from a temperature header, or None if it doesn't say."""
+    normalized = normalize_header(header)
+    if normalized.endswith(("_f", "fahrenheit")):
+        return "F"
+    if normalized.endswith(("_c", "celsius")):
+        return "C"
+    return None
+
+
+def guess_temperature_unit(values: np.ndarray) -> str | None:
+    """Infer "F" or "C" from the median of a column's readings, or None if it has none.
+
+    Grow rooms are never below 45°F, so a typical reading below that means Celsius.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return None
+    return "C" if np.median(finite) < 45 else "F"
+
+
+def parse_number(value: str | None) -> float | None:
+    """Parse a numeric CSV cell, tolerating units like % or °F."""
+    if not value:
+        return None
+    value = value.strip().rstrip("%").removesuffix("°F").removesuffix("°C").strip()
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_timestamp(value: str | None) -> datetime | None:
+    """Parse the timestamp formats controller exports commonly use."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    number = parse_number(value)
+    if number is not None and number > 1e9:
+        return datetime.fromtimestamp(number / 1000 if number > 1e12 else number)
+    return None
+
+
+class ColumnStats:
+    """Running min/max/mean for one column plus a fixed-size sample for percentiles."""
+
+    def __init__(self, sample_size: int, seed: int = 0):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+        self.sample_size = sample_size
+        self.sample: list[float] = []
+        self._random = random.Random(seed)
+        self._np_random = np.random.default_rng(seed)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        if len(self.sample) < self.sample_size:
+            self.sample.append(value)
+        else:
+            slot = self._random.randrange(self.count)
+            if slot < self.sample_size:
+                self.sample[slot] = value
+
+    def add_array(self, values: np.ndarray) -> None:
+        """Fold in the finite values of an array at once; same result as add() per value."""
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        seen = self.count
+        self.count += int(values.size)
+        self.total += float(values.sum())
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+        room = self.sample_size - len(self.sample)
+        if room > 0:
+            self.sample.extend(values[:room].tolist())
+            seen += min(room, values.size)
+            values = values[room:]
+        if values.size:
+            # Reservoir sampling: the n-th value seen replaces a random slot below n.
+            slots = (self._np_random.random(values.size) * (seen + np.arange(1, values.size + 1))).astype(np.int64)
+            keep = slots < self.sample_size
+            sample = np.asarray(self.sample)
+            sample[slots[keep]] = values[keep]
+            self.sample = sample.tolist()
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Approximate the q-th percentile from the sample."""
+        ordered = sorted(self.sample)
+        index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class EnvironmentDigest:
+    """Incrementally summarizes CSV rows into a prompt of bounded size.
+
+    Small uploads are rendered row by row as before. Once an upload has more
+    than raw_row_limit rows, only per-column statistics, hour-of-day averages
+    and out-of-range counts against the stage targets are rendered, so the
+    prompt size no longer depends on the number of rows.
+    """
+
+    def __init__(
+        self,
+        headers: list[str],
+        growth_stage: str | None = None,
+        raw_row_limit: int = 48,
+        max_columns: int = 12,
+        sample_size: int = 1024,
+    ):
+        self.headers = headers
+        self.targets = get_stage_targets(growth_stage) if growth_stage else None
+        self.growth_stage = growth_stage
+        self.raw_row_limit = raw_row_limit
+        self.max_columns = max_columns
+        self.sample_size = sample_size
+
+        self.timestamp_column = detect_column(headers, TIMESTAMP_ALIASES)
+        self.temperature_column = detect_column(headers, TEMPERATURE_ALIASES)
+        self.humidity_column = detect_column(headers, HUMIDITY_ALIASES)
+        self.vpd_column = detect_column(headers, VPD_ALIASES)
+        self.temperature_unit = header_temperature_unit(self.temperature_column) if self.temperature_column else None
+
+        self.row_count = 0
+        self.raw_rows: list[dict[str, str]] = []
+        self.columns: dict[str, ColumnStats] = {}
+        self.hourly: dict[int, dict[str, list[float]]] = {}
+        self.excursions: dict[str, list[int]] = {}
+
+    def add_row(self, row: dict[str, str]) -> None:
+        self.row_count += 1
+        if self.row_count <= self.raw_row_limit:
+            self.raw_rows.append(row)
+        elif self.raw_rows:
+            self.raw_rows = []
+
+        for header, value in row.items():
+            if header is None or header == self.timestamp_column:
+                continue
+            number = parse_number(value)
+            if number is None:
+                continue
+            stats = self.columns.get(header)
+            if stats is None:
+                if len(self.columns) >= self.max_columns:
+                    continue
+                stats = self.columns[header] = ColumnStats(self.sample_size)
+            stats.add(number)
+
+        temperature_f = self._temperature_f(row)
+        humidity = parse_number(row.get(self.humidity_column)) if self.humidity_column else None
+        vpd = parse_number(row.get(self.vpd_column)) if self.vpd_column else None
+        self.add_environment(parse_timestamp(row.get(self.timestamp_column)) if self.timestamp_column else None,
+                             temperature_f, humidity, vpd)
+
+    def add_environment(
+        self,
+        timestamp: datetime | None,
+        temperature_f: float | None,
+        humidity: float | None,
+        vpd: float | None,
+    ) -> None:
+        """Fold one reading's normalized environment values into the hourly and excursion aggregates."""
+        readings = {"temperature_f": temperature_f, "humidity_pct": humidity, "vpd_kpa": vpd}
+        if timestamp is not None:
+            bucket = self.hourly.setdefault(timestamp.hour, {})
+            for name, value in readings.items():
+                if value is not None:
+                    running = bucket.setdefault(name, [0.0, 0])
+                    running[0] += value
+                    running[1] += 1
+
+        if self.targets is not None:
+            for name, value in readings.items():
+                if value is None:
+                    continue
+                low, high = getattr(self.targets, name)
+                counts = self.excursions.setdefault(name, [0, 0, 0])
+                counts[2] += 1
+                if value < low:
+                    counts[0] += 1
+                elif value > high:
+                    counts[1] += 1
+
+    def add_columns(
+        self,
+        columns: dict[str, np.ndarray],
+        hours: np.ndarray | None = None,
+        timestamps: list[str] | None = None,
+    ) -> None:
+        """Fold a batch of typed columns (e.g. a Parquet row group) into the digest.
+
+        columns maps headers to equal-length float arrays, with NaN for
+        missing values. hours holds each row's hour of day (-1 if unknown);
+        timestamps, which may be shorter than the batch, labels the rows kept
+        for rendering. Equivalent to add_row() for every row, without
+        formatting the values as text.
+        """
+        size = len(next(iter(columns.values()))) if columns else len(hours if hours is not None else [])
+        start = self.row_count
+        self.row_count += size
+        for i in range(max(0, min(size, self.raw_row_limit - start))):
+            row = {}
+            for header in self.headers:
+                if header == self.timestamp_column:
+                    row[header] = timestamps[i] if timestamps is not None and i < len(timestamps) else ""
+                elif header in columns:
+                    value = columns[header][i]
+                    row[header] = "" if np.isnan(value) else f"{value:g}"
+            self.raw_rows.append(row)
+        if self.row_count > self.raw_row_limit and self.raw_rows:
+            self.raw_rows = []
+
+        for header, values in columns.items():
+            if header == self.timestamp_column:
+                continue
+            stats = self.columns.get(header)
+            if stats is None:
+                if len(self.columns) >= self.max_columns or not np.isfinite(values).any():
+                    continue
+                stats = self.columns[header] = ColumnStats(self.sample_size)
+            stats.add_array(values)
+
+        temperature_f = None
+        if self.temperature_column in columns:
+            temperature = columns[self.temperature_column]
+            if self.temperature_unit is None:
+                self.temperature_unit = guess_temperature_unit(temperature)
+            temperature_f = temperature * 9 / 5 + 32 if self.temperature_unit == "C" else temperature
+        readings = {
+            "temperature_f": temperature_f,
+            "humidity_pct": columns.get(self.humidity_column),
+            "vpd_kpa": columns.get(self.vpd_column),
+        }
+        readings = {name: values for name, values in readings.items() if values is not None}
+
+        if hours is not None:
+            for name, values in readings.items():
+                present = (hours >= 0) & np.isfinite(values)
+                totals = np.bincount(hours[present], weights=values[present], minlength=24)
+                counts = np.bincount(hours[present], minlength=24)
+                for hour in np.flatnonzero(counts):
+                    running = self.hourly.setdefault(int(hour), {}).setdefault(name, [0.0, 0])
+                    running[0] += float(totals[hour])
+                    running[1] += int(counts[hour])
+
+        if self.targets is not None:
+            for name, values in readings.items():
+                present = values[np.isfinite(values)]
+                if present.size == 0:
+                    continue
+                low, high = getattr(self.targets, name)
+                counts = self.excursions.setdefault(name, [0, 0, 0])
+                counts[0] += int((present < low).sum())
+                counts[1] += int((present > high).sum())
+                counts[2] += int(present.size)
+
+    def _temperature_f(self, row: dict[str, str]) -> float | None:
+        if not self.temperature_column:
+            return None
+        value = parse_number(row.get(self.temperature_column))
+        if value is None:
+            return None
+        if self.temperature_unit is None:
+            self.temperature_unit = guess_temperature_unit(np.array([value]))
+        return value * 9 / 5 + 32 if self.temperature_unit == "C" else value
+
+    def render(self) -> str:
+        if self.row_count == 0:
+            return "No data found in CSV file."
+        if self.row_count <= self.raw_row_limit:
+            return self._render_rows()
+        return self._render_digest()
+
+    def _render_rows(self) -> str:
+        data_summary = []
+        data_summary.append(f"Environmental data ({self.row_count} readings):")
+        data_summary.append("\nColumn headers: " + ", ".join(self.headers))
+        data_summary.append("\nData:")
+
+        for i, row in enumerate(self.raw_rows, 1):
+            row_data = ", ".join([f"{k}: {v}" for k, v in row.items() if v])
+            data_summary.append(f"Reading {i}: {row_data}")
+
+        return "\n".join(data_summary)
+
+    def _render_digest(self) -> str:
+        lines = [f"Environmental data ({self.row_count} readings, summarized):"]
+        lines.append("\nColumn headers: " + ", ".join(self.headers[:self.max_columns * 2]))
+
+        lines.append("\nPer-column statistics:")
+        for header, stats in self.columns.items():
+            percentiles = ", ".join(f"p{q} {stats.percentile(q):.2f}" for q in PERCENTILES)
+            lines.append(
+                f"- {header}: min {stats.minimum:.2f}, {percentiles}, max {stats.maximum:.2f}, "
+                f"mean {stats.mean:.2f} (n={stats.count})"
+            )
+
+        if self.hourly:
+            lines.append("\nAverages by hour of day:")
+            for hour in sorted(self.hourly):
+                bucket = self.hourly[hour]
+                values = ", ".join(
+                    f"{name} {total / count:.2f}" for name, (total, count) in bucket.items() if count
+                )
+                lines.append(f"- {hour:02d}:00 {values}")
+
+        if self.excursions:
+            lines.append(f"\nOut-of-range readings against {self.growth_stage} targets:")
+            for name, (below, above, total) in self.excursions.items():
+                if not total:
+                    continue
+                low, high = getattr(self.targets, name)
+                lines.append(
+                    f"- {name} ({low:g}-{high:g}): {below} below ({below / total:.0%}), "
+                    f"{above} above ({above / total:.0%}) of {total}"
+                )
+
+        return "\n".join(lines)
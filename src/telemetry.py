@@ -0,0 +1,269 @@
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Stage timings and token counts for the request being handled, if tracing.
+current_trace: ContextVar[dict | None] = ContextVar("current_trace", default=None)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter in Prometheus text format."""
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.label_names), 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in Prometheus text format."""
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...], label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.label_names = label_names
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(str(labels[name]) for name in self.label_names))
+        return series[2] if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (bucket_counts, total, count) in sorted(self._series.items()):
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                labels = _format_labels(self.label_names, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            inf_labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf_labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "grow_assist_stage_duration_seconds",
+    "Time spent in each stage of handling an analysis.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    label_names=("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "grow_assist_request_duration_seconds",
+    "End-to-end request latency.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    label_names=("method", "path", "status"),
+)
+PROMPT_CHARS = Histogram(
+    "grow_assist_prompt_chars",
+    "Size of prompts sent to the model, in characters.",
+    buckets=(500, 1000, 2000, 5000, 10_000, 20_000, 50_000, 100_000, 250_000, 500_000),
+    label_names=("call",),
+)
+LLM_TOKENS = Counter(
+    "grow_assist_llm_tokens_total",
+    "Model tokens by call and kind (prompt, completion or cached_prompt); estimated when the provider reports none.",
+    label_names=("call", "kind"),
+)
+
+LLM_RETRIES = Counter(
+    "grow_assist_llm_retries_total",
+    "Model calls retried after a failure or timeout.",
+)
+LLM_HEDGES = Counter(
+    "grow_assist_llm_hedges_total",
+    "Hedged model calls sent because the first call exceeded the p95 latency.",
+)
+DEGRADED_RESPONSES = Counter(
+    "grow_assist_degraded_responses_total",
+    "Analyses answered with rules-based advice because the model was unavailable.",
+)
+RULES_RESPONSES = Counter(
+    "grow_assist_rules_responses_total",
+    "Analyses answered by the rules engine fast path without calling the model.",
+)
+QUOTA_REJECTIONS = Counter(
+    "grow_assist_quota_rejections_total",
+    "Requests refused before parsing because the client was over its rate limit or token budget.",
+    label_names=("reason",),
+)
+PRODUCT_LINKS = Counter(
+    "grow_assist_product_links_total",
+    "Product links in model answers by outcome: valid (in the catalog), snapped to a catalog entry by name, "
+    "dropped, or searched (replaced by the product the recommendation's text retrieves, when all were dropped).",
+    label_names=("outcome",),
+)
+STRUCTURED_OUTPUTS = Counter(
+    "grow_assist_structured_outputs_total",
+    "Structured model answers by outcome: valid, or reask when the answer failed validation and the model was asked again.",
+    label_names=("outcome",),
+)
+
+# Per-process startup costs, in seconds: "import" (set by src.server),
+# "warm_up" and "first_request".
+STARTUP_SECONDS: dict[str, float] = {}
+
+REGISTRY = [
+    STAGE_SECONDS,
+    REQUEST_SECONDS,
+    PROMPT_CHARS,
+    LLM_TOKENS,
+    LLM_RETRIES,
+    LLM_HEDGES,
+    DEGRADED_RESPONSES,
+    RULES_RESPONSES,
+    QUOTA_REJECTIONS,
+    PRODUCT_LINKS,
+    STRUCTURED_OUTPUTS,
+]
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def gauge_lines(name: str, help: str, value: float) -> list[str]:
+    return [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {value:g}"]
+
+
+def render_metrics(extra_lines: list[str] = ()) -> str:
+    lines = [line for metric in REGISTRY for line in metric.render()]
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def timed(timings: dict[str, float] | None, stage: str):
+    """Record the wall-clock duration of a block.
+
+    The duration goes into timings[stage] (when given), the stage histogram,
+    and the current request trace.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings[stage] = elapsed
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        trace = current_trace.get()
+        if trace is not None:
+            trace["stages"][stage] = round(elapsed * 1000, 2)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for providers that report none."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def message_text(messages) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(getattr(message, "content", message)) for message in messages)
+
+
+def response_text(response) -> str:
+    if isinstance(response, BaseModel):
+        return response.model_dump_json()
+    content = getattr(response, "content", "")
+    return content if isinstance(content, str) else str(content)
+
+
+def record_llm_call(call: str, messages, response=None, completion_text: str | None = None) -> tuple[int, int]:
+    """Record prompt size and token usage for one model call.
+
+    Returns (prompt_tokens, completion_tokens).
+    """
+    prompt = message_text(messages)
+    PROMPT_CHARS.observe(len(prompt), call=call)
+
+    usage = getattr(response, "usage_metadata", None)
+    if isinstance(usage, dict) and "input_tokens" in usage:
+        prompt_tokens = int(usage["input_tokens"])
+        completion_tokens = int(usage.get("output_tokens", 0))
+    else:
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(completion_text if completion_text is not None else response_text(response))
+
+    # Prompt tokens served from the provider's context cache, when reported.
+    cached_tokens = 0
+    if isinstance(usage, dict):
+        cached_tokens = int((usage.get("input_token_details") or {}).get("cache_read", 0))
+
+    LLM_TOKENS.inc(prompt_tokens, call=call, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, call=call, kind="completion")
+    if cached_tokens:
+        LLM_TOKENS.inc(cached_tokens, call=call, kind="cached_prompt")
+    trace = current_trace.get()
+    if trace is not None:
+        trace["tokens"][call] = {
+            "prompt": prompt_tokens,
+            "completion": completion_tokens,
+            "cached_prompt": cached_tokens,
+            "prompt_chars": len(prompt),
+        }
+    return prompt_tokens, completion_tokens
+
+
+def start_trace() -> dict:
+    trace = {"stages": {}, "tokens": {}}
+    current_trace.set(trace)
+    return trace
+
+
+def log_trace(trace: dict, method: str, path: str, status: int, elapsed: float) -> None:
+    logger.info("trace %s", json.dumps({
+        "method": method,
+        "path": path,
+        "status": status,
+        "total_ms": round(elapsed * 1000, 2),
+        **trace,
+    }))
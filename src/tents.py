@@ -0,0 +1,550 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+import numpy as np
+from .environment import EnvironmentMetrics, fahrenheit_to_celsius, vapor_pressure_deficit
+from .ingest import ReadingBatch
+from .summary import EnvironmentDigest
+
+QUANTITIES = ("temperature_f", "humidity_pct", "vpd_kpa", "ppfd")
+
+# Rolling windows rendered into the prompt, ending at the tent's latest reading.
+WINDOWS = (("Last 24 hours", 24 * 3600), ("Last 7 days", 7 * 24 * 3600))
+
+# Readings fetched from SQLite at a time when reading back the delta.
+FETCH_ROWS = 8192
+
+# Quantities with a per-stage day/night baseline, and the smallest change in
+# each that counts as a deviation, however steady the tent has been.
+BASELINE_FLOORS = {"temperature_f": 1.5, "humidity_pct": 3.0, "vpd_kpa": 0.05}
+PERIODS = ("day", "night")
+# The usual range is the baseline mean ± this many spreads (standard
+# deviation, or the floor if larger). A period is reported when its mean moved
+# by more than one spread, or at least OUTLIER_SHARE of its readings left the
+# usual range.
+USUAL_RANGE_SPREADS = 2
+OUTLIER_SHARE = 0.1
+
+# How each quantity is named and formatted in prompts.
+QUANTITY_LABELS = (
+    ("temperature_f", "temperature", ".1f", "°F"),
+    ("humidity_pct", "humidity", ".0f", "%"),
+    ("vpd_kpa", "VPD", ".2f", " kPa"),
+)
+
+_AGGREGATE_COLUMNS = ", ".join(
+    f"{q}_n INTEGER NOT NULL DEFAULT 0, {q}_sum REAL NOT NULL DEFAULT 0, {q}_min REAL, {q}_max REAL"
+    for q in QUANTITIES
+)
+_AGGREGATE_NAMES = ", ".join(f"{q}_n, {q}_sum, {q}_min, {q}_max" for q in QUANTITIES)
+_AGGREGATE_SELECT = ", ".join(f"count({q}), total({q}), min({q}), max({q})" for q in QUANTITIES)
+_AGGREGATE_MERGE = ", ".join(
+    f"{q}_n = {q}_n + excluded.{q}_n, {q}_sum = {q}_sum + excluded.{q}_sum, "
+    f"{q}_min = min(coalesce({q}_min, excluded.{q}_min), coalesce(excluded.{q}_min, {q}_min)), "
+    f"{q}_max = max(coalesce({q}_max, excluded.{q}_max), coalesce(excluded.{q}_max, {q}_max))"
+    for q in QUANTITIES
+)
+_BASELINE_COLUMNS = ", ".join(
+    f"{q}_n INTEGER NOT NULL DEFAULT 0, {q}_sum REAL NOT NULL DEFAULT 0, {q}_sumsq REAL NOT NULL DEFAULT 0"
+    for q in BASELINE_FLOORS
+)
+_BASELINE_NAMES = ", ".join(f"{q}_n, {q}_sum, {q}_sumsq" for q in BASELINE_FLOORS)
+_BASELINE_MERGE = ", ".join(
+    f"{q}_n = {q}_n + excluded.{q}_n, {q}_sum = {q}_sum + excluded.{q}_sum, {q}_sumsq = {q}_sumsq + excluded.{q}_sumsq"
+    for q in BASELINE_FLOORS
+)
+_WINDOW_SELECT = ", ".join(f"sum({q}_n), sum({q}_sum), min({q}_min), max({q}_max)" for q in QUANTITIES)
+
+
+@dataclass
+class Aggregate:
+    """Count, mean, min and max of each quantity over some span of readings."""
+    readings: int
+    stats: dict[str, tuple[int, float | None, float | None, float | None]]
+
+    @classmethod
+    def from_row(cls, readings: int | None, values: tuple) -> "Aggregate":
+        stats = {}
+        for i, q in enumerate(QUANTITIES):
+            n, total, low, high = values[i * 4:i * 4 + 4]
+            n = int(n or 0)
+            stats[q] = (n, total / n if n else None, low, high)
+        return cls(readings=int(readings or 0), stats=stats)
+
+    def render(self, label: str) -> str:
+        parts = []
+        for q, name, fmt, unit in QUANTITY_LABELS + (("ppfd", "PPFD", ".0f", ""),):
+            n, mean, low, high = self.stats[q]
+            if n:
+                parts.append(f"{name} {mean:{fmt}}{unit} (min {low:{fmt}}, max {high:{fmt}})")
+        return f"- {label} ({self.readings} readings): " + (", ".join(parts) or "no readings")
+
+
+@dataclass
+class Baseline:
+    """A tent's typical conditions in one growth stage with the lights on (day) or off (night)."""
+    growth_stage: str
+    period: str
+    readings: int
+    # quantity -> (count, mean, standard deviation)
+    stats: dict[str, tuple[int, float | None, float | None]]
+
+    @classmethod
+    def from_sums(cls, growth_stage: str, period: str, readings: int, values) -> "Baseline":
+        stats = {}
+        for i, q in enumerate(BASELINE_FLOORS):
+            n, total, total_sq = values[i * 3:i * 3 + 3]
+            n = int(n or 0)
+            mean = total / n if n else None
+            stats[q] = (n, mean, float(np.sqrt(max(0.0, total_sq / n - mean * mean))) if n else None)
+        return cls(growth_stage=growth_stage, period=period, readings=int(readings or 0), stats=stats)
+
+    def tolerance(self, quantity: str) -> float:
+        """How far from the mean a value may be and still be usual for this tent."""
+        return max(self.stats[quantity][2] or 0.0, BASELINE_FLOORS[quantity])
+
+    def render(self) -> str:
+        parts = []
+        for q, name, fmt, unit in QUANTITY_LABELS:
+            n, mean, std = self.stats[q]
+            if n:
+                parts.append(f"{name} {mean:{fmt}}{unit} ±{std:{fmt}}")
+        return f"- {self.period} ({self.readings} readings): " + ", ".join(parts)
+
+
+@dataclass
+class TentInfo:
+    tent_id: str
+    readings: int
+    first_ts: int | None
+    last_ts: int | None
+    analyzed_through: int
+    pending: int
+    analyzed_at: float | None
+    growth_stage: str | None = None
+    baselined_through: int = 0
+
+
+def tent_key(owner: str, tent_id: str) -> str:
+    """Storage key of a tent: tent ids only need to be unique per client."""
+    return f"{owner}/{tent_id}"
+
+
+def tent_name(key: str) -> str:
+    """The client-facing id of a tent stored under key."""
+    return key.rsplit("/", 1)[-1]
+
+
+def lights_on(timestamps: np.ndarray, ppfd: np.ndarray, schedule: tuple[int, int]) -> np.ndarray:
+    """Whether each reading was taken with the lights on.
+
+    PPFD decides where it was measured; otherwise the hour of day is checked
+    against the (lights-on hour, lights-off hour) schedule, which may wrap
+    past midnight.
+    """
+    on_hour, off_hour = schedule
+    hours = timestamps // 3600 % 24
+    scheduled = (hours - on_hour) % 24 < ((off_hour - on_hour) % 24 or 24)
+    return np.where(np.isnan(ppfd), scheduled, ppfd > 0)
+
+
+def format_ts(ts: int | None) -> str | None:
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None).isoformat(sep=" ") if ts is not None else None
+
+
+class TentStore:
+    """Per-tent time series of readings in SQLite.
+
+    Readings are deduplicated by (tent, timestamp). Hourly and all-time
+    aggregates are updated from the newly inserted readings only, so reading
+    them back costs the same however much history a tent has. Each reading
+    also gets an increasing sequence number so an analysis can ask for just
+    the readings appended since the previous one.
+    """
+
+    def __init__(self, path: str | Path):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS readings (
+                    seq INTEGER PRIMARY KEY,
+                    tent_id TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    temperature_f REAL,
+                    humidity_pct REAL,
+                    vpd_kpa REAL,
+                    ppfd REAL,
+                    UNIQUE (tent_id, ts)
+                );
+                CREATE INDEX IF NOT EXISTS readings_tent_seq ON readings (tent_id, seq);
+                CREATE TABLE IF NOT EXISTS hourly (
+                    tent_id TEXT NOT NULL,
+                    hour_start INTEGER NOT NULL,
+                    readings INTEGER NOT NULL DEFAULT 0,
+                    {_AGGREGATE_COLUMNS},
+                    PRIMARY KEY (tent_id, hour_start)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS tents (
+                    tent_id TEXT PRIMARY KEY,
+                    readings INTEGER NOT NULL DEFAULT 0,
+                    first_ts INTEGER,
+                    last_ts INTEGER,
+                    analyzed_through INTEGER NOT NULL DEFAULT 0,
+                    analyzed_at REAL,
+                    {_AGGREGATE_COLUMNS}
+                );
+                CREATE TABLE IF NOT EXISTS baselines (
+                    tent_id TEXT NOT NULL,
+                    growth_stage TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    readings INTEGER NOT NULL DEFAULT 0,
+                    {_BASELINE_COLUMNS},
+                    PRIMARY KEY (tent_id, growth_stage, period)
+                ) WITHOUT ROWID;
+                CREATE TEMP TABLE IF NOT EXISTS staging (
+                    ts INTEGER PRIMARY KEY,
+                    temperature_f REAL,
+                    humidity_pct REAL,
+                    vpd_kpa REAL,
+                    ppfd REAL
+                );
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tents)")}
+            if "growth_stage" not in columns:
+                self._conn.execute("ALTER TABLE tents ADD COLUMN growth_stage TEXT")
+                self._conn.execute("ALTER TABLE tents ADD COLUMN baselined_through INTEGER NOT NULL DEFAULT 0")
+
+    def append(self, tent_id: str, batch: ReadingBatch) -> int:
+        """Store a batch of readings, ignoring timestamps already stored; returns how many were new."""
+        if not len(batch):
+            return 0
+        vpd = vapor_pressure_deficit(fahrenheit_to_celsius(batch.temperature_f), batch.humidity_pct)
+        rows = [
+            tuple(None if isinstance(value, float) and np.isnan(value) else value for value in row)
+            for row in zip(
+                batch.timestamps.tolist(),
+                batch.temperature_f.tolist(),
+                batch.humidity_pct.tolist(),
+                vpd.tolist(),
+                batch.ppfd.tolist(),
+            )
+        ]
+        with self._lock, self._conn:
+            conn = self._conn
+            conn.execute("DELETE FROM staging")
+            conn.executemany("INSERT OR IGNORE INTO staging VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute(
+                "DELETE FROM staging WHERE ts IN (SELECT ts FROM readings WHERE tent_id = ? AND ts = staging.ts)",
+                (tent_id,),
+            )
+            inserted = conn.execute("SELECT count(*) FROM staging").fetchone()[0]
+            if not inserted:
+                return 0
+            conn.execute(
+                f"""INSERT INTO hourly (tent_id, hour_start, readings, {_AGGREGATE_NAMES})
+                    SELECT ?, ts - ts % 3600, count(*), {_AGGREGATE_SELECT} FROM staging WHERE true
+                    GROUP BY ts - ts % 3600
+                    ON CONFLICT (tent_id, hour_start) DO UPDATE SET readings = readings + excluded.readings,
+                    {_AGGREGATE_MERGE}""",
+                (tent_id,),
+            )
+            conn.execute(
+                f"""INSERT INTO tents (tent_id, readings, first_ts, last_ts, {_AGGREGATE_NAMES})
+                    SELECT ?, count(*), min(ts), max(ts), {_AGGREGATE_SELECT} FROM staging WHERE true
+                    ON CONFLICT (tent_id) DO UPDATE SET readings = readings + excluded.readings,
+                    first_ts = min(first_ts, excluded.first_ts), last_ts = max(last_ts, excluded.last_ts),
+                    {_AGGREGATE_MERGE}""",
+                (tent_id,),
+            )
+            conn.execute(
+                "INSERT INTO readings (tent_id, ts, temperature_f, humidity_pct, vpd_kpa, ppfd) "
+                "SELECT ?, ts, temperature_f, humidity_pct, vpd_kpa, ppfd FROM staging ORDER BY ts",
+                (tent_id,),
+            )
+        return inserted
+
+    def info(self, tent_id: str) -> TentInfo | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT readings, first_ts, last_ts, analyzed_through, analyzed_at, growth_stage, baselined_through "
+                "FROM tents WHERE tent_id = ?",
+                (tent_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            pending = self._conn.execute(
+                "SELECT count(*) FROM readings WHERE tent_id = ? AND seq > ?", (tent_id, row[3])
+            ).fetchone()[0]
+        readings, first_ts, last_ts, analyzed_through, analyzed_at, growth_stage, baselined_through = row
+        return TentInfo(
+            tent_id, readings, first_ts, last_ts, analyzed_through, pending, analyzed_at,
+            growth_stage, baselined_through,
+        )
+
+    def all_time(self, tent_id: str) -> Aggregate:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT readings, {_AGGREGATE_NAMES} FROM tents WHERE tent_id = ?", (tent_id,)
+            ).fetchone()
+        return Aggregate.from_row(row[0], row[1:]) if row else Aggregate.from_row(0, (None,) * 16)
+
+    def window(self, tent_id: str, start_ts: int) -> Aggregate:
+        """Aggregate of the whole hours starting at or after start_ts, from the hourly rollup."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT sum(readings), {_WINDOW_SELECT} FROM hourly WHERE tent_id = ? AND hour_start >= ?",
+                (tent_id, -(-start_ts // 3600) * 3600),
+            ).fetchone()
+        return Aggregate.from_row(row[0], row[1:])
+
+    def readings_since(self, tent_id: str, after_seq: int | None = None, after_ts: int | None = None) -> Iterator[ReadingBatch]:
+        """Stored readings appended after sequence number after_seq or timestamped after after_ts, in time order.
+
+        Pages of FETCH_ROWS readings are read under the lock and yielded
+        after releasing it, so a slow or abandoned caller never holds up
+        other tents. Readings appended meanwhile are left out.
+        """
+        with self._lock:
+            if after_seq is not None:
+                first_ts, last_seq = self._conn.execute(
+                    "SELECT min(ts), max(seq) FROM readings WHERE tent_id = ? AND seq > ?", (tent_id, after_seq)
+                ).fetchone()
+                after_ts = None if first_ts is None else first_ts - 1
+            else:
+                (last_seq,) = self._conn.execute(
+                    "SELECT max(seq) FROM readings WHERE tent_id = ?", (tent_id,)
+                ).fetchone()
+        if after_ts is None or last_seq is None:
+            return
+        while True:
+            with self._lock:
+                chunk = self._conn.execute(
+                    "SELECT ts, temperature_f, humidity_pct, ppfd FROM readings "
+                    "WHERE tent_id = ? AND ts > ? AND seq > ? AND seq <= ? ORDER BY ts LIMIT ?",
+                    (tent_id, after_ts, after_seq or 0, last_seq, FETCH_ROWS),
+                ).fetchall()
+            if not chunk:
+                return
+            values = np.array(chunk, dtype=np.float64)
+            after_ts = int(values[-1, 0])
+            yield ReadingBatch(
+                timestamps=values[:, 0].astype(np.int64),
+                temperature_f=values[:, 1],
+                humidity_pct=values[:, 2],
+                ppfd=values[:, 3],
+            )
+
+    def last_seq(self, tent_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT max(seq) FROM readings WHERE tent_id = ?", (tent_id,)).fetchone()
+        return row[0] or 0
+
+    def update_baselines(
+        self,
+        tent_id: str,
+        growth_stage: str,
+        schedule: tuple[int, int],
+        through_seq: int | None = None,
+    ) -> int:
+        """Fold readings since the last update, up to through_seq, into the tent's baselines for growth_stage.
+
+        through_seq defaults to the latest reading. The stage becomes the
+        tent's current stage. Only the new readings are read, so the cost
+        does not grow with the tent's history. Returns how many readings were
+        folded in.
+        """
+        with self._lock, self._conn:
+            conn = self._conn
+            row = conn.execute("SELECT baselined_through FROM tents WHERE tent_id = ?", (tent_id,)).fetchone()
+            if row is None:
+                return 0
+            after_seq = row[0]
+            if through_seq is None:
+                through_seq = conn.execute(
+                    "SELECT coalesce(max(seq), 0) FROM readings WHERE tent_id = ?", (tent_id,)
+                ).fetchone()[0]
+            through_seq = max(after_seq, through_seq)
+            rows = conn.execute(
+                "SELECT ts, temperature_f, humidity_pct, vpd_kpa, ppfd FROM readings "
+                "WHERE tent_id = ? AND seq > ? AND seq <= ?",
+                (tent_id, after_seq, through_seq),
+            )
+            sums = {period: np.zeros(1 + 3 * len(BASELINE_FLOORS)) for period in PERIODS}
+            while chunk := rows.fetchmany(FETCH_ROWS):
+                values = np.array(chunk, dtype=np.float64)
+                day = lights_on(values[:, 0].astype(np.int64), values[:, 4], schedule)
+                for period, mask in (("day", day), ("night", ~day)):
+                    sums[period] += _period_sums(values[mask, 1:4])
+            for period, totals in sums.items():
+                if totals[0]:
+                    conn.execute(
+                        f"""INSERT INTO baselines (tent_id, growth_stage, period, readings, {_BASELINE_NAMES})
+                            VALUES (?, ?, ?, {", ".join("?" * len(totals))})
+                            ON CONFLICT (tent_id, growth_stage, period) DO UPDATE SET
+                            readings = readings + excluded.readings, {_BASELINE_MERGE}""",
+                        (tent_id, growth_stage, period, *totals.tolist()),
+                    )
+            conn.execute(
+                "UPDATE tents SET baselined_through = ?, growth_stage = ? WHERE tent_id = ?",
+                (through_seq, growth_stage, tent_id),
+            )
+        return int(sums["day"][0] + sums["night"][0])
+
+    def baselines(self, tent_id: str, growth_stage: str | None = None) -> list[Baseline]:
+        """The tent's baselines, for one growth stage or all of them."""
+        query = f"SELECT growth_stage, period, readings, {_BASELINE_NAMES} FROM baselines WHERE tent_id = ?"
+        params: tuple = (tent_id,)
+        if growth_stage is not None:
+            query += " AND growth_stage = ?"
+            params += (growth_stage,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY growth_stage, period", params).fetchall()
+        return [Baseline.from_sums(row[0], row[1], row[2], row[3:]) for row in rows]
+
+    def mark_analyzed(self, tent_id: str, through_seq: int) -> None:
+        """Record that readings up to through_seq have been covered by an analysis."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE tents SET analyzed_through = max(analyzed_through, ?), analyzed_at = ? WHERE tent_id = ?",
+                (through_seq, time.time(), tent_id),
+            )
+
+
+def _period_sums(values: np.ndarray) -> np.ndarray:
+    """Readings, then count, sum and sum of squares of each BASELINE_FLOORS column, skipping NaN."""
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    sums = np.stack([present.sum(axis=0), filled.sum(axis=0), (filled * filled).sum(axis=0)], axis=1)
+    return np.concatenate([[len(values)], sums.ravel()])
+
+
+def build_tent_prompt(
+    store: TentStore,
+    tent_id: str,
+    growth_stage: str,
+    raw_row_limit: int,
+    schedule: tuple[int, int] = (6, 18),
+    min_baseline_readings: int | None = None,
+) -> tuple[str, EnvironmentMetrics | None, int]:
+    """Prompt text from a tent's stored history plus the readings since its last analysis.
+
+    Returns (prompt_data, metrics, through_seq). The metrics cover the new
+    readings, or the last 24 hours when nothing new has arrived; pass
+    through_seq to mark_analyzed once the analysis succeeds.
+
+    When min_baseline_readings is given and the tent has a baseline of at
+    least that many readings for the stage in every period (day, night) the
+    new readings cover, the prompt carries only that baseline and how the new
+    readings deviate from it. Otherwise it carries rolling aggregates and a
+    digest of the new readings.
+    """
+    info = store.info(tent_id)
+    through_seq = store.last_seq(tent_id)
+    baselines = {}
+    if min_baseline_readings is not None:
+        baselines = {b.period: b for b in store.baselines(tent_id, growth_stage.strip().lower())}
+
+    if info.pending:
+        heading = f"New readings since the last analysis ({info.pending}):"
+        batches = store.readings_since(tent_id, after_seq=info.analyzed_through)
+    else:
+        heading = "No new readings since the last analysis; the last 24 hours of readings:"
+        batches = store.readings_since(tent_id, after_ts=info.last_ts - WINDOWS[0][1])
+
+    headers = ["timestamp", "temperature_f", "humidity_pct", "vpd_kpa", "ppfd"]
+    digest = EnvironmentDigest(headers, growth_stage=growth_stage, raw_row_limit=raw_row_limit)
+    metrics = EnvironmentMetrics(
+        temperature_unit="F",
+        columns={"temperature": "temperature_f", "humidity": "humidity_pct", "ppfd": "ppfd"},
+    )
+    period_sums = {period: np.zeros(1 + 3 * len(BASELINE_FLOORS)) for period in PERIODS}
+    outside = {period: np.zeros(len(BASELINE_FLOORS)) for period in PERIODS}
+    has_ppfd = False
+    for batch in batches:
+        ppfd = batch.ppfd if np.isfinite(batch.ppfd).any() else None
+        has_ppfd = has_ppfd or ppfd is not None
+        derived = metrics.update(batch.temperature_f, batch.humidity_pct, ppfd)
+        needed = max(0, raw_row_limit - digest.row_count)
+        digest.add_columns(
+            {
+                "temperature_f": batch.temperature_f,
+                "humidity_pct": batch.humidity_pct,
+                "vpd_kpa": derived["vpd_kpa"],
+                "ppfd": batch.ppfd,
+            },
+            hours=(batch.timestamps // 3600 % 24).astype(np.int64),
+            timestamps=[format_ts(ts) for ts in batch.timestamps[:needed].tolist()],
+        )
+        if baselines:
+            values = np.stack([batch.temperature_f, batch.humidity_pct, derived["vpd_kpa"]], axis=1)
+            day = lights_on(batch.timestamps, batch.ppfd, schedule)
+            for period, mask in (("day", day), ("night", ~day)):
+                period_sums[period] += _period_sums(values[mask])
+                baseline = baselines.get(period)
+                if baseline is not None:
+                    means = np.array([np.nan if m is None else m for _, m, _ in baseline.stats.values()])
+                    band = USUAL_RANGE_SPREADS * np.array([baseline.tolerance(q) for q in BASELINE_FLOORS])
+                    with np.errstate(invalid="ignore"):
+                        outside[period] += (np.abs(values[mask] - means) > band).sum(axis=0)
+    if not has_ppfd:
+        metrics.columns["ppfd"] = None
+
+    covered = [period for period in PERIODS if period_sums[period][0]]
+    lines = [
+        f"Tent: {tent_name(tent_id)}",
+        f"Stored history: {info.readings} readings from {format_ts(info.first_ts)} to {format_ts(info.last_ts)}.",
+    ]
+    if covered and all(
+        period in baselines and baselines[period].readings >= min_baseline_readings for period in covered
+    ):
+        lines.append(f"\nThis tent's usual {growth_stage} conditions (baseline, mean ± spread):")
+        lines += [baselines[period].render() for period in PERIODS if period in baselines]
+        lines.append("\n" + heading + " " + ", ".join(
+            f"{int(period_sums[period][0])} {period}" for period in covered
+        ) + ".")
+        lines += render_deviations(baselines, period_sums, outside, covered)
+    else:
+        lines.append("\nRolling aggregates:")
+        for label, seconds in WINDOWS:
+            lines.append(store.window(tent_id, info.last_ts - seconds + 1).render(label))
+        lines.append(store.all_time(tent_id).render("All time"))
+        lines.append("\n" + heading)
+        lines.append(digest.render())
+    if metrics.count:
+        lines.append(metrics.render(growth_stage))
+    return "\n".join(lines), metrics, through_seq
+
+
+def render_deviations(
+    baselines: dict[str, Baseline],
+    period_sums: dict[str, np.ndarray],
+    outside: dict[str, np.ndarray],
+    periods: list[str],
+) -> list[str]:
+    """Prompt lines for each period and quantity whose new readings left the tent's baseline."""
+    lines = []
+    for period in periods:
+        baseline = baselines[period]
+        for i, (q, name, fmt, unit) in enumerate(QUANTITY_LABELS):
+            count, total = period_sums[period][1 + 3 * i:3 + 3 * i]
+            usual = baseline.stats[q][1]
+            if not count or usual is None:
+                continue
+            mean, tolerance, share = total / count, baseline.tolerance(q), outside[period][i] / count
+            if abs(mean - usual) <= tolerance and share < OUTLIER_SHARE:
+                continue
+            low, high = usual - USUAL_RANGE_SPREADS * tolerance, usual + USUAL_RANGE_SPREADS * tolerance
+            lines.append(
+                f"- {period} {name}: mean {mean:{fmt}}{unit} vs usual {usual:{fmt}}{unit} "
+                f"({mean - usual:+{fmt}}{unit}); {share:.0%} of readings outside {low:{fmt}}-{high:{fmt}}{unit}"
+            )
+    if not lines:
+        return ["No deviations: every period's temperature, humidity and VPD stayed within the usual range."]
+    return ["Deviations from the baseline:"] + lines
@@ -1,4 +1,4 @@
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import io
 from fastapi.testclient import TestClient
 from .main import app
@@ -23,8 +23,9 @@ def test_root_endpoint_contains_form():
     assert 'name="csv_file"' in response.text
 
 
+@patch('src.main.get_model')
 @patch('src.main.get_structured_model')
-def test_analyze_endpoint_successful_response(mock_get_structured_model):
+def test_analyze_endpoint_successful_response(mock_get_structured_model, mock_get_model):
     """Test that submitting CSV data to the API endpoint returns a successful response."""
     # Create a mock structured response
     mock_analysis = AnalysisResponse(
@@ -49,8 +50,9 @@ def test_analyze_endpoint_successful_response(mock_get_structured_model):
     )
     
     mock_model = MagicMock()
-    mock_model.invoke.return_value = mock_analysis
+    mock_model.ainvoke = AsyncMock(return_value=mock_analysis)
     mock_get_structured_model.return_value = mock_model
+    mock_get_model.return_value.ainvoke = AsyncMock(return_value=MagicMock(content="Looks good."))
     
     # Create sample CSV data
     csv_content = "temperature,humidity,ppfd\n78,65,800\n79,63,820\n"
@@ -68,8 +70,9 @@ def test_analyze_endpoint_successful_response(mock_get_structured_model):
     assert "Maintain Current Conditions" in response.text
 
 
+@patch('src.main.get_model')
 @patch('src.main.get_structured_model')
-def test_analyze_endpoint_preserves_growth_stage(mock_get_structured_model):
+def test_analyze_endpoint_preserves_growth_stage(mock_get_structured_model, mock_get_model):
     """Test that the growth stage and filename are preserved in the response."""
     mock_analysis = AnalysisResponse(
         summary="Test AI response",
@@ -89,8 +92,9 @@ def test_analyze_endpoint_preserves_growth_stage(mock_get_structured_model):
     )
     
     mock_model = MagicMock()
-    mock_model.invoke.return_value = mock_analysis
+    mock_model.ainvoke = AsyncMock(return_value=mock_analysis)
     mock_get_structured_model.return_value = mock_model
+    mock_get_model.return_value.ainvoke = AsyncMock(return_value=MagicMock(content="Looks good."))
     
     csv_content = "temperature,humidity\n75,60\n"
     csv_file = io.BytesIO(csv_content.encode('utf-8'))
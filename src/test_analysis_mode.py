@@ -0,0 +1,86 @@
+from unittest.mock import patch, MagicMock, AsyncMock
+import io
+from pydantic import ValidationError
+from fastapi.testclient import TestClient
+from .main import app
+from .models import AnalysisResponse, Recommendation, ProductLink
+
+
+def _make_analysis():
+    return AnalysisResponse(
+        summary="Humidity is a little high for flowering.",
+        recommendations=[
+            Recommendation(
+                title="Lower Humidity",
+                description="Run a dehumidifier overnight.",
+                priority="high",
+                product=ProductLink(name="Dehumidifier", url="https://acinfinity.com/dehumidifier")
+            ),
+            Recommendation(
+                title="Increase Airflow",
+                description="Turn up the exhaust fan.",
+                priority="medium"
+            )
+        ]
+    )
+
+
+def _post_sample_csv(client):
+    csv_file = io.BytesIO(b"temperature,humidity\n75,60\n")
+    return client.post(
+        "/analyze",
+        data={"growth_stage": "flowering"},
+        files={"csv_file": ("test.csv", csv_file, "text/csv")}
+    )
+
+
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_single_pass_makes_one_model_call(mock_get_structured_model, mock_get_model):
+    """Test that single-pass mode skips the free-text model call."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_make_analysis())
+    mock_get_model.return_value.ainvoke = AsyncMock()
+
+    response = _post_sample_csv(TestClient(app))
+
+    assert response.status_code == 200
+    assert "Lower Humidity" in response.text
+    assert mock_get_structured_model.return_value.ainvoke.await_count == 1
+    mock_get_model.return_value.ainvoke.assert_not_called()
+
+
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_single_pass_falls_back_to_two_pass_on_validation_error(mock_get_structured_model, mock_get_model):
+    """Test that a validation failure in single-pass mode retries with the two-pass pipeline."""
+    try:
+        AnalysisResponse(summary="No products", recommendations=[])
+    except ValidationError as exc:
+        validation_error = exc
+
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(side_effect=[validation_error, _make_analysis()])
+    mock_get_model.return_value.ainvoke = AsyncMock(return_value=MagicMock(content="Humidity is high."))
+
+    response = _post_sample_csv(TestClient(app))
+
+    assert response.status_code == 200
+    assert "Lower Humidity" in response.text
+    assert mock_get_structured_model.return_value.ainvoke.await_count == 2
+    mock_get_model.return_value.ainvoke.assert_awaited_once()
+
+
+@patch('src.config.ANALYSIS_MODE', 'two_pass')
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_two_pass_mode_calls_both_models(mock_get_structured_model, mock_get_model):
+    """Test that two-pass mode always produces free text before structuring it."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_make_analysis())
+    mock_get_model.return_value.ainvoke = AsyncMock(return_value=MagicMock(content="Humidity is high."))
+
+    response = _post_sample_csv(TestClient(app))
+
+    assert response.status_code == 200
+    mock_get_model.return_value.ainvoke.assert_awaited_once()
+    mock_get_structured_model.return_value.ainvoke.assert_awaited_once()
@@ -0,0 +1,121 @@
+import gzip
+from unittest.mock import AsyncMock, patch
+import pytest
+from fastapi.testclient import TestClient
+from . import main
+from .assets import IMMUTABLE_CACHE_CONTROL, Asset
+from .models import AnalysisResponse, ProductLink, Recommendation
+
+
+HYDRONE_5_URL = (
+    "https://acinfinity.com/hydroponics-growers/hydrone-5-plant-dehumidifier-with-10-level-controls-works-in-all-"
+    "environments-high-precision-pwm-motor-silent-operation-versatile-dual-duct-ports-up-to-5x5-grow-tents/"
+)
+
+
+def _make_analysis():
+    return AnalysisResponse(
+        summary="Humidity is a little high for flowering.",
+        recommendations=[
+            Recommendation(
+                title="Lower Humidity",
+                description="Run a dehumidifier overnight.",
+                priority="high",
+                product=ProductLink(name="HYDRONE 5 Dehumidifier", url=HYDRONE_5_URL),
+            ),
+            Recommendation(title="Increase Airflow", description="Turn up the exhaust fan.", priority="medium"),
+        ],
+    )
+
+
+class TestAsset:
+    """Tests for precompressed, ETagged response bodies."""
+
+    def test_precompresses_text(self):
+        """Test that text bodies get a gzip variant that round-trips."""
+        body = b"body { color: green; }\n" * 100
+        asset = Asset.build(body, "text/css")
+        assert gzip.decompress(asset.gzip) == body
+        assert len(asset.gzip) < len(body)
+
+    def test_skips_tiny_bodies(self):
+        """Test that bodies too small to benefit are not compressed."""
+        assert Asset.build(b"ok", "text/plain").gzip is None
+
+    def test_brotli_variant(self):
+        """Test that a brotli variant is built when brotli is installed."""
+        brotli = pytest.importorskip("brotli")
+        body = b"body { color: green; }\n" * 100
+        assert brotli.decompress(Asset.build(body, "text/css").br) == body
+
+
+class TestStaticAssets:
+    """Tests for fingerprinted static files."""
+
+    def test_fingerprinted_url_is_cached_forever(self):
+        """Test that the fingerprinted URL gets an immutable Cache-Control."""
+        client = TestClient(main.app)
+        url = main.static_assets.url("css/styles.css")
+        assert "?v=" in url
+        response = client.get(url, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.headers["content-encoding"] == "gzip"
+        assert "text/css" in response.headers["content-type"]
+        assert ".environment-metrics" in response.text
+
+    def test_plain_url_must_revalidate(self):
+        """Test that a URL without the current fingerprint revalidates via ETag."""
+        client = TestClient(main.app)
+        response = client.get("/static/css/styles.css")
+        assert "immutable" not in response.headers["cache-control"]
+        again = client.get("/static/css/styles.css", headers={"If-None-Match": response.headers["etag"]})
+        assert again.status_code == 304
+
+    def test_unknown_file_is_404(self):
+        """Test that missing files are not found."""
+        assert TestClient(main.app).get("/static/css/missing.css").status_code == 404
+
+
+def test_root_is_prerendered_with_etag():
+    """Test that / is served from the pre-rendered shell and honours If-None-Match."""
+    client = TestClient(main.app)
+    response = client.get("/")
+    assert response.status_code == 200
+    assert main.static_assets.url("css/styles.css") in response.text
+    assert client.get("/", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+
+@patch('src.config.RULES_ENGINE', 'off')
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_fragment_returns_partial(mock_get_structured_model, mock_get_model):
+    """Test that the fragment endpoint renders only the results block."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_make_analysis())
+    client = TestClient(main.app)
+    response = client.post(
+        "/analyze/fragment",
+        data={"growth_stage": "flowering"},
+        files={"csv_file": ("test.csv", "temperature,humidity\n75,60\n", "text/csv")},
+    )
+    assert response.status_code == 200
+    assert "Lower Humidity" in response.text
+    assert "<html" not in response.text
+    assert "Measured Conditions" in response.text
+
+
+@patch('src.config.RULES_ENGINE', 'off')
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_fragment_returns_json(mock_get_structured_model, mock_get_model):
+    """Test that the fragment endpoint returns the AnalysisResponse as JSON on request."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_make_analysis())
+    client = TestClient(main.app)
+    response = client.post(
+        "/analyze/fragment",
+        data={"growth_stage": "flowering"},
+        files={"csv_file": ("test.csv", "temperature,humidity\n75,60\n", "text/csv")},
+        headers={"Accept": "application/json"},
+    )
+    assert response.status_code == 200
+    assert AnalysisResponse.model_validate(response.json()) == _make_analysis()
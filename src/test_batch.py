@@ -0,0 +1,182 @@
+import asyncio
+import io
+import zipfile
+from unittest.mock import patch, AsyncMock
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from . import config
+from .batch import run_deduplicated
+from .main import app
+from .models import AnalysisResponse, BatchItem, BatchRequest, Recommendation, ProductLink
+
+
+def _make_analysis():
+    return AnalysisResponse(
+        summary="Batch summary",
+        recommendations=[
+            Recommendation(
+                title="Lower Humidity",
+                description="Run a dehumidifier overnight.",
+                priority="high",
+                product=ProductLink(name="Dehumidifier", url="https://acinfinity.com/dehumidifier")
+            ),
+            Recommendation(title="Increase Airflow", description="Turn up the exhaust fan.", priority="medium")
+        ]
+    )
+
+
+class TestRunDeduplicated:
+    """Tests for run_deduplicated."""
+
+    def test_runs_each_key_once_and_preserves_order(self):
+        """Test that duplicate items share one worker call and results keep item order."""
+        calls = []
+
+        async def worker(item):
+            calls.append(item)
+            return item * 10
+
+        results = asyncio.run(run_deduplicated([1, 2, 1, 3], key=str, worker=worker, concurrency=2))
+        assert results == [10, 20, 10, 30]
+        assert sorted(calls) == [1, 2, 3]
+
+    def test_limits_concurrency(self):
+        """Test that no more than `concurrency` workers run at once."""
+        running = 0
+        peak = 0
+
+        async def worker(item):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return item
+
+        asyncio.run(run_deduplicated(list(range(10)), key=str, worker=worker, concurrency=3))
+        assert peak == 3
+
+    def test_returns_errors_per_item(self):
+        """Test that one failing item doesn't fail the others."""
+        async def worker(item):
+            if item == 2:
+                raise ValueError("bad item")
+            return item
+
+        results = asyncio.run(run_deduplicated([1, 2, 3], key=str, worker=worker, concurrency=2))
+        assert results[0] == 1 and results[2] == 3
+        assert isinstance(results[1], ValueError)
+
+
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_structured_model')
+def test_batch_endpoint_dedupes_and_reports_errors(mock_get_structured_model):
+    """Test that identical items are analyzed once and failures are reported per item."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_make_analysis())
+
+    client = TestClient(app)
+    response = client.post("/analyze/batch", json={"items": [
+        {"id": "tent-1", "csv": "temperature,humidity\n75,60\n", "growth_stage": "flowering"},
+        {"id": "tent-2", "csv": "temperature,humidity\n75,60\n", "growth_stage": "flowering"},
+        {"id": "tent-3", "csv": "temperature,humidity\n80,40\n", "growth_stage": "vegetation"},
+    ]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["id"] for r in results] == ["tent-1", "tent-2", "tent-3"]
+    assert all(r["analysis"]["summary"] == "Batch summary" for r in results)
+    assert mock_get_structured_model.return_value.ainvoke.await_count == 2
+
+
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_structured_model')
+def test_batch_endpoint_returns_item_errors(mock_get_structured_model):
+    """Test that a model failure on one item is returned as that item's error."""
+    async def analyze(messages, **kwargs):
+        # Items run concurrently, so fail by content rather than call order.
+        if "humidity: 70" in messages[-1].content:
+            raise RuntimeError("upstream unavailable")
+        return _make_analysis()
+
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(side_effect=analyze)
+
+    client = TestClient(app)
+    response = client.post("/analyze/batch", json={"items": [
+        {"id": "a", "csv": "temperature,humidity\n75,60\n", "growth_stage": "flowering"},
+        {"id": "b", "csv": "temperature,humidity\n70,70\n", "growth_stage": "flowering"},
+    ]})
+
+    results = response.json()["results"]
+    assert results[0]["analysis"] is not None
+    assert results[1]["analysis"] is None
+    assert results[1]["error"] == "upstream unavailable"
+
+
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_structured_model')
+def test_batch_zip_endpoint_uses_folder_stage(mock_get_structured_model):
+    """Test that CSVs in a zip are analyzed, using stage folders when present."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_make_analysis())
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("tent1.csv", "temperature,humidity\n75,60\n")
+        archive.writestr("flowering/tent2.csv", "temperature,humidity\n76,45\n")
+        archive.writestr("notes.txt", "ignored")
+    buffer.seek(0)
+
+    client = TestClient(app)
+    response = client.post(
+        "/analyze/batch/zip",
+        data={"growth_stage": "vegetation"},
+        files={"archive": ("tents.zip", buffer, "application/zip")}
+    )
+
+    assert response.status_code == 200
+    assert [r["id"] for r in response.json()["results"]] == ["tent1.csv", "flowering/tent2.csv"]
+    prompts = [call.args[0][1].content for call in mock_get_structured_model.return_value.ainvoke.await_args_list]
+    assert any(p.startswith("Growth Stage: flowering") for p in prompts)
+    assert any(p.startswith("Growth Stage: vegetation") for p in prompts)
+
+
+def test_batch_zip_endpoint_rejects_non_zip():
+    """Test that a non-zip upload is a 400."""
+    client = TestClient(app)
+    response = client.post(
+        "/analyze/batch/zip",
+        data={"growth_stage": "vegetation"},
+        files={"archive": ("tents.zip", io.BytesIO(b"not a zip"), "application/zip")}
+    )
+    assert response.status_code == 400
+
+
+@patch('src.config.BATCH_MAX_ITEMS', 1)
+def test_batch_endpoint_enforces_item_limit():
+    """Test that oversized batches are rejected with 413."""
+    client = TestClient(app)
+    response = client.post("/analyze/batch", json={"items": [
+        {"csv": "temperature,humidity\n75,60\n", "growth_stage": "flowering"},
+        {"csv": "temperature,humidity\n70,60\n", "growth_stage": "flowering"},
+    ]})
+    assert response.status_code == 413
+
+
+@patch('src.config.MAX_UPLOAD_BYTES', 40)
+def test_batch_endpoint_enforces_byte_limit():
+    """Test that a JSON batch is held to the same byte limit as an upload."""
+    client = TestClient(app)
+    response = client.post("/analyze/batch", json={"items": [
+        {"csv": "temperature,humidity\n75,60\n", "growth_stage": "flowering"},
+        {"csv": "temperature,humidity\n70,60\n", "growth_stage": "flowering"},
+    ]})
+    assert response.status_code == 413
+
+
+def test_batch_request_caps_items_and_item_size():
+    """Test that the request model rejects too many items and oversized CSVs before analysis."""
+    item = {"csv": "temperature,humidity\n75,60\n", "growth_stage": "flowering"}
+    with pytest.raises(ValidationError):
+        BatchRequest(items=[item] * (config.BATCH_MAX_ITEMS + 1))
+    with pytest.raises(ValidationError):
+        BatchItem(csv="x" * (config.MAX_UPLOAD_BYTES + 1), growth_stage="flowering")
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from langchain.messages import HumanMessage
+from . import config, main
+from .benchmark import Scenario, percentile, run_scenario, synthetic_csv, use_fake_llm
+from .fake_llm import FakeChatModel, FakeLLMError
+from .models import AnalysisResponse
+
+
+class TestFakeChatModel:
+    """Tests for the offline fake chat model."""
+
+    def test_structured_output_is_valid_and_uses_prompt_products(self):
+        """Test that structured responses validate and link a product from the prompt."""
+        model = FakeChatModel(seed=0).with_structured_output(AnalysisResponse)
+        prompt = "Growth Stage: flowering\n- HYDRONE 5 Dehumidifier ($399-499) [Humidity Control]: https://acinfinity.com/h5 — dry"
+        response = asyncio.run(model.ainvoke([HumanMessage(prompt)]))
+        assert isinstance(response, AnalysisResponse)
+        assert response.recommendations[0].product.url == "https://acinfinity.com/h5"
+
+    def test_failure_rate(self):
+        """Test that failure_rate=1 always raises."""
+        model = FakeChatModel(failure_rate=1.0, seed=0)
+        with pytest.raises(FakeLLMError):
+            asyncio.run(model.ainvoke([HumanMessage("hi")]))
+
+    def test_streams_tokens(self):
+        """Test that astream yields text chunks."""
+        async def collect():
+            return [chunk.text async for chunk in FakeChatModel(tokens_per_second=0).astream([HumanMessage("hi")])]
+
+        chunks = asyncio.run(collect())
+        assert len(chunks) > 1
+
+
+def test_percentile_nearest_rank():
+    """Test the nearest-rank percentile."""
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+
+@pytest.fixture
+def restore_app_state(monkeypatch):
+    for name in ("LLM_PROVIDER", "FAKE_LLM_LATENCY_SECONDS", "FAKE_LLM_JITTER_SECONDS", "FAKE_LLM_FAILURE_RATE",
+                 "RATE_LIMIT_PER_MINUTE", "DAILY_TOKEN_BUDGET", "SIMILARITY_CACHE"):
+        monkeypatch.setattr(config, name, getattr(config, name))
+    for name in ("_model", "_structured_model", "_llm_limiter", "_circuit_breaker"):
+        monkeypatch.setattr(main, name, getattr(main, name))
+
+
+def test_benchmark_scenario_runs_offline(restore_app_state):
+    """Smoke test: a scenario runs end to end against the fake model and reports stats."""
+    use_fake_llm(latency=0.0, jitter=0.0, failure_rate=0.0)
+    scenario = Scenario("cache_hit", requests=4, concurrency=1, make_csv=lambda i: synthetic_csv(10))
+
+    result = asyncio.run(run_scenario(scenario))
+
+    assert result.errors == 0
+    assert result.status_codes == {200: 4}
+    assert result.cache_hits == 3
+    assert result.p50_ms <= result.p95_ms <= result.p99_ms
+    assert result.peak_rss_mb > 0
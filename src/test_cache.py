@@ -0,0 +1,140 @@
+import io
+import time
+from unittest.mock import patch, MagicMock, AsyncMock
+from fastapi.testclient import TestClient
+from .cache import MemoryBackend, ResponseCache, SQLiteBackend, make_cache_key
+from .main import app
+from .models import AnalysisResponse, Recommendation, ProductLink
+
+
+def _make_analysis(summary="Conditions look good."):
+    return AnalysisResponse(
+        summary=summary,
+        recommendations=[
+            Recommendation(
+                title="Keep It Up",
+                description="Nothing to change.",
+                priority="low",
+                product=ProductLink(name="Hygrometer", url="https://acinfinity.com/hygrometer")
+            ),
+            Recommendation(
+                title="Monitor Daily",
+                description="Check readings each morning.",
+                priority="medium"
+            )
+        ]
+    )
+
+
+class TestMakeCacheKey:
+    """Tests for make_cache_key."""
+
+    def test_same_content_same_key(self):
+        """Test that whitespace and line endings do not change the key."""
+        a = make_cache_key("Reading 1: temp: 75\nReading 2: temp: 76\n", "vegetation", "v1")
+        b = make_cache_key("Reading 1: temp: 75\r\nReading 2: temp: 76  ", " Vegetation", "v1")
+        assert a == b
+
+    def test_growth_stage_and_prompt_version_change_key(self):
+        """Test that growth stage and prompt version are part of the key."""
+        base = make_cache_key("Reading 1: temp: 75", "vegetation", "v1")
+        assert base != make_cache_key("Reading 1: temp: 75", "flowering", "v1")
+        assert base != make_cache_key("Reading 1: temp: 75", "vegetation", "v2")
+
+
+class TestMemoryBackend:
+    """Tests for the in-memory cache backend."""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest untouched entry is evicted at capacity."""
+        backend = MemoryBackend(max_entries=2, ttl_seconds=60)
+        backend.set("a", "1")
+        backend.set("b", "2")
+        backend.get("a")
+        backend.set("c", "3")
+        assert backend.get("a") == "1"
+        assert backend.get("b") is None
+        assert backend.get("c") == "3"
+
+    def test_expires_entries_after_ttl(self):
+        """Test that entries older than the TTL are treated as missing."""
+        backend = MemoryBackend(max_entries=2, ttl_seconds=60)
+        backend.set("a", "1")
+        with patch("src.cache.time.time", return_value=time.time() + 61):
+            assert backend.get("a") is None
+        assert len(backend) == 0
+
+
+class TestSQLiteBackend:
+    """Tests for the on-disk cache backend."""
+
+    def test_survives_reopen(self, tmp_path):
+        """Test that entries persist across backend instances."""
+        path = tmp_path / "cache.sqlite3"
+        SQLiteBackend(path, max_entries=10, ttl_seconds=60).set("a", "1")
+        assert SQLiteBackend(path, max_entries=10, ttl_seconds=60).get("a") == "1"
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test that the store is trimmed to max_entries by access time."""
+        backend = SQLiteBackend(tmp_path / "cache.sqlite3", max_entries=2, ttl_seconds=60)
+        with patch("src.cache.time.time", side_effect=[1.0, 2.0, 3.0, 4.0]):
+            backend.set("a", "1")
+            backend.set("b", "2")
+            backend.get("a")
+            backend.set("c", "3")
+        assert len(backend) == 2
+        assert backend.get("b") is None
+
+    def test_expires_entries_after_ttl(self, tmp_path):
+        """Test that entries older than the TTL are deleted on read."""
+        backend = SQLiteBackend(tmp_path / "cache.sqlite3", max_entries=10, ttl_seconds=60)
+        backend.set("a", "1")
+        with patch("src.cache.time.time", return_value=time.time() + 61):
+            assert backend.get("a") is None
+        assert len(backend) == 0
+
+
+class TestResponseCache:
+    """Tests for the ResponseCache wrapper."""
+
+    def test_round_trips_analysis_and_counts(self):
+        """Test that responses round-trip and hits/misses are counted."""
+        cache = ResponseCache(MemoryBackend(max_entries=10, ttl_seconds=60))
+        assert cache.get("key") is None
+        cache.set("key", _make_analysis())
+        assert cache.get("key") == _make_analysis()
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+        assert stats["entries"] == 1
+
+
+def _post_sample_csv(client):
+    csv_file = io.BytesIO(b"temperature,humidity\n75,60\n")
+    return client.post(
+        "/analyze",
+        data={"growth_stage": "flowering"},
+        files={"csv_file": ("test.csv", csv_file, "text/csv")}
+    )
+
+
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_serves_repeat_upload_from_cache(mock_get_structured_model, mock_get_model):
+    """Test that an identical upload is answered from the cache without model calls."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_make_analysis())
+    mock_get_model.return_value.ainvoke = AsyncMock(return_value=MagicMock(content="Humidity is high."))
+
+    client = TestClient(app)
+    first = _post_sample_csv(client)
+    calls_after_first = mock_get_structured_model.return_value.ainvoke.await_count
+    second = _post_sample_csv(client)
+
+    assert first.status_code == second.status_code == 200
+    assert "Keep It Up" in second.text
+    assert mock_get_structured_model.return_value.ainvoke.await_count == calls_after_first
+
+    stats = client.get("/cache/stats").json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
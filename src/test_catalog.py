@@ -0,0 +1,92 @@
+import os
+import time
+from .catalog import ProductCatalog, tokenize
+from .main import PRODUCT_LINKS_PATH
+
+HEADER = "Problem Category,Product Name,Product Price,Product URL,Product Description\n"
+
+
+def _write_catalog(path, rows: list[str]) -> None:
+    path.write_text(HEADER + "".join(row + "\n" for row in rows))
+
+
+class TestProductCatalog:
+    """Tests for ProductCatalog."""
+
+    def test_loads_shipped_catalog_indexed_by_category(self):
+        """Test that product_links.csv loads into typed records grouped by category."""
+        catalog = ProductCatalog(PRODUCT_LINKS_PATH)
+        assert len(catalog.products) > 0
+        assert "Humidity Control" in catalog.by_category
+        product = catalog.by_category["Humidity Control"][0]
+        assert product.url.startswith("https://")
+
+    def test_search_ranks_by_relevance(self):
+        """Test that TF-IDF search puts the best match first."""
+        catalog = ProductCatalog(PRODUCT_LINKS_PATH)
+        results = catalog.search("dehumidifier", k=3)
+        assert "dehumidifier" in tokenize(f"{results[0].name} {results[0].description}")
+
+    def test_products_for_issues_matches_categories(self):
+        """Test that detected issues pull products from the matching categories."""
+        catalog = ProductCatalog(PRODUCT_LINKS_PATH)
+        products = catalog.products_for_issues(["humidity_high"], k=3)
+        assert len(products) == 3
+        assert products[0].category in {"Humidity Control", "Ventilation Issues", "VPD Optimization"}
+
+    def test_products_for_issues_defaults_when_no_issues(self):
+        """Test that in-range data still gets a small set of general products."""
+        catalog = ProductCatalog(PRODUCT_LINKS_PATH)
+        products = catalog.products_for_issues([], k=4)
+        assert 0 < len(products) <= 4
+        assert len(set(products)) == len(products)
+
+    def test_hot_reloads_when_csv_changes(self, tmp_path):
+        """Test that edits to the CSV are picked up without restarting."""
+        path = tmp_path / "products.csv"
+        _write_catalog(path, ["Humidity Control,Humidifier A,$10,https://example.com/a,cool mist humidifier"])
+        catalog = ProductCatalog(path)
+        assert [p.name for p in catalog.products] == ["Humidifier A"]
+        assert catalog.reload_if_changed() is False
+
+        _write_catalog(path, [
+            "Humidity Control,Humidifier A,$10,https://example.com/a,cool mist humidifier",
+            "Temperature Control,Heater B,$20,https://example.com/b,small heater",
+        ])
+        later = time.time() + 5
+        os.utime(path, (later, later))
+        assert catalog.reload_if_changed() is True
+        assert len(catalog.products) == 2
+        assert catalog.search("heater", k=1)[0].name == "Heater B"
+
+    def test_missing_file_gives_empty_catalog(self, tmp_path):
+        """Test that a missing CSV doesn't crash the app."""
+        catalog = ProductCatalog(tmp_path / "missing.csv")
+        assert catalog.products == []
+        assert catalog.products_for_issues(["humidity_high"]) == []
+
+
+class TestProductIndex:
+    """Tests for ProductIndex."""
+
+    def test_resolves_urls_ignoring_formatting(self):
+        """Test that catalog URLs match regardless of scheme, case, query or trailing slash."""
+        catalog = ProductCatalog(PRODUCT_LINKS_PATH)
+        product = catalog.by_category["Humidity Control"][0]
+        variant = product.url.replace("https://", "http://www.").upper().rstrip("/") + "?ref=grow"
+        assert catalog.index.by_link(variant) is not None
+        assert catalog.index.by_link("https://acinfinity.com/made-up-product/") is None
+
+    def test_matches_names_fuzzily(self):
+        """Test that names with brand prefixes or missing words find their product."""
+        index = ProductCatalog(PRODUCT_LINKS_PATH).index
+        assert index.match_name("AC Infinity HYDRONE 7 Dehumidifier", 0.6).name == "HYDRONE 7 Dehumidifier"
+        assert index.match_name("Cloudline T6 inline fan", 0.6).name.startswith("CLOUDLINE PRO T6")
+        assert index.match_name("ionframe evo6", 0.6).name == "IONFRAME EVO6 LED 500W"
+
+    def test_rejects_weak_or_ambiguous_names(self):
+        """Test that generic or unknown names match nothing."""
+        index = ProductCatalog(PRODUCT_LINKS_PATH).index
+        assert index.match_name("Inline Fan", 0.6) is None
+        assert index.match_name("HYDRONE Dehumidifier", 0.6) is None
+        assert index.match_name("Vivosun Humidifier", 0.6) is None
@@ -0,0 +1,160 @@
+import asyncio
+import io
+import sqlite3
+from unittest.mock import patch, MagicMock
+import pytest
+from fastapi.testclient import TestClient
+from .concurrency import CapacityExceededError, LLMLimiter, SQLiteLLMLimiter
+from .main import app
+
+
+class TestLLMLimiter:
+    """Tests for the LLMLimiter."""
+
+    def test_limits_in_flight_calls(self):
+        """Test that no more than max_in_flight calls run at once."""
+        limiter = LLMLimiter(max_in_flight=2, max_queued=10, queue_timeout=5)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(call() for _ in range(6)))
+
+        asyncio.run(run())
+        assert peak == 2
+        assert limiter.in_flight == 0
+        assert limiter.queued == 0
+
+    def test_rejects_when_queue_is_full(self):
+        """Test that calls beyond the queue depth are rejected immediately."""
+        limiter = LLMLimiter(max_in_flight=1, max_queued=1, queue_timeout=5)
+
+        async def call():
+            async with limiter.slot():
+                await asyncio.sleep(0.05)
+
+        async def run():
+            return await asyncio.gather(*(call() for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        errors = [r for r in results if isinstance(r, CapacityExceededError)]
+        assert len(errors) == 1
+
+    def test_rejects_when_wait_times_out(self):
+        """Test that a queued call gives up after queue_timeout."""
+        limiter = LLMLimiter(max_in_flight=1, max_queued=5, queue_timeout=0.01)
+
+        async def run():
+            async with limiter.slot():
+                with pytest.raises(CapacityExceededError):
+                    async with limiter.slot():
+                        pass
+
+        asyncio.run(run())
+        assert limiter.queued == 0
+
+
+class TestSQLiteLLMLimiter:
+    """Tests for the LLM limiter shared between processes through SQLite."""
+
+    def test_limit_is_shared_between_limiters(self, tmp_path):
+        """Test that limiters on the same file, as in two workers, share one cap."""
+        path = tmp_path / "limiter.sqlite3"
+        limiters = [
+            SQLiteLLMLimiter(path, max_in_flight=2, max_queued=10, queue_timeout=5, poll_interval=0.001)
+            for _ in range(2)
+        ]
+        peak = 0
+
+        async def call(limiter):
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(call(limiters[i % 2]) for i in range(8)))
+
+        asyncio.run(run())
+        assert peak == 2
+        assert limiters[0].in_flight == 0
+
+    def test_waiting_on_the_database_lock_leaves_the_event_loop_free(self, tmp_path):
+        """Test that a slot request blocked on another process's write lock doesn't stall other tasks."""
+        path = tmp_path / "limiter.sqlite3"
+        limiter = SQLiteLLMLimiter(path, max_in_flight=1, max_queued=5, queue_timeout=5)
+        other_process = sqlite3.connect(str(path), isolation_level=None)
+        other_process.execute("BEGIN IMMEDIATE")
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        async def run():
+            ticker = asyncio.create_task(tick())
+            asyncio.get_running_loop().call_later(0.2, other_process.execute, "COMMIT")
+            async with limiter.slot():
+                pass
+            ticker.cancel()
+
+        asyncio.run(run())
+        assert ticks >= 10
+        assert limiter.in_flight == 0
+
+    def test_rejects_when_wait_times_out(self, tmp_path):
+        """Test that a queued call gives up after queue_timeout."""
+        limiter = SQLiteLLMLimiter(tmp_path / "limiter.sqlite3", max_in_flight=1, max_queued=5,
+                                   queue_timeout=0.01, poll_interval=0.001)
+
+        async def run():
+            async with limiter.slot():
+                with pytest.raises(CapacityExceededError):
+                    async with limiter.slot():
+                        pass
+
+        asyncio.run(run())
+        assert limiter.queued == 0
+
+    def test_reclaims_expired_slots(self, tmp_path):
+        """Test that a slot held past its lease, e.g. by a crashed worker, is reclaimed."""
+        path = tmp_path / "limiter.sqlite3"
+        crashed = SQLiteLLMLimiter(path, max_in_flight=1, max_queued=5, queue_timeout=0.01, lease_seconds=0)
+        crashed._try_acquire()
+        limiter = SQLiteLLMLimiter(path, max_in_flight=1, max_queued=5, queue_timeout=0.01, lease_seconds=0)
+
+        async def run():
+            async with limiter.slot():
+                pass
+
+        asyncio.run(run())
+
+
+@patch('src.main.get_llm_limiter')
+@patch('src.main.get_model')
+def test_analyze_endpoint_returns_503_when_llm_capacity_exceeded(mock_get_model, mock_get_llm_limiter):
+    """Test that the endpoint sheds load with a 503 when no LLM slot is available."""
+    mock_limiter = MagicMock()
+    mock_limiter.slot.side_effect = CapacityExceededError("Too many analyses are queued")
+    mock_get_llm_limiter.return_value = mock_limiter
+
+    csv_content = "temperature,humidity\n75,60\n"
+    csv_file = io.BytesIO(csv_content.encode('utf-8'))
+
+    client = TestClient(app)
+    response = client.post(
+        "/analyze",
+        data={"growth_stage": "vegetation"},
+        files={"csv_file": ("test.csv", csv_file, "text/csv")}
+    )
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    mock_get_model.return_value.ainvoke.assert_not_called()
@@ -0,0 +1,82 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from .context_cache import REFRESH_MARGIN_SECONDS, GeminiContextCache, NullContextCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(create: AsyncMock, clock: FakeClock, min_tokens: int = 0) -> GeminiContextCache:
+    client = MagicMock()
+    client.aio.caches.create = create
+    return GeminiContextCache(
+        model="gemini-2.5-flash",
+        system_instruction="You are a mentor.",
+        version="abc123",
+        ttl_seconds=600,
+        min_tokens=min_tokens,
+        client_factory=lambda: client,
+        clock=clock,
+    )
+
+
+class TestGeminiContextCache:
+    """Tests for registering the prompt prefix with Gemini."""
+
+    def test_creates_once_and_reuses(self):
+        """Test that the cache entry is created once and reused until near expiry."""
+        clock = FakeClock()
+        create = AsyncMock(return_value=SimpleNamespace(name="cachedContents/1"))
+        cache = make_cache(create, clock)
+
+        assert asyncio.run(cache.cached_content()) == "cachedContents/1"
+        clock.now = 300
+        assert asyncio.run(cache.cached_content()) == "cachedContents/1"
+        assert create.call_count == 1
+        config = create.call_args.kwargs["config"]
+        assert config.system_instruction == "You are a mentor."
+        assert config.ttl == "600s"
+
+    def test_refreshes_before_expiry(self):
+        """Test that a new entry is created shortly before the old one expires."""
+        clock = FakeClock()
+        create = AsyncMock(side_effect=[SimpleNamespace(name="cachedContents/1"), SimpleNamespace(name="cachedContents/2")])
+        cache = make_cache(create, clock)
+        asyncio.run(cache.cached_content())
+        clock.now = 600 - REFRESH_MARGIN_SECONDS + 1
+        assert asyncio.run(cache.cached_content()) == "cachedContents/2"
+
+    def test_failure_falls_back_to_full_prompt(self):
+        """Test that a failed registration sends the full prompt and retries after the TTL."""
+        clock = FakeClock()
+        create = AsyncMock(side_effect=[RuntimeError("content too small"), SimpleNamespace(name="cachedContents/1")])
+        cache = make_cache(create, clock)
+
+        assert asyncio.run(cache.cached_content()) is None
+        clock.now = 10
+        assert asyncio.run(cache.cached_content()) is None
+        assert create.call_count == 1
+        clock.now = 601
+        assert asyncio.run(cache.cached_content()) == "cachedContents/1"
+
+    def test_prefix_below_minimum_is_never_registered(self):
+        """Test that a prefix too small for the provider's cache makes no create calls."""
+        clock = FakeClock()
+        create = AsyncMock(return_value=SimpleNamespace(name="cachedContents/1"))
+        cache = make_cache(create, clock, min_tokens=1024)
+
+        assert asyncio.run(cache.cached_content()) is None
+        clock.now = 10_000
+        assert asyncio.run(cache.cached_content()) is None
+        create.assert_not_called()
+
+
+def test_null_context_cache_never_caches():
+    """Test that NullContextCache always asks for the full prompt."""
+    assert asyncio.run(NullContextCache().cached_content()) is None
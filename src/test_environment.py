@@ -0,0 +1,115 @@
+import time
+import numpy as np
+import pytest
+from .environment import (
+    EnvironmentMetrics,
+    detect_environment_columns,
+    dew_point,
+    to_float_array,
+    vapor_pressure_deficit,
+)
+from .ingest import parse_upload
+
+
+class TestFormulas:
+    """Tests for the vectorized psychrometric formulas."""
+
+    def test_vapor_pressure_deficit_known_values(self):
+        """Test VPD against reference values."""
+        vpd = vapor_pressure_deficit(np.array([25.0, 20.0]), np.array([60.0, 100.0]))
+        assert vpd[0] == pytest.approx(1.27, abs=0.01)
+        assert vpd[1] == pytest.approx(0.0)
+
+    def test_dew_point_known_values(self):
+        """Test dew point against reference values."""
+        assert dew_point(np.array([25.0]), np.array([60.0]))[0] == pytest.approx(16.7, abs=0.1)
+        assert dew_point(np.array([20.0]), np.array([100.0]))[0] == pytest.approx(20.0, abs=0.01)
+
+    def test_to_float_array_handles_blanks_and_units(self):
+        """Test that blanks become NaN and unit suffixes are tolerated."""
+        values = to_float_array(["75", "", None, "60%"])
+        assert values[0] == 75
+        assert np.isnan(values[1]) and np.isnan(values[2])
+        assert values[3] == 60
+
+
+def test_detect_environment_columns():
+    """Test that common controller headers are recognized."""
+    columns = detect_environment_columns(["Timestamp", "temp_f", "RH", "ppfd"])
+    assert columns == {"temperature": "temp_f", "humidity": "RH", "ppfd": "ppfd"}
+
+
+class TestEnvironmentMetrics:
+    """Tests for EnvironmentMetrics."""
+
+    def test_fahrenheit_readings_are_normalized(self):
+        """Test that Fahrenheit input produces Celsius metrics and stage shares."""
+        metrics = EnvironmentMetrics(temperature_unit="F")
+        metrics.update(np.array([77.0, 77.0]), np.array([60.0, 40.0]))
+        assert metrics.mean("temperature_c") == pytest.approx(25.0)
+        shares = metrics.stage_shares("vegetation")
+        assert shares["temperature"] == 1.0
+        assert shares["humidity"] == 0.5
+
+    def test_infers_celsius_from_values(self):
+        """Test that the unit is inferred when the header doesn't say."""
+        metrics = EnvironmentMetrics()
+        metrics.update(np.array([24.0, 25.0]), np.array([60.0, 60.0]))
+        assert metrics.temperature_unit == "C"
+        assert metrics.mean("temperature_f") == pytest.approx(76.1)
+
+    def test_chunked_updates_match_single_pass(self):
+        """Test that aggregates are the same however the rows are chunked."""
+        rng = np.random.default_rng(0)
+        temperature = rng.uniform(65, 85, 1000)
+        humidity = rng.uniform(35, 80, 1000)
+        whole = EnvironmentMetrics(temperature_unit="F")
+        whole.update(temperature, humidity)
+        chunked = EnvironmentMetrics(temperature_unit="F")
+        for start in range(0, 1000, 128):
+            chunked.update(temperature[start:start + 128], humidity[start:start + 128])
+        assert chunked.mean("vpd_kpa") == pytest.approx(whole.mean("vpd_kpa"))
+        assert chunked.minimum("dew_point_c") == whole.minimum("dew_point_c")
+        assert chunked.stage_shares("flowering") == whole.stage_shares("flowering")
+
+    def test_one_million_rows_well_under_a_second(self):
+        """Microbenchmark: a million readings are processed in one vectorized pass."""
+        rng = np.random.default_rng(0)
+        temperature = rng.uniform(65, 85, 1_000_000)
+        humidity = rng.uniform(35, 80, 1_000_000)
+        metrics = EnvironmentMetrics(temperature_unit="F")
+
+        start = time.perf_counter()
+        metrics.update(temperature, humidity)
+        elapsed = time.perf_counter() - start
+
+        assert metrics.count == 1_000_000
+        assert elapsed < 0.5
+
+
+def test_parse_upload_feeds_metrics_into_prompt():
+    """Test that computed VPD and time-in-range appear in the prompt text."""
+    prompt, metrics = parse_upload("temp_f,RH,ppfd\n77,60,800\n77,60,820\n", "vegetation")
+    assert metrics.count == 2
+    assert "Computed environment metrics" in prompt
+    assert "VPD: mean 1.27 kPa" in prompt
+    assert "Time in vegetation ranges (selected stage)" in prompt
+    assert "PPFD: mean 810" in prompt
+
+
+def test_parse_upload_without_environment_columns():
+    """Test that uploads lacking temperature or humidity skip the metrics."""
+    prompt, metrics = parse_upload("ppfd\n800\n", "vegetation")
+    assert metrics is None
+    assert "Computed environment metrics" not in prompt
+
+
+def test_issues_names_out_of_range_conditions():
+    """Test that humid, cool conditions are reported as issues for flowering."""
+    metrics = EnvironmentMetrics(temperature_unit="F")
+    metrics.update(np.array([72.0, 73.0]), np.array([70.0, 72.0]), np.array([300.0, 0.0]))
+    issues = metrics.issues("flowering")
+    assert "humidity_high" in issues
+    assert "vpd_low" in issues
+    assert "temperature_high" not in issues
+    assert "light_low" in issues
@@ -0,0 +1,123 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+import numpy as np
+from fastapi.testclient import TestClient
+from . import main
+from .catalog import ProductCatalog
+from .environment import EnvironmentMetrics
+from .evals import (
+    EvalCase,
+    RecordedModel,
+    StructuredModel,
+    load_corpus,
+    main_cli,
+    record_case,
+    run_evals,
+    vpd_agreement,
+)
+from .fake_llm import FakeChatModel
+from .models import AnalysisResponse, ProductLink, Recommendation
+
+CATALOG_URL = "https://acinfinity.com/hydroponics-growers/cloudline-pro-t6-quiet-inline-duct-fan-system-with-temperature-humidity-vpd-controller-6-inch/"
+
+
+def _metrics(temperature: float, humidity: float) -> EnvironmentMetrics:
+    metrics = EnvironmentMetrics(temperature_unit="F")
+    metrics.update(np.full(24, temperature), np.full(24, humidity))
+    return metrics
+
+
+def _analysis(summary: str, url: str = CATALOG_URL) -> AnalysisResponse:
+    return AnalysisResponse(
+        summary=summary,
+        recommendations=[
+            Recommendation(
+                title="Add Exhaust",
+                description="Move more air out of the tent.",
+                priority="high",
+                product=ProductLink(name="CLOUDLINE PRO T6", url=url),
+            ),
+            Recommendation(title="Check Airflow", description="Aim a fan under the canopy.", priority="low"),
+        ],
+    )
+
+
+def _catalog() -> ProductCatalog:
+    return ProductCatalog(main.PRODUCT_LINKS_PATH)
+
+
+class TestEvals:
+    """Tests for recording, replaying and scoring eval cases."""
+
+    def test_records_and_replays_corpus(self, tmp_path):
+        """Test that recorded cases replay offline and score as valid with correct links."""
+        path = tmp_path / "corpus.jsonl"
+        for _ in range(3):
+            record_case(path, "vegetation", "Growth Stage: vegetation", _metrics(78, 80), _analysis("VPD is too low."))
+        cases = load_corpus(path)
+        assert len(cases) == 3 and cases[0].issues
+
+        report = asyncio.run(run_evals(cases, RecordedModel(), _catalog(), concurrency=2))
+        assert report.cases == 3 and report.errors == 0
+        assert report.valid_rate == 1.0
+        assert report.product_link_accuracy == 1.0
+        assert report.vpd_agreement_rate == 1.0
+        assert report.cases_per_second > 0
+
+    def test_replays_in_parallel(self, tmp_path):
+        """Test that cases run concurrently, so wall time tracks the slowest batch, not the sum."""
+        path = tmp_path / "corpus.jsonl"
+        for _ in range(8):
+            record_case(path, "vegetation", "Growth Stage: vegetation", _metrics(75, 65), _analysis("Stable."))
+        report = asyncio.run(run_evals(load_corpus(path), RecordedModel(latency=0.05), _catalog(), concurrency=8))
+        assert report.cases_per_second > 40
+
+    def test_scores_wrong_links_and_invalid_output(self):
+        """Test that off-catalog links and unparseable answers are counted."""
+        case = EvalCase("vegetation", "Growth Stage: vegetation", [], None, _analysis("ok", "https://example.com/x").model_dump())
+        broken = EvalCase("vegetation", "Growth Stage: vegetation", [], None, {"summary": "no recommendations"})
+        report = asyncio.run(run_evals([case, broken], RecordedModel(), _catalog()))
+        assert report.product_link_accuracy == 0.0
+        assert report.valid_rate == 0.5
+        assert report.errors == 1
+
+    def test_vpd_agreement_flags_contradictions(self):
+        """Test that claims contradicting the computed VPD disagree."""
+        metrics = _metrics(78, 80)
+        case = EvalCase("vegetation", "", metrics.issues("vegetation"), metrics.summary("vegetation"), None)
+        assert "vpd_low" in case.issues
+        assert vpd_agreement(case, _analysis("Your VPD is too low at night."))
+        assert not vpd_agreement(case, _analysis("Your VPD is too high, add humidity."))
+        assert not vpd_agreement(case, _analysis("VPD averages 2.4 kPa."))
+
+    def test_fake_model_replay(self, tmp_path):
+        """Test that a pluggable structured model is scored the same way."""
+        path = tmp_path / "corpus.jsonl"
+        record_case(path, "vegetation", "Growth Stage: vegetation", _metrics(75, 65), _analysis("Stable."))
+        model = StructuredModel(FakeChatModel().with_structured_output(AnalysisResponse))
+        report = asyncio.run(run_evals(load_corpus(path), model, _catalog()))
+        assert report.valid_rate == 1.0
+        assert report.product_link_accuracy == 1.0
+
+
+@patch('src.config.RULES_ENGINE', 'off')
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_structured_model')
+def test_analyze_records_cases_when_enabled(mock_get_structured_model, tmp_path, capsys):
+    """Test that /analyze appends model answers to the corpus, which the CLI then replays."""
+    path = tmp_path / "corpus.jsonl"
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_analysis("Too humid."))
+    with patch('src.config.EVAL_RECORD', True), patch('src.config.EVAL_CORPUS_PATH', str(path)):
+        response = TestClient(main.app).post(
+            "/analyze",
+            data={"growth_stage": "vegetation"},
+            files={"csv_file": ("test.csv", "temperature,humidity\n75,85\n76,84\n", "text/csv")},
+        )
+    assert response.status_code == 200
+    assert load_corpus(path)[0].response["summary"] == "Too humid."
+
+    report_path = tmp_path / "report.json"
+    assert main_cli(["--corpus", str(path), "--json", str(report_path), "--min-valid-rate", "1.0"]) == 0
+    assert json.loads(report_path.read_text())["cases"] == 1
+    assert "valid responses" in capsys.readouterr().out
@@ -0,0 +1,86 @@
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage
+from .catalog import ProductCatalog
+from .grounding import ground_products
+from .main import PRODUCT_LINKS_PATH, app
+from .models import AnalysisResponse, ProductLink, Recommendation
+from .telemetry import PRODUCT_LINKS, STRUCTURED_OUTPUTS
+
+CATALOG = ProductCatalog(PRODUCT_LINKS_PATH)
+T8 = next(product for product in CATALOG.products if product.name.startswith("CLOUDLINE PRO T8"))
+
+
+def _analysis(*links: ProductLink | None) -> AnalysisResponse:
+    return AnalysisResponse.model_construct(
+        summary="Humidity is high for flowering.",
+        recommendations=[
+            Recommendation(title="Add Exhaust", description="Pull humid air out with an inline fan.",
+                           priority="high", product=link)
+            for link in links
+        ],
+    )
+
+
+class TestGroundProducts:
+    """Tests for ground_products."""
+
+    def test_keeps_catalog_links(self):
+        """Test that answers whose links are all in the catalog are returned untouched."""
+        response = _analysis(ProductLink(name="T8", url=T8.url), None)
+        grounded, outcomes = ground_products(response, CATALOG, 0.6)
+        assert grounded is response
+        assert outcomes == {"valid": 1}
+
+    def test_snaps_invented_urls_by_name(self):
+        """Test that an invented URL is replaced by the catalog entry the name matches."""
+        response = _analysis(
+            ProductLink(name="AC Infinity CLOUDLINE PRO T8", url="https://acinfinity.com/t8-fan"),
+            ProductLink(name="SuperGrow 9000 Widget", url="https://example.com/widget"),
+        )
+        grounded, outcomes = ground_products(response, CATALOG, 0.6)
+        assert outcomes == {"snapped": 1, "dropped": 1}
+        assert grounded.recommendations[0].product.url == T8.url
+        assert grounded.recommendations[0].product.price_range == T8.price
+        assert grounded.recommendations[1].product is None
+        assert response.recommendations[0].product.url == "https://acinfinity.com/t8-fan"
+
+    def test_searches_catalog_when_every_link_is_dropped(self):
+        """Test that an answer never ends up without a product link."""
+        response = _analysis(ProductLink(name="Mystery Box", url="https://example.com/box"), None)
+        grounded, outcomes = ground_products(response, CATALOG, 0.6)
+        assert outcomes == {"searched": 1}
+        assert CATALOG.index.by_link(grounded.recommendations[0].product.url) is not None
+        AnalysisResponse.model_validate(grounded.model_dump())
+
+    def test_empty_catalog_leaves_response(self, tmp_path):
+        """Test that a missing catalog file does not strip every link."""
+        response = _analysis(ProductLink(name="Mystery Box", url="https://example.com/box"))
+        grounded, outcomes = ground_products(response, ProductCatalog(tmp_path / "missing.csv"), 0.6)
+        assert grounded is response and not outcomes
+
+
+@patch('src.config.RULES_ENGINE', 'off')
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_snaps_links_and_counts_reasks(mock_get_structured_model, mock_get_model):
+    """Test that analyses return catalog links and tracks corrections and re-asks."""
+    invented = _analysis(ProductLink(name="CLOUDLINE PRO T8 fan", url="https://acinfinity.com/t8"))
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(
+        side_effect=[OutputParserException("not JSON"), invented]
+    )
+    mock_get_model.return_value.ainvoke = AsyncMock(return_value=AIMessage(content="Add a CLOUDLINE PRO T8 fan."))
+    snapped, reasks = PRODUCT_LINKS.value(outcome="snapped"), STRUCTURED_OUTPUTS.value(outcome="reask")
+
+    response = TestClient(app).post(
+        "/analyze/fragment",
+        data={"growth_stage": "flowering"},
+        files={"csv_file": ("test.csv", "temperature,humidity\n75,60\n", "text/csv")},
+        headers={"Accept": "application/json"},
+    )
+    assert response.status_code == 200
+    assert response.json()["recommendations"][0]["product"]["url"] == T8.url
+    assert PRODUCT_LINKS.value(outcome="snapped") == snapped + 1
+    assert STRUCTURED_OUTPUTS.value(outcome="reask") == reasks + 1
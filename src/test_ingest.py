@@ -0,0 +1,217 @@
+import gzip
+import io
+import tracemalloc
+from unittest.mock import patch
+import pytest
+from fastapi.testclient import TestClient
+from .ingest import InvalidUploadError, UploadTooLargeError, detect_upload_format, parse_upload_file
+from .main import app
+
+
+def _write_synthetic_log(path, rows: int) -> None:
+    with open(path, "w") as f:
+        f.write("timestamp,temperature,humidity,ppfd\n")
+        for i in range(rows):
+            f.write(f"2025-01-{1 + (i // 1440) % 28:02d}T{(i // 60) % 24:02d}:{i % 60:02d}:00,"
+                    f"{70 + i % 12},{45 + i % 25},{600 + i % 300}\n")
+
+
+def _peak_parse_memory(path) -> int:
+    with open(path, "rb") as f:
+        tracemalloc.start()
+        try:
+            parse_upload_file(f, "vegetation", max_bytes=1 << 30, max_rows=10_000_000)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+@patch('src.config.METRICS_CHUNK_ROWS', 512)
+def test_peak_memory_is_flat_regardless_of_file_size(tmp_path):
+    """Test that parsing a 10x larger file does not use meaningfully more memory."""
+    small = tmp_path / "small.csv"
+    large = tmp_path / "large.csv"
+    _write_synthetic_log(small, 5_000)
+    _write_synthetic_log(large, 50_000)
+
+    small_peak = _peak_parse_memory(small)
+    large_peak = _peak_parse_memory(large)
+
+    assert large_peak < small_peak * 1.5
+    assert large_peak < large.stat().st_size / 2
+
+
+def test_parse_upload_file_enforces_byte_limit():
+    """Test that reading past max_bytes raises UploadTooLargeError."""
+    data = io.BytesIO(b"temperature,humidity\n" + b"75,60\n" * 1000)
+    with pytest.raises(UploadTooLargeError):
+        parse_upload_file(data, "vegetation", max_bytes=1024, max_rows=10_000)
+
+
+def test_parse_upload_file_enforces_row_limit():
+    """Test that more than max_rows rows raises UploadTooLargeError."""
+    data = io.BytesIO(b"temperature,humidity\n" + b"75,60\n" * 11)
+    with pytest.raises(UploadTooLargeError):
+        parse_upload_file(data, "vegetation", max_bytes=1 << 20, max_rows=10)
+
+
+@patch('src.config.DIGEST_RAW_ROW_LIMIT', 0)
+def test_digest_and_metrics_agree_on_the_temperature_unit():
+    """Test that one cold first reading doesn't make the digest read a Fahrenheit upload as Celsius."""
+    data = io.BytesIO(b"temperature,humidity\n40,60\n" + b"75,60\n" * 20)
+    prompt, metrics = parse_upload_file(data, "vegetation", max_bytes=1 << 20, max_rows=100)
+    assert metrics.temperature_unit == "F"
+    assert "- temperature_f (72-82): 1 below (5%), 0 above (0%) of 21" in prompt
+
+
+def test_parse_upload_file_strips_byte_order_mark():
+    """Test that a UTF-8 BOM from spreadsheet exports doesn't corrupt the first header."""
+    data = io.BytesIO("﻿temperature,humidity\n75,60\n".encode("utf-8"))
+    prompt, metrics = parse_upload_file(data, "vegetation")
+    assert "Column headers: temperature, humidity" in prompt
+    assert metrics.count == 1
+
+
+@patch('src.config.MAX_UPLOAD_ROWS', 5)
+def test_analyze_endpoint_rejects_too_many_rows():
+    """Test that the endpoint responds 413 before calling the model when over the row limit."""
+    csv_file = io.BytesIO(b"temperature,humidity\n" + b"75,60\n" * 6)
+    client = TestClient(app)
+    response = client.post(
+        "/analyze",
+        data={"growth_stage": "vegetation"},
+        files={"csv_file": ("big.csv", csv_file, "text/csv")}
+    )
+    assert response.status_code == 413
+
+
+@patch('src.config.MAX_UPLOAD_BYTES', 16)
+def test_analyze_endpoint_rejects_oversized_upload():
+    """Test that the endpoint responds 413 when the upload is over the byte limit."""
+    csv_file = io.BytesIO(b"temperature,humidity\n" + b"75,60\n" * 6)
+    client = TestClient(app)
+    response = client.post(
+        "/analyze",
+        data={"growth_stage": "vegetation"},
+        files={"csv_file": ("big.csv", csv_file, "text/csv")}
+    )
+    assert response.status_code == 413
+
+
+SAMPLE_CSV = (
+    "timestamp,temperature,humidity,ppfd\n"
+    + "".join(f"2025-01-01 {hour:02d}:00,{74 + hour % 5},{60 + hour % 7},{600 if hour >= 6 else 0}\n" for hour in range(24)) * 5
+)
+
+
+def _sample_table():
+    pa = pytest.importorskip("pyarrow")
+    from datetime import datetime
+    rows = [line.split(",") for line in SAMPLE_CSV.strip().splitlines()[1:]]
+    return pa.table({
+        "timestamp": pa.array([datetime.fromisoformat(row[0]) for row in rows], type=pa.timestamp("s")),
+        "temperature": pa.array([float(row[1]) for row in rows]),
+        "humidity": pa.array([int(row[2]) for row in rows]),
+        "ppfd": pa.array([float(row[3]) for row in rows]),
+    })
+
+
+def test_detect_upload_format():
+    """Test that formats are recognized from their leading bytes."""
+    assert detect_upload_format(gzip.compress(b"a,b")[:8]) == "gzip"
+    assert detect_upload_format(b"PAR1\x15\x04") == "parquet"
+    assert detect_upload_format(b"ARROW1\x00\x00") == "arrow_file"
+    assert detect_upload_format(b"timestamp,temperature") == "csv"
+
+
+def test_gzip_csv_matches_plain_csv():
+    """Test that a .csv.gz upload parses exactly like the plain CSV."""
+    plain = parse_upload_file(io.BytesIO(SAMPLE_CSV.encode()), "vegetation")
+    compressed = parse_upload_file(io.BytesIO(gzip.compress(SAMPLE_CSV.encode())), "vegetation")
+    assert compressed[0] == plain[0]
+
+
+def test_zstd_csv_matches_plain_csv():
+    """Test that a .csv.zst upload parses exactly like the plain CSV."""
+    zstandard = pytest.importorskip("zstandard")
+    plain = parse_upload_file(io.BytesIO(SAMPLE_CSV.encode()), "vegetation")
+    payload = zstandard.ZstdCompressor().compress(SAMPLE_CSV.encode())
+    assert parse_upload_file(io.BytesIO(payload), "vegetation")[0] == plain[0]
+
+
+@patch('src.config.MAX_DECOMPRESSED_BYTES', 1024)
+def test_decompressed_size_is_limited():
+    """Test that a small compressed upload can't expand past MAX_DECOMPRESSED_BYTES."""
+    bomb = gzip.compress(b"temperature,humidity\n" + b"75,60\n" * 10_000)
+    with pytest.raises(UploadTooLargeError):
+        parse_upload_file(io.BytesIO(bomb), "vegetation")
+
+
+def test_corrupt_gzip_is_invalid():
+    """Test that a truncated gzip upload raises InvalidUploadError."""
+    payload = gzip.compress(SAMPLE_CSV.encode())[:40]
+    with pytest.raises(InvalidUploadError):
+        parse_upload_file(io.BytesIO(payload), "vegetation")
+
+
+@pytest.mark.parametrize("raw_row_limit", [48, 200])
+def test_parquet_matches_csv(raw_row_limit):
+    """Test that Parquet, read as typed columns, yields the same metrics and digest as CSV."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    buffer = io.BytesIO()
+    pq.write_table(_sample_table(), buffer, row_group_size=50)
+    buffer.seek(0)
+
+    with patch('src.config.DIGEST_RAW_ROW_LIMIT', raw_row_limit), patch('src.config.METRICS_CHUNK_ROWS', 32):
+        csv_prompt, csv_metrics = parse_upload_file(io.BytesIO(SAMPLE_CSV.encode()), "vegetation")
+        parquet_prompt, parquet_metrics = parse_upload_file(buffer, "vegetation")
+
+    assert parquet_metrics.count == csv_metrics.count == 120
+    assert parquet_metrics.mean("vpd_kpa") == pytest.approx(csv_metrics.mean("vpd_kpa"))
+    assert parquet_metrics.issues("vegetation") == csv_metrics.issues("vegetation")
+    if raw_row_limit < 120:
+        assert parquet_prompt == csv_prompt
+    else:
+        assert "Reading 120: timestamp: 2025-01-01 23:00:00, temperature: 77, humidity: 62, ppfd: 600" in parquet_prompt
+
+
+def test_parquet_with_all_null_column():
+    """Test that a summarized Parquet upload with an all-null column parses like its CSV."""
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = _sample_table().append_column("vpd", pa.nulls(120, type=pa.float64()))
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    buffer.seek(0)
+
+    with patch('src.config.DIGEST_RAW_ROW_LIMIT', 48):
+        prompt, metrics = parse_upload_file(buffer, "vegetation")
+
+    assert metrics.count == 120
+    assert "Out-of-range readings against vegetation targets" in prompt
+
+
+def test_arrow_stream_upload():
+    """Test that an Arrow IPC stream upload is parsed."""
+    pa = pytest.importorskip("pyarrow")
+    table = _sample_table()
+    buffer = io.BytesIO()
+    with pa.ipc.new_stream(buffer, table.schema) as writer:
+        writer.write_table(table)
+    buffer.seek(0)
+    _, metrics = parse_upload_file(buffer, "vegetation")
+    assert metrics.count == 120
+
+
+def test_analyze_endpoint_accepts_gzip_upload():
+    """Test that /analyze/fragment takes a gzip-compressed CSV."""
+    client = TestClient(app)
+    with patch('src.config.RULES_ENGINE', 'in_range'), patch('src.config.RULES_MIN_READINGS', 1):
+        response = client.post(
+            "/analyze/fragment",
+            data={"growth_stage": "vegetation"},
+            files={"csv_file": ("log.csv.gz", gzip.compress(b"temperature,humidity\n75,65\n"), "application/gzip")},
+            headers={"Accept": "application/json"},
+        )
+    assert response.status_code == 200
+    assert response.json()["recommendations"]
@@ -0,0 +1,270 @@
+import asyncio
+import io
+import sqlite3
+import time
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from .jobs import Job, JobQueue, MemoryJobStore, PermanentJobError, SQLiteJobStore
+from .main import app
+from .models import AnalysisResponse, Recommendation, ProductLink
+
+
+def _make_analysis():
+    return AnalysisResponse(
+        summary="Job summary",
+        recommendations=[
+            Recommendation(
+                title="Lower Humidity",
+                description="Run a dehumidifier overnight.",
+                priority="high",
+                product=ProductLink(name="Dehumidifier", url="https://acinfinity.com/dehumidifier")
+            ),
+            Recommendation(title="Increase Airflow", description="Turn up the exhaust fan.", priority="medium")
+        ]
+    )
+
+
+def _run_jobs(queue: JobQueue, jobs: list[Job]) -> None:
+    async def run():
+        for job in jobs:
+            await queue.submit(job)
+        await queue.drain()
+
+    asyncio.run(run())
+
+
+class TestMemoryJobStore:
+    """Tests for MemoryJobStore."""
+
+    def test_evicts_oldest_finished_jobs_over_the_cap(self):
+        """Test that only max_finished finished jobs are kept, and pending ones never evicted."""
+        store = MemoryJobStore(max_finished=2, ttl_seconds=3600)
+        pending = Job(growth_stage="vegetation", payload=b"data")
+        store.save(pending)
+        finished = [Job(growth_stage="vegetation", payload=None, status="succeeded") for _ in range(3)]
+        for job in finished:
+            store.save(job)
+
+        assert store.get(finished[0].id) is None
+        assert store.get(finished[2].id) is not None
+        assert store.get(pending.id) is not None
+
+    def test_expires_finished_jobs(self):
+        """Test that finished jobs are dropped once older than ttl_seconds."""
+        store = MemoryJobStore(max_finished=10, ttl_seconds=60)
+        job = Job(growth_stage="vegetation", payload=None, status="failed")
+        store.save(job)
+        with patch('src.jobs.time.time', return_value=time.time() + 61):
+            assert store.get(job.id) is None
+
+
+class TestJobQueue:
+    """Tests for JobQueue."""
+
+    def test_runs_job_to_success(self):
+        """Test that a job's result is stored and its payload released."""
+        async def handler(job):
+            return _make_analysis()
+
+        queue = JobQueue(MemoryJobStore(), handler, workers=2, max_attempts=3, retry_backoff=0)
+        job = Job(growth_stage="vegetation", payload=b"data")
+        _run_jobs(queue, [job])
+
+        stored = queue.store.get(job.id)
+        assert stored.status == "succeeded"
+        assert stored.result.summary == "Job summary"
+        assert stored.payload is None
+
+    def test_retries_transient_failures(self):
+        """Test that failures are retried up to max_attempts."""
+        attempts = []
+
+        async def handler(job):
+            attempts.append(job.attempts)
+            if len(attempts) < 3:
+                raise RuntimeError("flaky upstream")
+            return _make_analysis()
+
+        queue = JobQueue(MemoryJobStore(), handler, workers=1, max_attempts=3, retry_backoff=0)
+        job = Job(growth_stage="vegetation", payload=b"data")
+        _run_jobs(queue, [job])
+
+        assert attempts == [1, 2, 3]
+        assert queue.store.get(job.id).status == "succeeded"
+
+    def test_permanent_errors_are_not_retried(self):
+        """Test that PermanentJobError fails the job on the first attempt."""
+        handler = AsyncMock(side_effect=PermanentJobError("bad csv"))
+        queue = JobQueue(MemoryJobStore(), handler, workers=1, max_attempts=3, retry_backoff=0)
+        job = Job(growth_stage="vegetation", payload=b"data")
+        _run_jobs(queue, [job])
+
+        stored = queue.store.get(job.id)
+        assert stored.status == "failed"
+        assert stored.error == "bad csv"
+        assert stored.attempts == 1
+
+    def test_worker_count_limits_concurrency(self):
+        """Test that no more than `workers` jobs run at once."""
+        running = 0
+        peak = 0
+
+        async def handler(job):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return _make_analysis()
+
+        queue = JobQueue(MemoryJobStore(), handler, workers=2, max_attempts=1, retry_backoff=0)
+        _run_jobs(queue, [Job(growth_stage="vegetation", payload=b"x") for _ in range(6)])
+        assert peak == 2
+
+    def test_releases_change_events_when_jobs_finish(self):
+        """Test that no per-job event outlives the job's last waiter."""
+        async def handler(job):
+            await asyncio.sleep(0.01)
+            return _make_analysis()
+
+        queue = JobQueue(MemoryJobStore(), handler, workers=1, max_attempts=1, retry_backoff=0)
+        job = Job(growth_stage="vegetation", payload=b"data")
+
+        async def run():
+            await queue.submit(job)
+            while queue.store.get(job.id).status not in ("succeeded", "failed"):
+                await queue.wait_for_change(job.id, timeout=1)
+            await queue.wait_for_change("unknown", timeout=0)
+            await queue.drain()
+
+        asyncio.run(run())
+        assert queue._changed == {}
+
+    def test_sqlite_store_resumes_pending_jobs(self, tmp_path):
+        """Test that jobs queued before a restart are processed by a new queue."""
+        path = tmp_path / "jobs.sqlite3"
+        job = Job(growth_stage="flowering", payload=b"data", client="key:abc")
+        SQLiteJobStore(path).save(job)
+
+        async def handler(job):
+            return _make_analysis()
+
+        queue = JobQueue(SQLiteJobStore(path), handler, workers=1, max_attempts=1, retry_backoff=0)
+
+        async def run():
+            await queue.wait_for_change(job.id, timeout=0)
+            await queue.drain()
+
+        asyncio.run(run())
+        stored = SQLiteJobStore(path).get(job.id)
+        assert stored.status == "succeeded"
+        assert stored.result == _make_analysis()
+        assert stored.client == "key:abc"
+
+    def test_queues_sharing_a_sqlite_store_run_each_job_once(self, tmp_path):
+        """Test that two worker processes' queues on one store never run the same job twice."""
+        path = tmp_path / "jobs.sqlite3"
+        jobs = [Job(growth_stage="vegetation", payload=b"data") for _ in range(8)]
+        for job in jobs:
+            SQLiteJobStore(path).save(job)
+        runs = []
+
+        async def handler(job):
+            runs.append(job.id)
+            await asyncio.sleep(0.01)
+            return _make_analysis()
+
+        queues = [JobQueue(SQLiteJobStore(path), handler, workers=2, max_attempts=1, retry_backoff=0) for _ in range(2)]
+
+        async def run():
+            for queue in queues:
+                await queue.wait_for_change("start", timeout=0)
+            for queue in queues:
+                await queue.drain()
+
+        asyncio.run(run())
+        assert sorted(runs) == sorted(job.id for job in jobs)
+        assert all(SQLiteJobStore(path).get(job.id).status == "succeeded" for job in jobs)
+
+    def test_waiting_on_the_database_lock_leaves_the_event_loop_free(self, tmp_path):
+        """Test that a submit blocked on another process's write lock doesn't stall other tasks."""
+        path = tmp_path / "jobs.sqlite3"
+        queue = JobQueue(SQLiteJobStore(path), AsyncMock(return_value=_make_analysis()),
+                         workers=1, max_attempts=1, retry_backoff=0)
+        other_process = sqlite3.connect(str(path), isolation_level=None)
+        other_process.execute("BEGIN IMMEDIATE")
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        async def run():
+            ticker = asyncio.create_task(tick())
+            asyncio.get_running_loop().call_later(0.2, other_process.execute, "COMMIT")
+            job = await queue.submit(Job(growth_stage="vegetation", payload=b"data"))
+            await queue.drain()
+            ticker.cancel()
+            return job
+
+        job = asyncio.run(run())
+        assert ticks >= 10
+        assert SQLiteJobStore(path).get(job.id).status == "succeeded"
+
+    def test_running_jobs_of_exited_workers_are_requeued(self, tmp_path):
+        """Test that a job left running by a process that has exited is run again."""
+        path = tmp_path / "jobs.sqlite3"
+        job = Job(growth_stage="vegetation", payload=b"data", status="running", owner=2 ** 22 + 1)
+        SQLiteJobStore(path).save(job)
+
+        async def handler(job):
+            return _make_analysis()
+
+        queue = JobQueue(SQLiteJobStore(path), handler, workers=1, max_attempts=1, retry_backoff=0)
+
+        async def run():
+            await queue.wait_for_change(job.id, timeout=0)
+            await queue.drain()
+
+        with patch('src.jobs.process_alive', return_value=False):
+            asyncio.run(run())
+        assert SQLiteJobStore(path).get(job.id).status == "succeeded"
+
+
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_structured_model')
+def test_job_endpoints_submit_and_poll(mock_get_structured_model):
+    """Test that a submitted job returns 202 at once and can be polled to completion."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_make_analysis())
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/jobs",
+            data={"growth_stage": "vegetation"},
+            files={"csv_file": ("test.csv", io.BytesIO(b"temperature,humidity\n75,60\n"), "text/csv")}
+        )
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+        assert response.headers["Location"] == f"/jobs/{job_id}"
+
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            status = client.get(f"/jobs/{job_id}").json()
+            if status["status"] == "succeeded":
+                break
+            time.sleep(0.01)
+
+        assert status["status"] == "succeeded"
+        assert status["analysis"]["summary"] == "Job summary"
+
+        events = client.get(f"/jobs/{job_id}/events").text
+        assert "event: status" in events
+        assert '"status": "succeeded"' in events
+
+
+def test_job_endpoint_unknown_id():
+    """Test that an unknown job ID is a 404."""
+    client = TestClient(app)
+    assert client.get("/jobs/does-not-exist").status_code == 404
@@ -0,0 +1,44 @@
+from .profile_imports import main_cli, parse_importtime, profile_import, top_level_costs
+
+# Ceilings for importing the web layer in a fresh interpreter. fastapi alone
+# takes about 0.4s and 260 modules; with the model clients and pyarrow
+# imported eagerly, src.main took over 2s and 1300 modules.
+MAX_IMPORT_SECONDS = 1.5
+MAX_IMPORT_MODULES = 750
+
+# Loaded on first use, never by importing the app.
+DEFERRED_MODULES = ("langchain_google_genai", "google.genai", "langchain", "langsmith", "pyarrow")
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _abc
+import time:       300 |        420 |   abc
+import time:      1000 |       1500 | pkg.sub
+import time:       250 |        250 | pkg
+"""
+
+
+class TestProfileImports:
+    """Tests for the import-time profiler."""
+
+    def test_parses_importtime_output(self):
+        """Test that -X importtime lines become entries with their nesting depth."""
+        entries = parse_importtime(SAMPLE)
+        assert [(entry.name, entry.depth) for entry in entries] == [("_abc", 2), ("abc", 1), ("pkg.sub", 0), ("pkg", 0)]
+        assert entries[2].self_us == 1000 and entries[2].cumulative_us == 1500
+        assert top_level_costs(entries) == {"pkg": 1750}
+
+    def test_web_layer_import_stays_within_ceilings(self):
+        """Test that importing the app is fast and leaves the heavy model dependencies unloaded."""
+        profile = profile_import("src.main", runs=2)
+        assert profile.seconds < MAX_IMPORT_SECONDS
+        assert profile.module_count < MAX_IMPORT_MODULES
+        assert [name for name in DEFERRED_MODULES if profile.loaded(name)] == []
+        assert any(entry.name == "fastapi" for entry in profile.entries)
+
+
+def test_cli_fails_on_forbidden_import(capsys):
+    """Test that the CLI exits non-zero when a gate is exceeded."""
+    assert main_cli(["--module", "src.config", "--runs", "1", "--forbid", "os", "--max-modules", "10000"]) == 1
+    captured = capsys.readouterr()
+    assert "import src.config" in captured.out
+    assert "import loaded os" in captured.err
@@ -0,0 +1,116 @@
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from langchain.messages import HumanMessage, SystemMessage
+from . import config, main
+from .catalog import CatalogProduct
+from .models import AnalysisResponse, ProductLink, Recommendation
+from .prompts import SYSTEM_MESSAGE, SYSTEM_PROMPT, build_messages
+from .stages import STAGE_TARGETS
+
+PRODUCT = CatalogProduct(
+    category="Fans",
+    name="CLOUDLINE PRO T6",
+    price="$199",
+    url="https://acinfinity.com/cloudline-pro-t6/",
+    description="Inline fan",
+)
+
+
+class TestPromptPrefix:
+    """Tests for the byte-stable system prompt prefix."""
+
+    def test_prefix_is_shared_between_requests(self):
+        """Test that every request reuses the same prefix message."""
+        first = build_messages("vegetation", "temperature,humidity\n75,60", [PRODUCT])
+        second = build_messages("flowering", "temp,rh\n70,45", [])
+        assert first[0] is SYSTEM_PROMPT
+        assert second[0] is SYSTEM_PROMPT
+
+    def test_prefix_holds_no_request_data(self):
+        """Test that products and uploads go in the suffix only."""
+        messages = build_messages("vegetation", "temperature,humidity\n75,60", [PRODUCT])
+        assert PRODUCT.url not in SYSTEM_MESSAGE
+        assert PRODUCT.url in messages[1].content
+        assert "75,60" in messages[1].content
+
+    def test_prefix_matches_stage_targets(self):
+        """Test that the ranges given to the model agree with STAGE_TARGETS."""
+        for targets in STAGE_TARGETS.values():
+            low, high = targets.vpd_kpa
+            assert f"{low}-{high} kPa" in SYSTEM_MESSAGE
+            low, high = targets.temperature_f
+            assert f"{low}-{high}°F" in SYSTEM_MESSAGE
+
+    def test_cached_prefix_sends_suffix_only(self):
+        """Test that the system message is omitted once the provider caches it."""
+        messages = build_messages("vegetation", "temperature,humidity\n75,60", [PRODUCT], prefix_cached=True)
+        assert len(messages) == 1
+        assert isinstance(messages[0], HumanMessage)
+
+
+class StubContextCache:
+    async def cached_content(self) -> str | None:
+        return "cachedContents/test"
+
+
+@patch('src.config.RULES_ENGINE', 'off')
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_structured_model')
+def test_analyze_uses_context_cache(mock_get_structured_model):
+    """Test that a cached prefix is referenced instead of resent."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=AnalysisResponse(
+        summary="Humidity is a little high for flowering.",
+        recommendations=[
+            Recommendation(
+                title="Lower Humidity",
+                description="Run a dehumidifier overnight.",
+                priority="high",
+                product=ProductLink(name="Dehumidifier", url="https://acinfinity.com/dehumidifier"),
+            ),
+            Recommendation(title="Increase Airflow", description="Turn up the exhaust fan.", priority="medium"),
+        ],
+    ))
+    main._context_cache = StubContextCache()
+
+    client = TestClient(main.app)
+    response = client.post(
+        "/analyze",
+        data={"growth_stage": "flowering"},
+        files={"csv_file": ("test.csv", "temperature,humidity\n75,60\n", "text/csv")},
+    )
+
+    assert response.status_code == 200
+    call = mock_get_structured_model.return_value.ainvoke.call_args
+    messages = call.args[0]
+    assert not any(isinstance(message, SystemMessage) for message in messages)
+    assert call.kwargs == {"cached_content": "cachedContents/test"}
+
+
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_structured_model')
+def test_analyze_prompt_only_includes_relevant_products(mock_get_structured_model):
+    """Test that the prompt carries a few retrieved products instead of the whole catalog."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=AnalysisResponse(
+        summary="Humidity is high for flowering.",
+        recommendations=[
+            Recommendation(
+                title="Lower Humidity",
+                description="Run a dehumidifier overnight.",
+                priority="high",
+                product=ProductLink(name="Dehumidifier", url="https://acinfinity.com/dehumidifier"),
+            ),
+            Recommendation(title="Increase Airflow", description="Turn up the exhaust fan.", priority="medium"),
+        ],
+    ))
+
+    client = TestClient(main.app)
+    client.post(
+        "/analyze",
+        data={"growth_stage": "flowering"},
+        files={"csv_file": ("humid.csv", "temperature,humidity\n75,75\n76,78\n", "text/csv")},
+    )
+
+    system_msg, human_msg = mock_get_structured_model.return_value.ainvoke.await_args.args[0]
+    assert "acinfinity.com" not in system_msg.content
+    assert human_msg.content.count("https://") == config.PROMPT_PRODUCT_COUNT
+    assert "Humidity Control" in human_msg.content
@@ -0,0 +1,124 @@
+from unittest.mock import AsyncMock, patch
+import pytest
+from fastapi.testclient import TestClient
+from . import main
+from .models import AnalysisResponse, ProductLink, Recommendation
+from .quotas import (
+    ClientQuotas,
+    MemoryQuotaStore,
+    RateLimitedError,
+    SQLiteQuotaStore,
+    TokenBudgetExceededError,
+    client_key,
+)
+
+CSV = "timestamp,temperature,humidity\n2025-01-01 00:00,75,85\n2025-01-01 01:00,76,84\n"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_750_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _analysis() -> AnalysisResponse:
+    return AnalysisResponse(
+        summary="Too humid.",
+        recommendations=[
+            Recommendation(
+                title="Lower Humidity",
+                description="Run a dehumidifier.",
+                priority="high",
+                product=ProductLink(name="Dehumidifier", url="https://acinfinity.com/dehumidifier"),
+            ),
+            Recommendation(title="Increase Airflow", description="Turn up the exhaust fan.", priority="medium"),
+        ],
+    )
+
+
+class TestClientQuotas:
+    """Tests for per-client token buckets and daily token budgets."""
+
+    @pytest.mark.parametrize("make_store", [lambda tmp_path: MemoryQuotaStore(),
+                                            lambda tmp_path: SQLiteQuotaStore(tmp_path / "quotas.sqlite3")])
+    def test_token_bucket_allows_burst_then_refills(self, tmp_path, make_store):
+        """Test that a client gets `burst` requests at once, then one per refill interval."""
+        clock = FakeClock()
+        quotas = ClientQuotas(make_store(tmp_path), requests_per_minute=60, burst=3, daily_token_budget=0, clock=clock)
+        for _ in range(3):
+            quotas.admit("a")
+        with pytest.raises(RateLimitedError) as exc_info:
+            quotas.admit("a")
+        assert exc_info.value.retry_after == pytest.approx(1.0)
+        quotas.admit("b")  # other clients are unaffected
+
+        clock.now += 1
+        quotas.admit("a")
+        with pytest.raises(RateLimitedError):
+            quotas.admit("a")
+
+    def test_budget_refuses_until_next_day(self):
+        """Test that a client over its daily token budget is refused until UTC midnight."""
+        clock = FakeClock()
+        quotas = ClientQuotas(MemoryQuotaStore(), requests_per_minute=0, burst=0, daily_token_budget=1000, clock=clock)
+        quotas.charge("a", 600)
+        quotas.admit("a")
+        quotas.charge("a", 400)
+        with pytest.raises(TokenBudgetExceededError):
+            quotas.admit("a")
+        assert quotas.usage("a") == {"tokens_used": 1000, "daily_token_budget": 1000, "tokens_remaining": 0}
+
+        clock.now += 86400
+        quotas.admit("a")
+
+    def test_sqlite_usage_is_shared(self, tmp_path):
+        """Test that usage charged by one worker's store is seen by another's."""
+        first = SQLiteQuotaStore(tmp_path / "quotas.sqlite3")
+        second = SQLiteQuotaStore(tmp_path / "quotas.sqlite3")
+        first.add_usage("a", "2025-06-15", 250)
+        second.add_usage("a", "2025-06-15", 50)
+        assert first.usage("a", "2025-06-15") == 300
+
+
+def test_client_key_hashes_api_keys():
+    """Test that clients are keyed by a hash of their API key, else by address."""
+    assert client_key("secret", "1.2.3.4").startswith("key:")
+    assert "secret" not in client_key("secret", "1.2.3.4")
+    assert client_key(None, "1.2.3.4") == "ip:1.2.3.4"
+
+
+@patch('src.config.RATE_LIMIT_PER_MINUTE', 1.0)
+@patch('src.config.RATE_LIMIT_BURST', 1)
+@patch('src.main.parse_upload_file')
+def test_rate_limited_requests_are_refused_before_parsing(mock_parse):
+    """Test that a client over its rate limit gets a 429 without its upload being parsed."""
+    client = TestClient(main.app)
+    assert client.post("/analyze/batch", json={}, headers={"X-API-Key": "one"}).status_code == 422
+
+    files = {"csv_file": ("test.csv", CSV, "text/csv")}
+    response = client.post("/analyze", data={"growth_stage": "vegetation"}, files=files, headers={"X-API-Key": "one"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    mock_parse.assert_not_called()
+
+
+@patch('src.config.RULES_ENGINE', 'off')
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.config.DAILY_TOKEN_BUDGET', 100)
+@patch('src.main.get_structured_model')
+def test_model_tokens_are_charged_to_the_client(mock_get_structured_model):
+    """Test that model token usage counts against the caller's budget, which then sheds it."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_analysis())
+    client = TestClient(main.app)
+    headers = {"X-API-Key": "one"}
+    files = {"csv_file": ("test.csv", CSV, "text/csv")}
+
+    response = client.post("/analyze", data={"growth_stage": "vegetation"}, files=files, headers=headers)
+    assert response.status_code == 200
+    assert client.get("/quota", headers=headers).json()["tokens_used"] >= 100
+    assert client.get("/quota", headers={"X-API-Key": "two"}).json()["tokens_used"] == 0
+
+    response = client.post("/analyze", data={"growth_stage": "vegetation"}, files=files, headers=headers)
+    assert response.status_code == 429
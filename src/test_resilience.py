@@ -0,0 +1,221 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.exceptions import ModelInvalidRequestError, OutputParserException
+from langchain_core.messages import AIMessage
+from . import main
+from .fake_llm import FakeChatModel, FakeLLMError
+from .catalog import ProductCatalog
+from .models import AnalysisResponse
+from .resilience import CircuitBreaker, CircuitOpenError, LLMUnavailableError, ResilientChatModel
+from .rules import FALLBACK_PRODUCT
+from .test_rules import make_metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FlakyModel:
+    """Fails the first `failures` calls, then answers."""
+
+    def __init__(self, failures: int, delays: list[float] | None = None):
+        self.failures = failures
+        self.delays = delays or []
+        self.calls = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        if self.calls <= len(self.delays):
+            await asyncio.sleep(self.delays[self.calls - 1])
+        if self.calls <= self.failures:
+            raise FakeLLMError("Simulated LLM failure")
+        return AIMessage(f"answer {self.calls}")
+
+
+def make_client(inner, breaker=None, **kwargs) -> ResilientChatModel:
+    options = dict(timeout=1.0, max_retries=2, backoff_base=0.001, backoff_max=0.002, seed=0)
+    options.update(kwargs)
+    return ResilientChatModel(inner, breaker=breaker or CircuitBreaker(failure_threshold=3, reset_timeout=30), **options)
+
+
+class TestResilientChatModel:
+    """Tests for deadlines, retries and hedging around a model."""
+
+    def test_retries_until_success(self):
+        """Test that transient failures are retried."""
+        inner = FlakyModel(failures=2)
+        response = asyncio.run(make_client(inner).ainvoke("hi"))
+        assert response.content == "answer 3"
+        assert inner.calls == 3
+
+    def test_gives_up_after_max_retries(self):
+        """Test that LLMUnavailableError is raised once retries are exhausted."""
+        inner = FlakyModel(failures=10)
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(make_client(inner, max_retries=1).ainvoke("hi"))
+        assert inner.calls == 2
+
+    def test_times_out_slow_calls(self):
+        """Test that a call slower than the deadline is abandoned and retried."""
+        inner = FlakyModel(failures=0, delays=[1.0])
+        response = asyncio.run(make_client(inner, timeout=0.05).ainvoke("hi"))
+        assert response.content == "answer 2"
+
+    def test_does_not_retry_validation_errors(self):
+        """Test that unparseable model output is raised immediately."""
+        inner = AsyncMock()
+        inner.ainvoke.side_effect = OutputParserException("bad output")
+        with pytest.raises(OutputParserException):
+            asyncio.run(make_client(inner).ainvoke("hi"))
+        assert inner.ainvoke.call_count == 1
+
+    def test_does_not_retry_invalid_requests(self):
+        """Test that a request the provider refuses fails at once without tripping the breaker."""
+        inner = AsyncMock()
+        inner.ainvoke.side_effect = ModelInvalidRequestError("bad request")
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(make_client(inner, breaker).ainvoke("hi"))
+        assert inner.ainvoke.call_count == 1
+        assert breaker.state == "closed"
+
+    def test_backoff_is_jittered_and_capped(self):
+        """Test that backoff delays stay within the exponential bound and the cap."""
+        client = make_client(FlakyModel(0), backoff_base=1.0, backoff_max=3.0)
+        delays = [client.backoff_delay(attempt) for attempt in (1, 2, 3, 4) for _ in range(20)]
+        assert all(0 <= delay <= 3.0 for delay in delays)
+        assert len(set(delays)) > 1
+        assert all(client.backoff_delay(1) <= 1.0 for _ in range(20))
+
+    def test_hedges_after_p95_latency(self):
+        """Test that a slow call is hedged and the faster copy wins."""
+        inner = FlakyModel(failures=0, delays=[0.5, 0.0])
+        client = make_client(inner, hedge=True, hedge_min_samples=3)
+        client._latencies.extend([0.01, 0.01, 0.02])
+
+        async def run():
+            start = asyncio.get_running_loop().time()
+            response = await client.ainvoke("hi")
+            return response, asyncio.get_running_loop().time() - start
+
+        response, elapsed = asyncio.run(run())
+        assert response.content == "answer 2"
+        assert inner.calls == 2
+        assert elapsed < 0.4
+
+    def test_no_hedging_without_enough_samples(self):
+        """Test that hedging waits for enough latency samples."""
+        client = make_client(FlakyModel(0), hedge=True, hedge_min_samples=5)
+        client._latencies.extend([0.01, 0.02])
+        assert client.hedge_delay() is None
+
+    def test_structured_view_shares_breaker(self):
+        """Test that with_structured_output keeps the policy and the breaker."""
+        client = make_client(FakeChatModel(seed=1))
+        structured = client.with_structured_output(AnalysisResponse)
+        assert structured.breaker is client.breaker
+        assert isinstance(asyncio.run(structured.ainvoke("Growth Stage: vegetation")), AnalysisResponse)
+
+    def test_stream_retries_before_first_chunk(self):
+        """Test that a stream failing before its first chunk is retried."""
+        inner = FakeChatModel(failure_rate=1.0, seed=0, tokens_per_second=0)
+        client = make_client(inner, max_retries=1)
+
+        async def collect():
+            return [chunk.content async for chunk in client.astream("hi")]
+
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(collect())
+        assert inner.calls == 2
+
+        inner.failure_rate = 0.0
+        assert "".join(asyncio.run(collect())).strip()
+
+
+class TestCircuitBreaker:
+    """Tests for the CircuitBreaker state machine."""
+
+    def test_opens_after_threshold_and_recovers(self):
+        """Test closed -> open -> half-open -> closed."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        assert breaker.state == "closed"
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow()
+
+        clock.now = 11
+        assert breaker.state == "half_open"
+        assert breaker.allow()
+        assert not breaker.allow()  # only one trial call at a time
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_failed_trial_reopens(self):
+        """Test that a failed half-open trial opens the circuit again."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 11
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+
+    def test_open_circuit_fails_fast(self):
+        """Test that an open circuit rejects calls without reaching the model."""
+        inner = FlakyModel(failures=100)
+        client = make_client(inner, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30), max_retries=0)
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(client.ainvoke("hi"))
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(client.ainvoke("hi"))
+        assert inner.calls == 1
+
+
+@patch('src.config.LLM_MAX_RETRIES', 0)
+@patch('src.config.LLM_RETRY_BACKOFF_SECONDS', 0.0)
+@patch('src.config.FAKE_LLM_FAILURE_RATE', 1.0)
+@patch('src.config.FAKE_LLM_LATENCY_SECONDS', 0.0)
+@patch('src.config.FAKE_LLM_JITTER_SECONDS', 0.0)
+@patch('src.config.LLM_PROVIDER', 'fake')
+def test_analyze_returns_rules_response_when_model_fails():
+    """Test that /analyze degrades to rules-based advice instead of erroring."""
+    main._model = main._structured_model = main._circuit_breaker = None
+    try:
+        client = TestClient(main.app)
+        csv_content = "timestamp,temperature,humidity\n2025-01-01 00:00,75,85\n2025-01-01 01:00,76,84\n"
+        response = client.post(
+            "/analyze",
+            data={"growth_stage": "vegetation"},
+            files={"csv_file": ("test.csv", csv_content, "text/csv")},
+        )
+        assert response.status_code == 200
+        assert "Bring Your Humidity Down" in response.text
+        assert main.get_response_cache().stats()["entries"] == 0
+    finally:
+        main._model = main._structured_model = main._circuit_breaker = None
+
+
+class TestDegradedAnalysis:
+    """Tests for the rules-based answer given while the model is unavailable."""
+
+    def test_unknown_stage_gets_general_advice(self):
+        """Test that a stage without targets still gets a valid response instead of a KeyError."""
+        response = main.degraded_analysis("cloning", make_metrics(75, 85), LLMUnavailableError("down"))
+        assert "We don't have targets for the cloning stage" in response.summary
+        assert response.recommendations[0].title == "Match Your Conditions to Your Stage"
+        assert any(rec.product for rec in response.recommendations)
+
+    def test_empty_catalog_links_the_fallback_product(self, tmp_path):
+        """Test that a response is still valid when the catalog has no products."""
+        with patch('src.main.get_catalog', return_value=ProductCatalog(tmp_path / "missing.csv")):
+            response = main.degraded_analysis("vegetation", make_metrics(75, 85), LLMUnavailableError("down"))
+        assert "Bring Your Humidity Down" in [rec.title for rec in response.recommendations]
+        assert response.recommendations[0].product == FALLBACK_PRODUCT
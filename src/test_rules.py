@@ -0,0 +1,121 @@
+from unittest.mock import AsyncMock, patch
+import numpy as np
+from fastapi.testclient import TestClient
+from . import main
+from .catalog import ProductCatalog
+from .environment import EnvironmentMetrics
+from .models import AnalysisResponse, ProductLink, Recommendation
+from .rules import build_rules_response, rules_can_answer
+
+
+def make_metrics(temperature_f: float, humidity_pct: float, readings: int = 24) -> EnvironmentMetrics:
+    metrics = EnvironmentMetrics.from_headers(["temperature", "humidity"])
+    metrics.update(np.full(readings, temperature_f), np.full(readings, humidity_pct))
+    return metrics
+
+
+def make_csv(temperature_f: float, humidity_pct: float, readings: int = 24) -> str:
+    rows = [f"2025-01-01 {hour % 24:02d}:00,{temperature_f},{humidity_pct}" for hour in range(readings)]
+    return "timestamp,temperature,humidity\n" + "\n".join(rows) + "\n"
+
+
+class TestRulesCanAnswer:
+    """Tests for deciding when the rules engine answers on its own."""
+
+    def test_in_range_data_is_answered(self):
+        """Test that data inside every target is answered in both modes."""
+        metrics = make_metrics(75, 65)
+        assert metrics.issues("vegetation") == []
+        assert rules_can_answer("vegetation", metrics, "in_range", 12)
+        assert rules_can_answer("vegetation", metrics, "known_issues", 12)
+        assert not rules_can_answer("vegetation", metrics, "off", 12)
+
+    def test_known_issue_is_answered_only_in_known_issues_mode(self):
+        """Test that a known issue pattern escalates in in_range mode only."""
+        metrics = make_metrics(75, 85)
+        assert set(metrics.issues("vegetation")) == {"humidity_high", "vpd_low"}
+        assert not rules_can_answer("vegetation", metrics, "in_range", 12)
+        assert rules_can_answer("vegetation", metrics, "known_issues", 12)
+
+    def test_unusual_combination_is_escalated(self):
+        """Test that issues outside KNOWN_PATTERNS go to the model."""
+        metrics = make_metrics(95, 20)
+        assert len(metrics.issues("seedling")) > 1
+        assert not rules_can_answer("seedling", metrics, "known_issues", 12)
+
+    def test_too_few_readings_are_escalated(self):
+        """Test that tiny uploads go to the model."""
+        assert not rules_can_answer("vegetation", make_metrics(75, 65, readings=3), "in_range", 12)
+        assert not rules_can_answer("vegetation", None, "in_range", 12)
+
+    def test_unknown_stage_is_escalated(self):
+        """Test that an unrecognized growth stage goes to the model."""
+        assert not rules_can_answer("cloning", make_metrics(75, 65), "in_range", 12)
+
+
+class TestRulesResponse:
+    """Tests for the templated AnalysisResponse."""
+
+    def test_addresses_detected_issues(self):
+        """Test that out-of-range humidity produces humidity advice with a product."""
+        response = build_rules_response("vegetation", make_metrics(75, 85), ProductCatalog(main.PRODUCT_LINKS_PATH))
+        humidity = next(rec for rec in response.recommendations if rec.title == "Bring Your Humidity Down")
+        assert "55-70%" in humidity.description
+        assert any(rec.product for rec in response.recommendations)
+        assert len(response.recommendations) >= 2
+
+    def test_in_range_response_links_a_catalog_product(self):
+        """Test that in-range advice still carries a product from product_links.csv."""
+        catalog = ProductCatalog(main.PRODUCT_LINKS_PATH)
+        response = build_rules_response("vegetation", make_metrics(75, 65), catalog)
+        assert response.summary.startswith("Your tent looks great")
+        urls = {product.url for product in catalog.products}
+        assert any(rec.product and rec.product.url in urls for rec in response.recommendations)
+
+    def test_works_without_metrics(self):
+        """Test that general advice is returned when no columns were recognized."""
+        response = build_rules_response("flowering", None, ProductCatalog(main.PRODUCT_LINKS_PATH))
+        assert len(response.recommendations) == 2
+        assert any(rec.product for rec in response.recommendations)
+
+
+@patch('src.config.RULES_ENGINE', 'in_range')
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_skips_model_for_in_range_data(mock_get_structured_model, mock_get_model):
+    """Test that an in-range upload is answered without any model call."""
+    client = TestClient(main.app)
+    response = client.post(
+        "/analyze",
+        data={"growth_stage": "vegetation"},
+        files={"csv_file": ("test.csv", make_csv(75, 65), "text/csv")},
+    )
+    assert response.status_code == 200
+    assert "Keep Conditions Steady" in response.text
+    mock_get_model.assert_not_called()
+    mock_get_structured_model.assert_not_called()
+
+
+@patch('src.config.RULES_ENGINE', 'off')
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_uses_model_when_rules_engine_off(mock_get_structured_model, mock_get_model):
+    """Test that RULES_ENGINE=off always escalates to the model."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=AnalysisResponse(
+        summary="Looks good.",
+        recommendations=[
+            Recommendation(
+                title="Hold Steady", description="Keep it up.", priority="low",
+                product=ProductLink(name="Controller", url="https://acinfinity.com/controller"),
+            ),
+            Recommendation(title="Log Daily", description="Check readings.", priority="low"),
+        ],
+    ))
+    client = TestClient(main.app)
+    response = client.post(
+        "/analyze",
+        data={"growth_stage": "vegetation"},
+        files={"csv_file": ("test.csv", make_csv(75, 65), "text/csv")},
+    )
+    assert response.status_code == 200
+    mock_get_structured_model.return_value.ainvoke.assert_called_once()
@@ -0,0 +1,43 @@
+import os
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from . import main
+from .server import create_app, share_state_between_workers
+from .telemetry import STARTUP_SECONDS
+
+
+@patch.dict(os.environ, {"GROW_ASSIST_CACHE_BACKEND": "none"}, clear=False)
+def test_multiple_workers_share_cache_and_limiter():
+    """Test that several workers default to the SQLite backends but keep explicit settings."""
+    os.environ.pop("GROW_ASSIST_LIMITER_BACKEND", None)
+    os.environ.pop("GROW_ASSIST_JOB_STORE", None)
+    share_state_between_workers(4)
+    assert os.environ["GROW_ASSIST_LIMITER_BACKEND"] == "sqlite"
+    assert os.environ["GROW_ASSIST_JOB_STORE"] == "sqlite"
+    assert os.environ["GROW_ASSIST_CACHE_BACKEND"] == "none"
+    os.environ.pop("GROW_ASSIST_LIMITER_BACKEND")
+    os.environ.pop("GROW_ASSIST_JOB_STORE")
+
+
+@patch('src.main.get_structured_model')
+def test_startup_warms_clients_and_reports_timings(mock_get_structured_model):
+    """Test that the lifespan hook builds the clients before the first request and times startup."""
+    main._catalog = main._index_page = None
+    STARTUP_SECONDS.clear()
+    with TestClient(create_app()) as client:
+        assert mock_get_structured_model.called
+        assert main._catalog is not None and main._index_page is not None
+        assert "first_request" not in STARTUP_SECONDS
+        client.get("/")
+        metrics = client.get("/metrics").text
+    assert set(STARTUP_SECONDS) == {"import", "warm_up", "first_request"}
+    assert "grow_assist_startup_warm_up_seconds" in metrics
+    assert "grow_assist_startup_first_request_seconds" in metrics
+
+
+@patch('src.config.WARM_START', False)
+def test_catalog_loads_at_startup_not_import():
+    """Test that the catalog is read by the lifespan hook even without warm start."""
+    main._catalog = None
+    with TestClient(main.app):
+        assert main._catalog is not None and main._catalog.products
@@ -0,0 +1,120 @@
+from unittest.mock import AsyncMock, patch
+import numpy as np
+from fastapi.testclient import TestClient
+from . import main
+from .environment import EnvironmentMetrics
+from .models import AnalysisResponse, ProductLink, Recommendation
+from .similarity import SimilarityCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _metrics(temperature: float, humidity: float, readings: int = 24) -> EnvironmentMetrics:
+    metrics = EnvironmentMetrics(temperature_unit="F")
+    metrics.update(np.full(readings, temperature), np.full(readings, humidity))
+    return metrics
+
+
+def _analysis(summary: str) -> AnalysisResponse:
+    return AnalysisResponse(
+        summary=summary,
+        recommendations=[
+            Recommendation(
+                title="Lower Humidity",
+                description="Run a dehumidifier.",
+                priority="high",
+                product=ProductLink(name="Dehumidifier", url="https://acinfinity.com/dehumidifier"),
+            ),
+            Recommendation(title="Increase Airflow", description="Turn up the exhaust fan.", priority="medium"),
+        ],
+    )
+
+
+def _cache(clock=None, **kwargs) -> SimilarityCache:
+    options = dict(threshold=1.0, max_entries=10, ttl_seconds=3600, clock=clock or FakeClock())
+    options.update(kwargs)
+    return SimilarityCache(**options)
+
+
+class TestSimilarityCache:
+    """Tests for the near-duplicate analysis cache."""
+
+    def test_near_duplicate_hits_and_distant_misses(self):
+        """Test that a nearly identical environment reuses the analysis and a different one does not."""
+        cache = _cache()
+        cache.set("vegetation", _metrics(78, 75), "v1", _analysis("humid"))
+
+        assert cache.get("vegetation", _metrics(78.3, 75.5), "v1").summary == "humid"
+        assert cache.get("vegetation", _metrics(82, 75), "v1") is None
+        assert cache.stats()["hit_rate"] == 0.5
+
+    def test_stage_and_prompt_version_partition_entries(self):
+        """Test that other stages and prompt versions never match."""
+        cache = _cache()
+        cache.set("vegetation", _metrics(78, 75), "v1", _analysis("humid"))
+        assert cache.get("flowering", _metrics(78, 75), "v1") is None
+        assert cache.get("vegetation", _metrics(78, 75), "v2") is None
+
+    def test_expires_by_age_and_tracks_staleness(self):
+        """Test that entries past the TTL are dropped and hit ages are reported."""
+        clock = FakeClock()
+        cache = _cache(clock, ttl_seconds=100)
+        cache.set("vegetation", _metrics(78, 75), "v1", _analysis("humid"))
+        clock.now += 60
+        assert cache.get("vegetation", _metrics(78, 75), "v1") is not None
+        assert cache.stats()["hit_age_seconds_max"] == 60
+        clock.now += 60
+        assert cache.get("vegetation", _metrics(78, 75), "v1") is None
+        assert cache.stats()["expired"] == 1
+
+    def test_evicts_least_recently_used_beyond_capacity(self):
+        """Test that the cache holds at most max_entries analyses."""
+        clock = FakeClock()
+        cache = _cache(clock, max_entries=2)
+        for i, temperature in enumerate((70, 74, 78)):
+            clock.now += 1
+            cache.set("vegetation", _metrics(temperature, 60), "v1", _analysis(str(i)))
+        assert len(cache) == 2
+        assert cache.stats()["evicted"] == 1
+        assert cache.get("vegetation", _metrics(70, 60), "v1") is None
+        assert cache.get("vegetation", _metrics(78, 60), "v1").summary == "2"
+
+    def test_unknown_stage_or_few_readings_are_not_usable(self):
+        """Test that uploads that can't be compared bypass the cache."""
+        cache = _cache(min_readings=12)
+        assert cache.usable("vegetation", _metrics(78, 75))
+        assert not cache.usable("vegetation", _metrics(78, 75, readings=5))
+        assert not cache.usable("mothership", _metrics(78, 75))
+        assert not cache.usable("vegetation", None)
+
+
+def _csv(temperature: float, humidity: float) -> str:
+    rows = [f"2025-01-01 {hour:02d}:00,{temperature},{humidity}" for hour in range(24)]
+    return "timestamp,temperature,humidity\n" + "\n".join(rows) + "\n"
+
+
+@patch('src.config.SIMILARITY_CACHE', True)
+@patch('src.config.RULES_ENGINE', 'off')
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_structured_model')
+def test_similar_upload_skips_the_model(mock_get_structured_model):
+    """Test that /analyze answers a near-duplicate upload from the similarity cache."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_analysis("Too humid."))
+    client = TestClient(main.app)
+    for csv_content in (_csv(78, 75), _csv(78.2, 75.4)):
+        response = client.post(
+            "/analyze/fragment",
+            data={"growth_stage": "vegetation"},
+            files={"csv_file": ("test.csv", csv_content, "text/csv")},
+            headers={"Accept": "application/json"},
+        )
+        assert response.json()["summary"] == "Too humid."
+
+    assert mock_get_structured_model.return_value.ainvoke.await_count == 1
+    assert client.get("/cache/stats").json()["similar"]["hits"] == 1
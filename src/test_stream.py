@@ -0,0 +1,132 @@
+from unittest.mock import patch, MagicMock, AsyncMock
+import io
+import json
+from pydantic import ValidationError
+from langchain_core.exceptions import OutputParserException
+from fastapi.testclient import TestClient
+from .main import app
+from .models import AnalysisResponse, Recommendation, ProductLink
+
+
+def _make_analysis():
+    return AnalysisResponse(
+        summary="Humidity is a little high for flowering.",
+        recommendations=[
+            Recommendation(
+                title="Lower Humidity",
+                description="Run a dehumidifier overnight.",
+                priority="high",
+                product=ProductLink(name="Dehumidifier", url="https://acinfinity.com/dehumidifier")
+            ),
+            Recommendation(
+                title="Increase Airflow",
+                description="Turn up the exhaust fan.",
+                priority="medium"
+            )
+        ]
+    )
+
+
+def _post_stream(client):
+    csv_file = io.BytesIO(b"temperature,humidity\n75,60\n")
+    return client.post(
+        "/analyze/stream",
+        data={"growth_stage": "flowering"},
+        files={"csv_file": ("test.csv", csv_file, "text/csv")}
+    )
+
+
+async def _fake_stream(*chunks):
+    for text in chunks:
+        yield MagicMock(text=text)
+
+
+def _parse_sse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@patch('src.config.ANALYSIS_MODE', 'two_pass')
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_stream_sends_tokens_then_recommendations(mock_get_structured_model, mock_get_model):
+    """Test that the SSE endpoint streams metrics, model tokens and each recommendation in order."""
+    mock_get_model.return_value.astream = MagicMock(return_value=_fake_stream("Humidity ", "is high."))
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_make_analysis())
+
+    csv_file = io.BytesIO(b"temperature,humidity\n75,60\n")
+    client = TestClient(app)
+    response = client.post(
+        "/analyze/stream",
+        data={"growth_stage": "flowering"},
+        files={"csv_file": ("test.csv", csv_file, "text/csv")}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    assert [name for name, _ in events] == [
+        "metrics", "token", "token", "summary", "recommendation", "recommendation", "done"
+    ]
+    assert events[1][1] == {"text": "Humidity "}
+    assert events[4][1]["title"] == "Lower Humidity"
+    assert events[-1][1]["summary"] == "Humidity is a little high for flowering."
+
+
+@patch('src.config.ANALYSIS_MODE', 'two_pass')
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_stream_reports_errors_as_events(mock_get_structured_model, mock_get_model):
+    """Test that a failure after streaming starts is reported as an error event."""
+    mock_get_model.return_value.astream = MagicMock(return_value=_fake_stream("Humidity is high."))
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(side_effect=OutputParserException("bad output"))
+
+    csv_file = io.BytesIO(b"temperature,humidity\n75,60\n")
+    client = TestClient(app)
+    response = client.post(
+        "/analyze/stream",
+        data={"growth_stage": "flowering"},
+        files={"csv_file": ("test.csv", csv_file, "text/csv")}
+    )
+
+    events = _parse_sse(response.text)
+    assert events[-1][0] == "error"
+    assert "bad output" in events[-1][1]["detail"]
+
+
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_stream_single_pass_skips_free_text_call(mock_get_structured_model, mock_get_model):
+    """Test that single-pass mode streams the structured answer without a free-text call."""
+    mock_get_model.return_value.astream = MagicMock()
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_make_analysis())
+
+    events = _parse_sse(_post_stream(TestClient(app)).text)
+
+    assert [name for name, _ in events] == ["metrics", "summary", "recommendation", "recommendation", "done"]
+    assert mock_get_structured_model.return_value.ainvoke.await_count == 1
+    mock_get_model.return_value.astream.assert_not_called()
+
+
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_model')
+@patch('src.main.get_structured_model')
+def test_analyze_stream_single_pass_falls_back_to_streamed_two_pass(mock_get_structured_model, mock_get_model):
+    """Test that a validation failure in single-pass mode falls back to streaming tokens."""
+    try:
+        AnalysisResponse(summary="No products", recommendations=[])
+    except ValidationError as exc:
+        validation_error = exc
+
+    mock_get_model.return_value.astream = MagicMock(return_value=_fake_stream("Humidity is high."))
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(side_effect=[validation_error, _make_analysis()])
+
+    events = _parse_sse(_post_stream(TestClient(app)).text)
+
+    assert [name for name, _ in events][:2] == ["metrics", "token"]
+    assert events[-1][0] == "done"
+    assert mock_get_structured_model.return_value.ainvoke.await_count == 2
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from .ingest import parse_csv_data
+from .summary import ColumnStats, EnvironmentDigest, detect_column, parse_timestamp, TEMPERATURE_ALIASES
+
+
+def _minute_log(rows: int) -> str:
+    start = datetime(2025, 1, 1)
+    lines = ["timestamp,temperature,humidity"]
+    for i in range(rows):
+        ts = start + timedelta(minutes=i)
+        temperature = 75 + (i % 10)
+        humidity = 45 + (i % 20)
+        lines.append(f"{ts.isoformat()},{temperature},{humidity}")
+    return "\n".join(lines) + "\n"
+
+
+class TestColumnStats:
+    """Tests for ColumnStats."""
+
+    def test_tracks_min_max_mean_and_percentiles(self):
+        """Test the running aggregates on a known series."""
+        stats = ColumnStats(sample_size=1000)
+        for value in range(1, 101):
+            stats.add(float(value))
+        assert stats.minimum == 1
+        assert stats.maximum == 100
+        assert stats.mean == 50.5
+        assert 49 <= stats.percentile(50) <= 52
+
+    def test_sample_size_is_bounded(self):
+        """Test that the percentile sample never grows past sample_size."""
+        stats = ColumnStats(sample_size=16)
+        for value in range(10_000):
+            stats.add(float(value))
+        assert len(stats.sample) == 16
+        assert stats.count == 10_000
+
+    def test_add_array_matches_add(self):
+        """Test that adding a whole array gives the same aggregates as adding values one by one."""
+        values = np.arange(1, 5001, dtype=float)
+        values[::7] = np.nan
+        one_by_one = ColumnStats(sample_size=256)
+        for value in values[np.isfinite(values)]:
+            one_by_one.add(float(value))
+        batched = ColumnStats(sample_size=256)
+        for chunk in np.array_split(values, 7):
+            batched.add_array(chunk)
+        assert (batched.count, batched.minimum, batched.maximum) == (one_by_one.count, one_by_one.minimum, one_by_one.maximum)
+        assert batched.mean == pytest.approx(one_by_one.mean)
+        assert len(batched.sample) == 256
+        assert abs(batched.percentile(50) - 2500) < 500
+
+
+class TestEnvironmentDigest:
+    """Tests for EnvironmentDigest."""
+
+    def test_small_upload_is_rendered_row_by_row(self):
+        """Test that uploads under the raw row limit keep the per-reading format."""
+        result = parse_csv_data("temperature,humidity\n75,60\n76,61\n", "vegetation")
+        assert "Environmental data (2 readings):" in result
+        assert "Reading 2: temperature: 76, humidity: 61" in result
+
+    def test_empty_upload(self):
+        """Test that an upload without rows is reported as empty."""
+        assert parse_csv_data("temperature,humidity\n") == "No data found in CSV file."
+
+    def test_large_upload_is_summarized(self):
+        """Test that large uploads produce statistics, hourly averages and excursions."""
+        result = parse_csv_data(_minute_log(2000), "flowering")
+        assert "2000 readings, summarized" in result
+        assert "Reading 1:" not in result
+        assert "- temperature: min 75.00" in result
+        assert "- 00:00 temperature_f" in result
+        assert "against flowering targets" in result
+        assert "- humidity_pct (40-50)" in result
+
+    def test_prompt_size_is_bounded(self):
+        """Test that the digest does not grow with the number of rows."""
+        small = parse_csv_data(_minute_log(2_000), "vegetation")
+        large = parse_csv_data(_minute_log(20_000), "vegetation")
+        assert len(large) < len(small) * 1.1
+
+    def test_counts_excursions_in_celsius(self):
+        """Test that Celsius readings are converted before comparing to targets."""
+        digest = EnvironmentDigest(["temp_c", "rh"], growth_stage="vegetation", raw_row_limit=0)
+        digest.add_row({"temp_c": "30", "rh": "60"})
+        digest.add_row({"temp_c": "25", "rh": "60"})
+        below, above, total = digest.excursions["temperature_f"]
+        assert (below, above, total) == (0, 1, 2)
+        assert digest.excursions["humidity_pct"] == [0, 0, 2]
+
+    def test_all_null_column_is_left_out_of_excursions(self):
+        """Test that a column with no values adds no excursion line and renders without error."""
+        digest = EnvironmentDigest(["temperature", "humidity", "vpd"], growth_stage="flowering", raw_row_limit=0)
+        digest.add_columns({
+            "temperature": np.full(60, 78.0),
+            "humidity": np.full(60, 45.0),
+            "vpd": np.full(60, np.nan),
+        })
+        assert "vpd_kpa" not in digest.excursions
+        assert "- humidity_pct (40-50)" in digest.render()
+
+
+def test_detect_column_normalizes_headers():
+    """Test that header punctuation and case are ignored when detecting columns."""
+    assert detect_column(["Time", "Temp (°F)"], TEMPERATURE_ALIASES) == "Temp (°F)"
+
+
+def test_parse_timestamp_formats():
+    """Test the supported timestamp formats."""
+    assert parse_timestamp("2025-01-01T13:05:00").hour == 13
+    assert parse_timestamp("01/02/2025 1:05 PM").hour == 13
+    assert parse_timestamp("1735736700").year == 2025
+    assert parse_timestamp("not a date") is None
@@ -0,0 +1,83 @@
+import io
+import json
+import logging
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from .main import app
+from .models import AnalysisResponse, Recommendation, ProductLink
+from .telemetry import Counter, Histogram, estimate_tokens, record_llm_call, LLM_TOKENS
+
+
+def _make_analysis():
+    return AnalysisResponse(
+        summary="Metrics summary",
+        recommendations=[
+            Recommendation(
+                title="Lower Humidity",
+                description="Run a dehumidifier overnight.",
+                priority="high",
+                product=ProductLink(name="Dehumidifier", url="https://acinfinity.com/dehumidifier")
+            ),
+            Recommendation(title="Increase Airflow", description="Turn up the exhaust fan.", priority="medium")
+        ]
+    )
+
+
+class TestHistogram:
+    """Tests for the Prometheus histogram."""
+
+    def test_renders_cumulative_buckets(self):
+        """Test bucket, sum and count lines."""
+        histogram = Histogram("test_seconds", "Test.", buckets=(0.1, 1), label_names=("stage",))
+        histogram.observe(0.05, stage="parse")
+        histogram.observe(0.5, stage="parse")
+        histogram.observe(5, stage="parse")
+        lines = histogram.render()
+        assert 'test_seconds_bucket{stage="parse",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{stage="parse",le="1"} 2' in lines
+        assert 'test_seconds_bucket{stage="parse",le="+Inf"} 3' in lines
+        assert 'test_seconds_count{stage="parse"} 3' in lines
+        assert 'test_seconds_sum{stage="parse"} 5.55' in lines
+
+
+def test_counter_renders_labels():
+    """Test counter exposition with labels."""
+    counter = Counter("test_total", "Test.", label_names=("kind",))
+    counter.inc(3, kind="prompt")
+    assert 'test_total{kind="prompt"} 3' in counter.render()
+
+
+def test_record_llm_call_prefers_provider_usage():
+    """Test that provider-reported usage beats the estimate."""
+    response = type("Response", (), {"usage_metadata": {"input_tokens": 120, "output_tokens": 30}, "content": "x"})()
+    assert record_llm_call("unit_test", "some prompt", response) == (120, 30)
+    assert record_llm_call("unit_test", "a" * 400, completion_text="b" * 40) == (estimate_tokens("a" * 400), 10)
+
+
+@patch('src.config.TRACE_REQUESTS', True)
+@patch('src.config.ANALYSIS_MODE', 'single')
+@patch('src.main.get_structured_model')
+def test_metrics_endpoint_and_trace_log(mock_get_structured_model, caplog):
+    """Test that /analyze stages show up in /metrics and in the request trace log."""
+    mock_get_structured_model.return_value.ainvoke = AsyncMock(return_value=_make_analysis())
+    tokens_before = LLM_TOKENS.value(call="single", kind="prompt")
+
+    client = TestClient(app)
+    with caplog.at_level(logging.INFO, logger="src.telemetry"):
+        client.post(
+            "/analyze",
+            data={"growth_stage": "vegetation"},
+            files={"csv_file": ("test.csv", io.BytesIO(b"temperature,humidity\n75,60\n"), "text/csv")}
+        )
+
+    trace = json.loads(next(r.getMessage() for r in caplog.records if r.getMessage().startswith("trace "))[6:])
+    assert trace["path"] == "/analyze"
+    assert {"parse_upload", "single_invoke", "render"} <= set(trace["stages"])
+    assert trace["tokens"]["single"]["prompt"] > 0
+    assert LLM_TOKENS.value(call="single", kind="prompt") > tokens_before
+
+    body = client.get("/metrics").text
+    assert 'grow_assist_stage_duration_seconds_count{stage="single_invoke"}' in body
+    assert 'grow_assist_request_duration_seconds_count{method="POST",path="/analyze",status="200"}' in body
+    assert 'grow_assist_prompt_chars_count{call="single"}' in body
+    assert "grow_assist_cache_misses 1" in body
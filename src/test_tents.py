@@ -0,0 +1,290 @@
+import io
+from unittest.mock import AsyncMock, patch
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from . import main
+from .ingest import read_reading_batches
+from .models import AnalysisResponse, ProductLink, Recommendation
+from .tents import TentStore, build_tent_prompt, lights_on, tent_key
+
+
+def _csv(start_hour: int, hours: int) -> str:
+    lines = ["timestamp,temperature,humidity,ppfd"]
+    for h in range(start_hour, start_hour + hours):
+        lines.append(f"2025-01-{1 + h // 24:02d} {h % 24:02d}:00,{70 + h % 10},{50 + h % 20},{500 + h}")
+    return "\n".join(lines) + "\n"
+
+
+def _day_night_csv(start_day: int, days: int, warmer: float = 0) -> str:
+    """Hourly readings without PPFD: 78°F/50% with lights on (06-18), 70°F/58% off."""
+    lines = ["timestamp,temperature,humidity"]
+    for h in range(start_day * 24, (start_day + days) * 24):
+        day = 6 <= h % 24 < 18
+        temperature = (78 if day else 70) + warmer + h % 3 * 0.5
+        lines.append(f"2025-01-{1 + h // 24:02d} {h % 24:02d}:00,{temperature},{(50 if day else 58) + h % 2}")
+    return "\n".join(lines) + "\n"
+
+
+def _batches(csv_text: str):
+    return list(read_reading_batches(io.BytesIO(csv_text.encode())))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TentStore(tmp_path / "tents.sqlite3")
+
+
+@pytest.fixture
+def tent_store(store):
+    main._tent_store = store
+    yield store
+    main._tent_store = None
+
+
+class TestTentStore:
+    """Tests for deduplicated appends and incrementally maintained aggregates."""
+
+    def test_reappending_readings_is_deduplicated(self, store):
+        """Test that readings with an already stored timestamp are ignored."""
+        assert sum(store.append("a", b) for b in _batches(_csv(0, 48))) == 48
+        assert sum(store.append("a", b) for b in _batches(_csv(24, 48))) == 24
+        assert store.info("a").readings == 72
+        assert store.info("b") is None
+
+    @patch('src.tents.FETCH_ROWS', 10)
+    def test_reading_pages_do_not_hold_the_store_lock(self, store):
+        """Test that a caller paused between pages of readings_since leaves the store usable."""
+        for batch in _batches(_csv(0, 25)):
+            store.append("a", batch)
+        pages = store.readings_since("a", after_seq=0)
+        first = next(pages)
+        assert store._lock.acquire(timeout=1)
+        store._lock.release()
+        for batch in _batches(_csv(25, 5)):
+            assert store.append("a", batch) == 5
+        rest = list(pages)
+        assert [len(first.timestamps)] + [len(page.timestamps) for page in rest] == [10, 10, 5]
+        assert first.timestamps[0] < first.timestamps[-1] < rest[0].timestamps[0]
+
+    def test_aggregates_match_direct_computation(self, store):
+        """Test that the rolled-up aggregates equal a computation over every reading."""
+        for start in (0, 100, 50):
+            for batch in _batches(_csv(start, 100)):
+                store.append("a", batch)
+        temperatures = np.array([70 + h % 10 for h in range(200)], dtype=float)
+
+        all_time = store.all_time("a")
+        n, mean, low, high = all_time.stats["temperature_f"]
+        assert all_time.readings == n == 200
+        assert mean == pytest.approx(temperatures.mean())
+        assert (low, high) == (70, 79)
+
+        info = store.info("a")
+        day = store.window("a", info.last_ts - 24 * 3600 + 1)
+        assert day.readings == 24
+        assert day.stats["temperature_f"][1] == pytest.approx(temperatures[-24:].mean())
+
+    def test_prompt_covers_only_readings_since_last_analysis(self, store):
+        """Test that after mark_analyzed only the newly appended readings are digested."""
+        for batch in _batches(_csv(0, 500)):
+            store.append("a", batch)
+        _, metrics, through = build_tent_prompt(store, "a", "vegetation", 48)
+        assert metrics.count == 500
+        store.mark_analyzed("a", through)
+        assert store.info("a").pending == 0
+
+        for batch in _batches(_csv(500, 10)):
+            store.append("a", batch)
+        prompt, metrics, _ = build_tent_prompt(store, "a", "vegetation", 48)
+        assert metrics.count == 10
+        assert "510 readings" in prompt
+        assert "New readings since the last analysis (10)" in prompt
+
+    def test_prompt_without_new_readings_uses_last_day(self, store):
+        """Test that re-analyzing with nothing new digests the last 24 hours."""
+        for batch in _batches(_csv(0, 100)):
+            store.append("a", batch)
+        _, _, through = build_tent_prompt(store, "a", "vegetation", 48)
+        store.mark_analyzed("a", through)
+        prompt, metrics, _ = build_tent_prompt(store, "a", "vegetation", 48)
+        assert metrics.count == 24
+        assert "No new readings" in prompt
+
+    def test_prompt_with_no_humidity_readings(self, store):
+        """Test that a tent whose humidity column is empty still gets a summarized prompt."""
+        csv_text = "timestamp,temperature,humidity\n" + "".join(
+            f"2025-01-01 {h % 24:02d}:{h // 24:02d},75,\n" for h in range(100)
+        )
+        for batch in _batches(csv_text):
+            store.append("a", batch)
+        prompt, _, _ = build_tent_prompt(store, "a", "vegetation", 48)
+        assert "100 readings" in prompt
+        assert "humidity_pct (" not in prompt
+
+
+class TestTentBaselines:
+    """Tests for per-stage day/night baselines and deviation-only prompts."""
+
+    def test_lights_on_uses_ppfd_then_schedule(self):
+        """Test that PPFD decides day or night where measured, else a schedule that may wrap midnight."""
+        timestamps = np.array([2, 8, 20, 23]) * 3600
+        ppfd = np.array([0.0, np.nan, 300.0, np.nan])
+        assert lights_on(timestamps, ppfd, (6, 18)).tolist() == [False, True, True, False]
+        assert lights_on(timestamps, np.full(4, np.nan), (18, 12)).tolist() == [True, True, True, True]
+        assert lights_on(timestamps, np.full(4, np.nan), (20, 6)).tolist() == [True, False, True, True]
+
+    def test_baselines_fold_only_new_readings(self, store):
+        """Test that each update reads just the readings since the last one and matches a direct computation."""
+        for batch in _batches(_day_night_csv(0, 3)):
+            store.append("a", batch)
+        assert store.update_baselines("a", "flowering", (6, 18)) == 72
+        for batch in _batches(_day_night_csv(2, 2)):
+            store.append("a", batch)
+        assert store.update_baselines("a", "flowering", (6, 18)) == 24
+        assert store.update_baselines("a", "flowering", (6, 18)) == 0
+        assert store.info("a").growth_stage == "flowering"
+
+        day = [b for b in store.baselines("a") if b.period == "day"][0]
+        temperatures = np.array([78 + h % 3 * 0.5 for h in range(96) if 6 <= h % 24 < 18])
+        n, mean, spread = day.stats["temperature_f"]
+        assert day.readings == n == 48
+        assert mean == pytest.approx(temperatures.mean())
+        assert spread == pytest.approx(temperatures.std())
+        assert store.baselines("a", "vegetation") == []
+
+    def test_prompt_carries_only_deviations_once_baselined(self, store):
+        """Test that an established baseline replaces the history in the prompt with deviations from it."""
+        for batch in _batches(_day_night_csv(0, 14)):
+            store.append("a", batch)
+        store.update_baselines("a", "flowering", (6, 18))
+        _, _, through = build_tent_prompt(store, "a", "flowering", 48)
+        store.mark_analyzed("a", through)
+
+        for batch in _batches(_day_night_csv(14, 1, warmer=5)):
+            store.append("a", batch)
+        prompt, metrics, _ = build_tent_prompt(store, "a", "flowering", 48, (6, 18), min_baseline_readings=48)
+        full_prompt, _, _ = build_tent_prompt(store, "a", "flowering", 48)
+
+        assert metrics.count == 24
+        assert "usual flowering conditions" in prompt
+        assert "- day temperature: mean 83.5°F" in prompt and "- night temperature" in prompt
+        assert "humidity: mean" not in prompt
+        assert "Averages by hour of day" not in prompt and "Rolling aggregates" not in prompt
+        assert len(prompt) < len(full_prompt) / 2
+
+        prompt, _, _ = build_tent_prompt(store, "a", "flowering", 48, (6, 18), min_baseline_readings=1000)
+        assert "Rolling aggregates" in prompt
+
+    def test_outlier_day_is_compared_with_the_prior_baseline(self, store):
+        """Test that a day's excursion shows in full, and joins the baseline only once analyzed."""
+        for batch in _batches(_day_night_csv(0, 14)):
+            store.append("a", batch)
+        store.update_baselines("a", "flowering", (6, 18))
+        store.mark_analyzed("a", store.last_seq("a"))
+        usual = {b.period: b.stats["temperature_f"][1] for b in store.baselines("a")}
+
+        for batch in _batches(_day_night_csv(14, 1, warmer=5)):
+            store.append("a", batch)
+        info = store.info("a")
+        store.update_baselines("a", "flowering", (6, 18), through_seq=info.analyzed_through)
+        prompt, _, through = build_tent_prompt(store, "a", "flowering", 48, (6, 18), min_baseline_readings=48)
+
+        assert f"vs usual {usual['day']:.1f}°F (+5.0°F)" in prompt
+        assert f"vs usual {usual['night']:.1f}°F (+5.0°F)" in prompt
+        assert {b.readings for b in store.baselines("a")} == {168}
+
+        store.mark_analyzed("a", through)
+        assert store.update_baselines("a", "flowering", (6, 18), through_seq=through) == 24
+        assert {b.readings for b in store.baselines("a")} == {180}
+
+
+def _analysis() -> AnalysisResponse:
+    return AnalysisResponse(
+        summary="Steady.",
+        recommendations=[
+            Recommendation(
+                title="Keep going",
+                description="Conditions are stable.",
+                priority="low",
+                product=ProductLink(name="Hygrometer", url="https://example.com/hygrometer"),
+            ),
+            Recommendation(title="Check light", description="Measure PPFD weekly.", priority="low"),
+        ],
+    )
+
+
+@patch('src.config.RULES_ENGINE', 'off')
+@patch('src.main.get_structured_model')
+def test_tent_endpoints(mock_get_model, tent_store):
+    """Test appending, summarizing and analyzing a tent over HTTP."""
+    mock_model = AsyncMock()
+    mock_model.ainvoke.return_value = _analysis()
+    mock_get_model.return_value = mock_model
+    client = TestClient(main.app, headers={"X-API-Key": "grower"})
+
+    response = client.post("/tents/tent-1/readings", files={"csv_file": ("a.csv", _csv(0, 30), "text/csv")})
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 30
+    response = client.post("/tents/tent-1/readings", files={"csv_file": ("a.csv", _csv(20, 20), "text/csv")})
+    assert response.json() == {
+        "tent_id": "tent-1", "received": 20, "inserted": 10, "duplicates": 10, "skipped": 0, "total_readings": 40,
+    }
+
+    assert client.get("/tents/tent-1").json()["pending_readings"] == 40
+    response = client.post("/tents/tent-1/analyze", data={"growth_stage": "vegetation"})
+    assert response.status_code == 200
+    assert response.json()["summary"] == "Steady."
+    assert client.get("/tents/tent-1").json()["pending_readings"] == 0
+
+    assert client.get("/tents/missing").status_code == 404
+    assert client.get("/tents/bad%20id").status_code == 422
+
+
+@patch('src.config.RULES_ENGINE', 'off')
+@patch('src.main.get_structured_model')
+def test_tent_profiles_are_per_client(mock_get_model, tent_store):
+    """Test that each API key has its own tents, with baselines updated from analyzed readings."""
+    mock_get_model.return_value.ainvoke = AsyncMock(return_value=_analysis())
+    client = TestClient(main.app)
+    grower, other = {"X-API-Key": "grower"}, {"X-API-Key": "other"}
+
+    response = client.post(
+        "/tents/tent-1/readings",
+        data={"growth_stage": "Flowering"},
+        files={"csv_file": ("a.csv", _day_night_csv(0, 3), "text/csv")},
+        headers=grower,
+    )
+    assert response.json()["tent_id"] == "tent-1"
+    assert client.get("/tents/tent-1", headers=other).status_code == 404
+
+    profile = client.get("/tents/tent-1", headers=grower).json()
+    assert profile["growth_stage"] == "flowering"
+    assert profile["baselines"] == []
+
+    client.post("/tents/tent-1/readings", files={"csv_file": ("b.csv", _day_night_csv(3, 1), "text/csv")},
+                headers=grower)
+    assert client.post("/tents/tent-1/analyze", data={"growth_stage": "flowering"}, headers=grower).status_code == 200
+    profile = client.get("/tents/tent-1", headers=grower).json()
+    assert {(b["period"], b["readings"]) for b in profile["baselines"]} == {("day", 48), ("night", 48)}
+    night = next(b for b in profile["baselines"] if b["period"] == "night")
+    assert night["temperature_f"] == pytest.approx(70.5)
+
+    client.post("/tents/tent-1/readings", files={"csv_file": ("c.csv", _day_night_csv(4, 1, warmer=5), "text/csv")},
+                headers=grower)
+    assert client.post("/tents/tent-1/analyze", data={"growth_stage": "flowering"}, headers=grower).status_code == 200
+    prompt = mock_get_model.return_value.ainvoke.call_args.args[0][-1].content
+    assert "usual flowering conditions" in prompt and "Tent: tent-1" in prompt
+    assert "- day temperature: mean 83.5°F vs usual 78.5°F (+5.0°F)" in prompt
+
+
+def test_tents_require_an_api_key(tent_store):
+    """Test that anonymous clients sharing an address cannot create or read each other's tents."""
+    first, second = TestClient(main.app), TestClient(main.app)
+
+    response = first.post("/tents/tent-1/readings", files={"csv_file": ("a.csv", _csv(0, 5), "text/csv")})
+    assert response.status_code == 401
+    assert "X-API-Key" in response.json()["detail"]
+    assert second.get("/tents/tent-1").status_code == 401
+    assert second.post("/tents/tent-1/analyze", data={"growth_stage": "vegetation"}).status_code == 401
+    assert tent_store.info(tent_key("ip:testclient", "tent-1")) is None